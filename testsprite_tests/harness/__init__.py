@@ -0,0 +1,11 @@
+"""Performance and reliability harness for the Red Salud E2E suite.
+
+The generated ``TC*.py`` scripts in this directory verify behaviour; the
+modules in this package measure it. Every benchmark is exposed as a
+subcommand of ``python -m harness`` (run from ``testsprite_tests/``) and
+writes a JSON + Markdown report under ``harness_output/``.
+"""
+
+__all__ = ["HarnessError"]
+
+from harness.errors import HarnessError
@@ -0,0 +1,68 @@
+"""Command-line entry point: ``python -m harness <command> [options]``."""
+
+import argparse
+import importlib
+import sys
+
+from harness.errors import HarnessError
+
+# Subcommand -> (module, one-line help). Modules expose configure_parser(parser)
+# and run(args) -> exit code, and import optional drivers lazily.
+COMMANDS = {
+    "rls-bench": ("harness.rls_bench", "RLS policy cost per role and hot query"),
+    "vector-bench": ("harness.vector_bench", "KB/embedding search latency, throughput and recall"),
+    "realtime-probe": ("harness.realtime_probe", "Prescription status fan-out latency vs subscriber count"),
+    "lifecycle": ("harness.lifecycle", "Médico → farmacia → paciente prescription cycle time"),
+    "stubs": ("harness.stubs", "Serve BCV/SMS/SACS/RIF stand-ins with tunable latency and errors"),
+    "chaos": ("harness.chaos", "Run TC flows with injected backend faults; record retries, errors, hangs"),
+    "request-audit": ("harness.request_audit", "Duplicate, waterfall and N+1 requests per UI action"),
+    "overfetch": ("harness.overfetch", "PostgREST fields fetched but never rendered, per endpoint and route"),
+    "cache-audit": ("harness.cache_audit", "Cold vs repeat-visit transfer, 304 rate and uncached responses per route"),
+    "coverage": ("harness.coverage", "Per-route JS/CSS coverage and lazy-load candidates"),
+    "budget": ("harness.budget", "Enforce per-app/route page-weight, LCP and TBT budgets"),
+    "soak": ("harness.soak", "Repeat a dashboard loop and report heap growth and leaking classes"),
+    "device-matrix": ("harness.devices", "Run TC flows under low-end CPU/network profiles and compare"),
+    "cpu-profile": ("harness.cpu_profile", "Per-step CPU profiles: JS vs rendering vs network, top functions"),
+    "react-renders": ("harness.react_renders", "React commits and wasted re-renders per TC step"),
+    "hydration": ("harness.hydration", "Next.js hydration cost and time-to-interactive per route"),
+    "clock": ("harness.clock", "Run flows on virtual time: jump browser, stubs and rows ahead"),
+    "checkpoint": ("harness.checkpoint", "Checkpoint TC flows per step and resume them from the last good one"),
+    "schedule": ("harness.schedule", "Run the most valuable TC scripts that fit a wall-clock budget"),
+    "triage": ("harness.triage", "Cluster failures by cause; fail fast when login or boot is broken"),
+    "impact": ("harness.impact", "Record what each test touches; run only the tests a change affects"),
+    "distributed": ("harness.distributed", "Coordinator/worker mode: spread TC scripts and long jobs over machines"),
+    "otlp": ("harness.otlp", "Serve a local OTLP/HTTP collector stand-in for spans, metrics and logs"),
+    "traces": ("harness.tracing", "Propagate traceparent from TC steps; step → request → backend span breakdown"),
+    "compare": ("harness.compare", "Interleaved A/B runs on two targets with significance-tested verdicts"),
+    "artifacts": ("harness.artifacts", "Deduplicated, compressed store for HARs, traces and screenshots"),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m harness", description=__doc__)
+    parser.add_argument("--output-dir", default=None, help="report directory (default: harness_output/)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (module_name, help_text) in COMMANDS.items():
+        module = importlib.import_module(module_name)
+        subparser = subparsers.add_parser(
+            name,
+            help=help_text,
+            description=module.__doc__,
+            formatter_class=argparse.RawDescriptionHelpFormatter,
+        )
+        module.configure_parser(subparser)
+        subparser.set_defaults(handler=module.run)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.handler(args)
+    except HarnessError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
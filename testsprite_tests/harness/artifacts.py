@@ -0,0 +1,582 @@
+"""Content-addressed, compressed store for traces, HARs and screenshots.
+
+Diagnostics are mostly the same bytes over and over: every test's HAR and
+Playwright trace carries the same Next.js chunks, fonts and images. The
+store keeps each distinct content once, under its SHA-256, in
+``harness_output/artifacts/blobs/`` — gzip- or xz-compressed as it streams
+in, or stored as is when it already is compressed (PNG, JPEG, WebP, woff2,
+zip). Containers are split before storing so that their parts dedupe:
+
+* a HAR (recorded with embedded content) keeps its JSON skeleton as one blob
+  and every response body of 1 KiB or more as its own blob;
+* a Playwright trace zip becomes one blob per member — the trace and network
+  logs, and every snapshot resource and screenshot — plus a member list.
+
+Each run has an index in ``artifacts/runs/<run>.json`` listing, per test,
+its artifacts and every blob they reference. ``get`` reassembles an
+artifact — the HAR with its bodies back in, the trace zip with its members
+— ready for ``playwright show-trace`` or a HAR viewer.
+
+``gc`` applies the retention policy — keep the newest ``--keep-runs`` runs
+and anything younger than ``--keep-days`` (``--keep-failed-days`` for runs
+with a failed test), never a pinned run, then drop the oldest runs until
+the store fits ``--max-bytes`` — and sweeps the blobs no remaining index
+references. Blobs younger than ``--grace`` are never swept, so a run still
+being written is safe.
+
+``capture`` runs TC scripts with HAR recording, tracing and screenshots
+(``--screenshots failure`` or ``step``) and stores what they produce;
+``ingest`` adds existing files, such as other commands' reports.
+"""
+
+import asyncio
+import base64
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+
+from harness import config, report, tc_runner
+from harness.errors import HarnessError
+
+CODECS = {"gz": ".gz", "xz": ".xz", "raw": ""}
+# Formats that are compressed already; storing them as they are saves the CPU
+INCOMPRESSIBLE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp", ".gif", ".avif", ".woff2", ".zip", ".gz", ".br",
+                           ".xz", ".mp4", ".webm")
+_MAGIC = (b"\x89PNG", b"\xff\xd8\xff", b"RIFF", b"GIF8", b"wOF2", b"PK\x03\x04", b"\x1f\x8b", b"\xfd7zXZ")
+INLINE_BODY_BYTES = 1024
+_CHUNK = 1 << 20
+
+
+def store_dir(output_dir=None) -> Path:
+    return Path(output_dir or config.OUTPUT_DIR) / "artifacts"
+
+
+def _chunks(handle, size: int = _CHUNK):
+    while True:
+        chunk = handle.read(size)
+        if not chunk:
+            return
+        yield chunk
+
+
+class _Compressor:
+    def __init__(self, codec: str):
+        if codec == "gz":
+            self._obj = zlib.compressobj(6, zlib.DEFLATED, 31)  # gzip framing, readable with zcat
+        elif codec == "xz":
+            self._obj = lzma.LZMACompressor(preset=6)
+        else:
+            self._obj = None
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data) if self._obj else data
+
+    def flush(self) -> bytes:
+        return self._obj.flush() if self._obj else b""
+
+
+class ArtifactStore:
+    """Blobs by content hash plus one JSON index per run."""
+
+    def __init__(self, root: Path, codec: str = "gz"):
+        if codec not in CODECS or codec == "raw":
+            raise HarnessError(f"unknown codec {codec!r} (expected gz or xz)")
+        self.root = root
+        self.codec = codec
+        self.blobs = root / "blobs"
+        self.runs = root / "runs"
+
+    # --- blobs ---
+
+    def blob_path(self, digest: str) -> Path:
+        """Where ``digest`` is stored, whatever its codec; None if absent."""
+        for suffix in CODECS.values():
+            path = self.blobs / digest[:2] / (digest + suffix)
+            if path.exists():
+                return path
+        return None
+
+    def put_stream(self, chunks, name: str = "") -> dict:
+        """Store an iterable of byte chunks; ``{"hash", "size", "stored", "new"}``."""
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        digest, size = hashlib.sha256(), 0
+        compressor = None
+        with tempfile.NamedTemporaryFile(dir=self.blobs, prefix=".incoming-", delete=False) as handle:
+            try:
+                for chunk in chunks:
+                    if compressor is None:
+                        raw = name.lower().endswith(INCOMPRESSIBLE_SUFFIXES) or chunk.startswith(_MAGIC)
+                        codec = "raw" if raw else self.codec
+                        compressor = _Compressor(codec)
+                    digest.update(chunk)
+                    size += len(chunk)
+                    handle.write(compressor.compress(chunk))
+                if compressor is None:
+                    codec, compressor = "raw", _Compressor("raw")
+                handle.write(compressor.flush())
+            except BaseException:
+                os.unlink(handle.name)
+                raise
+        hexdigest = digest.hexdigest()
+        existing = self.blob_path(hexdigest)
+        if existing:
+            os.unlink(handle.name)
+            existing.touch()  # refreshes the GC grace period
+            return {"hash": hexdigest, "size": size, "stored": existing.stat().st_size, "new": False}
+        target = self.blobs / hexdigest[:2] / (hexdigest + CODECS[codec])
+        target.parent.mkdir(exist_ok=True)
+        os.replace(handle.name, target)
+        return {"hash": hexdigest, "size": size, "stored": target.stat().st_size, "new": True}
+
+    def put_bytes(self, data: bytes, name: str = "") -> dict:
+        return self.put_stream([data] if data else [], name)
+
+    def put_file(self, path: Path) -> dict:
+        with path.open("rb") as handle:
+            return self.put_stream(_chunks(handle), path.name)
+
+    def open_blob(self, digest: str):
+        path = self.blob_path(digest)
+        if path is None:
+            raise HarnessError(f"blob {digest} is missing from {self.blobs}")
+        if path.suffix == ".gz":
+            return gzip.open(path, "rb")
+        if path.suffix == ".xz":
+            return lzma.open(path, "rb")
+        return path.open("rb")
+
+    def get_bytes(self, digest: str) -> bytes:
+        with self.open_blob(digest) as handle:
+            return handle.read()
+
+    # --- containers ---
+
+    def put_har(self, path: Path) -> dict:
+        har = json.loads(path.read_text(encoding="utf-8"))
+        refs, added = [], 0
+        for entry in har.get("log", {}).get("entries", []):
+            content = entry.get("response", {}).get("content", {})
+            text = content.get("text")
+            if not text or len(text) < INLINE_BODY_BYTES:
+                continue
+            data = base64.b64decode(text) if content.get("encoding") == "base64" else text.encode("utf-8")
+            blob = self.put_bytes(data, entry.get("request", {}).get("url", "").split("?")[0])
+            content["_blob"] = blob["hash"]
+            del content["text"]
+            refs.append(blob["hash"])
+            added += blob["stored"] if blob["new"] else 0
+        skeleton = self.put_bytes(json.dumps(har, separators=(",", ":")).encode("utf-8"), path.name)
+        return self._entry(path, "har", skeleton, refs, added)
+
+    def put_trace(self, path: Path) -> dict:
+        members, added = [], 0
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                with archive.open(info) as handle:
+                    blob = self.put_stream(_chunks(handle), info.filename)
+                members.append({"name": info.filename, "blob": blob["hash"], "deflate": info.compress_type != 0})
+                added += blob["stored"] if blob["new"] else 0
+        manifest = self.put_bytes(json.dumps({"members": members}).encode("utf-8"), path.name + ".json")
+        return self._entry(path, "trace", manifest, [m["blob"] for m in members], added)
+
+    def put_artifact(self, path: Path, kind: str = None) -> dict:
+        """Store ``path`` split by its kind (``har``, ``trace`` or a plain ``file``)."""
+        kind = kind or guess_kind(path)
+        if kind == "har":
+            return self.put_har(path)
+        if kind == "trace":
+            return self.put_trace(path)
+        blob = self.put_file(path)
+        return self._entry(path, kind, blob, [], 0)
+
+    def _entry(self, path: Path, kind: str, blob: dict, refs: list, added: int) -> dict:
+        return {
+            "name": path.name,
+            "kind": kind,
+            "blob": blob["hash"],
+            "refs": sorted(set(refs)),
+            "size": path.stat().st_size,
+            "added": added + (blob["stored"] if blob["new"] else 0),
+        }
+
+    def restore(self, entry: dict, target: Path) -> Path:
+        """Reassemble an indexed artifact at ``target``."""
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if entry["kind"] == "har":
+            har = json.loads(self.get_bytes(entry["blob"]))
+            for item in har.get("log", {}).get("entries", []):
+                content = item.get("response", {}).get("content", {})
+                digest = content.pop("_blob", None)
+                if digest:
+                    data = self.get_bytes(digest)
+                    is_base64 = content.get("encoding") == "base64"
+                    content["text"] = base64.b64encode(data).decode() if is_base64 else data.decode("utf-8")
+            target.write_text(json.dumps(har), encoding="utf-8")
+        elif entry["kind"] == "trace":
+            manifest = json.loads(self.get_bytes(entry["blob"]))
+            with zipfile.ZipFile(target, "w") as archive:
+                for member in manifest["members"]:
+                    info = zipfile.ZipInfo(member["name"], time.localtime()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED if member["deflate"] else zipfile.ZIP_STORED
+                    with self.open_blob(member["blob"]) as source, \
+                            archive.open(info, "w", force_zip64=True) as sink:
+                        shutil.copyfileobj(source, sink, _CHUNK)
+        else:
+            with self.open_blob(entry["blob"]) as source, target.open("wb") as sink:
+                shutil.copyfileobj(source, sink, _CHUNK)
+        return target
+
+    # --- run indexes ---
+
+    def index_path(self, run_id: str) -> Path:
+        return self.runs / f"{run_id}.json"
+
+    def load_index(self, run_id: str) -> dict:
+        if run_id == "latest":
+            indexes = self.indexes()
+            if not indexes:
+                raise HarnessError(f"no runs in {self.runs}")
+            return indexes[-1]
+        path = self.index_path(run_id)
+        if not path.exists():
+            raise HarnessError(f"no run {run_id!r} in {self.runs}")
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save_index(self, index: dict):
+        self.runs.mkdir(parents=True, exist_ok=True)
+        path = self.index_path(index["run_id"])
+        partial = path.with_suffix(".json.partial")
+        partial.write_text(json.dumps(index, indent=2), encoding="utf-8")
+        os.replace(partial, path)
+
+    def new_run(self, label: str) -> dict:
+        base = run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}"
+        while self.index_path(run_id).exists():  # two runs in the same second
+            run_id = f"{base}-{len(list(self.runs.glob(base + '*.json'))) + 1}"
+        return {"run_id": run_id, "created_at": time.time(), "label": label, "pinned": False, "tests": {}}
+
+    def add(self, index: dict, test: str, path: Path, kind: str = None, status: str = None) -> dict:
+        entry = self.put_artifact(path, kind)
+        test_entry = index["tests"].setdefault(test, {"status": status, "artifacts": []})
+        test_entry["status"] = status or test_entry["status"]
+        test_entry["artifacts"].append(entry)
+        self.save_index(index)
+        return entry
+
+    def indexes(self) -> list:
+        """Every run index, oldest first."""
+        found = [json.loads(p.read_text(encoding="utf-8")) for p in self.runs.glob("*.json")] \
+            if self.runs.exists() else []
+        return sorted(found, key=lambda i: i["created_at"])
+
+    def blob_files(self) -> list:
+        return [p for p in self.blobs.glob("*/*") if not p.name.startswith(".")] if self.blobs.exists() else []
+
+
+def guess_kind(path: Path) -> str:
+    name = path.name.lower()
+    if name.endswith(".har"):
+        return "har"
+    if name.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if any(n.endswith(".trace") for n in archive.namelist()):
+                    return "trace"
+        except zipfile.BadZipFile:
+            pass
+    if name.endswith((".png", ".jpg", ".jpeg", ".webp")):
+        return "screenshot"
+    return "file"
+
+
+def referenced(index: dict) -> set:
+    blobs = set()
+    for test in index["tests"].values():
+        for entry in test["artifacts"]:
+            blobs.add(entry["blob"])
+            blobs.update(entry["refs"])
+    return blobs
+
+
+def has_failures(index: dict) -> bool:
+    return any(t["status"] not in (None, "passed") for t in index["tests"].values())
+
+
+def retention(indexes: list, keep_runs: int, keep_days: float, keep_failed_days: float, now: float = None) -> tuple:
+    """Split run indexes (oldest first) into ``(kept, expired)`` by age and count."""
+    now = now or time.time()
+    newest = {i["run_id"] for i in indexes[-keep_runs:]} if keep_runs else set()
+    kept, expired = [], []
+    for index in indexes:
+        age_days = (now - index["created_at"]) / 86400
+        limit = keep_failed_days if has_failures(index) else keep_days
+        if index.get("pinned") or index["run_id"] in newest or age_days <= limit:
+            kept.append(index)
+        else:
+            expired.append(index)
+    return kept, expired
+
+
+def gc(store: ArtifactStore, keep_runs: int, keep_days: float, keep_failed_days: float, max_bytes: int = None,
+       grace_s: float = 3600, dry_run: bool = False) -> dict:
+    indexes = store.indexes()
+    kept, expired = retention(indexes, keep_runs, keep_days, keep_failed_days)
+    blob_sizes = {p.name.split(".")[0]: (p, p.stat()) for p in store.blob_files()}
+    if max_bytes:
+        def stored(runs):
+            live = set().union(*(referenced(i) for i in runs)) if runs else set()
+            return sum(blob_sizes[b][1].st_size for b in live if b in blob_sizes)
+
+        while stored(kept) > max_bytes:
+            victim = next((i for i in kept if not i.get("pinned")), None)
+            if victim is None:
+                break  # only pinned runs left
+            kept.remove(victim)
+            expired.append(victim)
+    live = set().union(*(referenced(i) for i in kept)) if kept else set()
+    now, swept, freed = time.time(), [], 0
+    for digest, (path, stat) in blob_sizes.items():
+        if digest not in live and now - stat.st_mtime > grace_s:
+            swept.append(digest)
+            freed += stat.st_size
+            if not dry_run:
+                path.unlink()
+    if not dry_run:
+        for index in expired:
+            store.index_path(index["run_id"]).unlink(missing_ok=True)
+        for stale in store.blobs.glob(".incoming-*") if store.blobs.exists() else ():
+            if now - stale.stat().st_mtime > grace_s:
+                stale.unlink()
+    return {"runs_kept": [i["run_id"] for i in kept], "runs_deleted": [i["run_id"] for i in expired],
+            "blobs_deleted": len(swept), "bytes_freed": freed, "dry_run": dry_run}
+
+
+def usage(store: ArtifactStore) -> dict:
+    """Logical bytes (what the runs wrote) against bytes on disk."""
+    indexes = store.indexes()
+    logical = sum(e["size"] for i in indexes for t in i["tests"].values() for e in t["artifacts"])
+    files = store.blob_files()
+    on_disk = sum(p.stat().st_size for p in files)
+    by_kind = {}
+    for index in indexes:
+        for test in index["tests"].values():
+            for entry in test["artifacts"]:
+                kind = by_kind.setdefault(entry["kind"], {"count": 0, "size": 0, "added": 0})
+                kind["count"] += 1
+                kind["size"] += entry["size"]
+                kind["added"] += entry["added"]
+    return {"runs": len(indexes), "blobs": len(files), "logical_bytes": logical, "stored_bytes": on_disk,
+            "ratio": logical / on_disk if on_disk else None, "by_kind": by_kind}
+
+
+class CapturePlugin(tc_runner.Plugin):
+    """Records a HAR, a Playwright trace and screenshots per context, then stores them."""
+
+    name = "artifacts"
+
+    def __init__(self, store: ArtifactStore, index: dict, work_dir: Path, har: bool = True, trace: bool = True,
+                 screenshots: str = "failure"):
+        self.store = store
+        self.index = index
+        self.work_dir = work_dir
+        self.har = har
+        self.trace = trace
+        self.screenshots = screenshots
+        self.files = []
+        self.count = 0
+
+    def _path(self, run, suffix: str) -> Path:
+        self.count += 1
+        return self.work_dir / f"{run.test_id}-{self.count:03d}{suffix}"
+
+    def on_context_options(self, run, options):
+        if self.har:
+            path = self._path(run, ".har")
+            options.setdefault("record_har_path", str(path))
+            options.setdefault("record_har_content", "embed")
+            self.files.append((path, "har"))
+
+    async def on_context(self, run, context):
+        if self.trace:
+            await context.tracing.start(screenshots=True, snapshots=True)
+
+    async def on_step_end(self, run, step, page):
+        if self.screenshots == "step" or (self.screenshots == "failure" and step.error):
+            await self._screenshot(run, page)
+
+    async def before_context_close(self, run, context):
+        if self.trace:
+            path = self._path(run, ".trace.zip")
+            await context.tracing.stop(path=str(path))
+            self.files.append((path, "trace"))
+
+    async def _screenshot(self, run, page):
+        if page.is_closed():
+            return
+        path = self._path(run, ".png")
+        try:
+            await page.screenshot(path=str(path), full_page=True)
+            self.files.append((path, "screenshot"))
+        except Exception:
+            pass  # navigating or closed; the trace has its own screenshots
+
+    async def on_test_end(self, run):
+        for path, kind in self.files:
+            if path.exists():  # a HAR only exists once its context closed
+                await asyncio.to_thread(self.store.add, self.index, run.test_id, path, kind, run.status)
+                path.unlink()
+        self.index["tests"].setdefault(run.test_id, {"status": run.status, "artifacts": []})["status"] = run.status
+        self.store.save_index(self.index)
+        self.files = []
+
+
+def configure_parser(parser):
+    parser.add_argument("--codec", choices=("gz", "xz"), default="gz",
+                        help="compression for new blobs (xz: smaller, slower)")
+    actions = parser.add_subparsers(dest="action", required=True)
+    capture = actions.add_parser("capture", help="run TC scripts and store their HARs, traces and screenshots")
+    tc_runner.add_selection_arguments(capture)
+    capture.add_argument("--no-har", dest="har", action="store_false")
+    capture.add_argument("--no-trace", dest="trace", action="store_false")
+    capture.add_argument("--screenshots", choices=("off", "failure", "step"), default="failure")
+    ingest = actions.add_parser("ingest", help="store existing files or directories as one run")
+    ingest.add_argument("paths", nargs="+", type=Path)
+    ingest.add_argument("--label", default="ingest")
+    ingest.add_argument("--test", help="test id to file them under (default: the TC id in each name, else '-')")
+    actions.add_parser("ls", help="list runs").add_argument("run_id", nargs="?", help="show one run's artifacts")
+    get = actions.add_parser("get", help="reassemble an artifact")
+    get.add_argument("run_id", help="run id, or 'latest'")
+    get.add_argument("test")
+    get.add_argument("name", help="artifact name as listed by ls")
+    get.add_argument("-o", "--out", type=Path, help="output path (default: artifacts/restored/<name>)")
+    for name in ("pin", "unpin"):
+        actions.add_parser(name, help=f"{name} a run (pinned runs are never collected)").add_argument("run_id")
+    actions.add_parser("stats", help="logical vs stored bytes")
+    collect = actions.add_parser("gc", help="apply retention and delete unreferenced blobs")
+    collect.add_argument("--keep-runs", type=int, default=20, help="always keep this many newest runs")
+    collect.add_argument("--keep-days", type=float, default=14.0)
+    collect.add_argument("--keep-failed-days", type=float, default=30.0, help="retention for runs with a failed test")
+    collect.add_argument("--max-bytes", type=float, help="then drop oldest runs until blobs fit (e.g. 5e9)")
+    collect.add_argument("--grace", type=float, default=3600.0, help="never sweep blobs younger than this (s)")
+    collect.add_argument("--dry-run", action="store_true")
+
+
+def run(args) -> int:
+    store = ArtifactStore(store_dir(args.output_dir), args.codec)
+    if args.action == "capture":
+        return asyncio.run(capture(args, store))
+    if args.action == "ingest":
+        return ingest(args, store)
+    if args.action == "ls":
+        return list_runs(args, store)
+    if args.action == "get":
+        index = store.load_index(args.run_id)
+        entries = index["tests"].get(args.test, {}).get("artifacts", [])
+        entry = next((e for e in entries if e["name"] == args.name), None)
+        if entry is None:
+            raise HarnessError(f"no artifact {args.name!r} for {args.test} in run {index['run_id']}")
+        target = store.restore(entry, args.out or store.root / "restored" / index["run_id"] / args.name)
+        print(f"restored {entry['kind']} to {target}")
+        return 0
+    if args.action in ("pin", "unpin"):
+        index = store.load_index(args.run_id)
+        index["pinned"] = args.action == "pin"
+        store.save_index(index)
+        print(f"{index['run_id']}: {'pinned' if index['pinned'] else 'unpinned'}")
+        return 0
+    if args.action == "stats":
+        stats = usage(store)
+        print(json.dumps(stats, indent=2))
+        return 0
+    result = gc(store, args.keep_runs, args.keep_days, args.keep_failed_days,
+                int(args.max_bytes) if args.max_bytes else None, args.grace, args.dry_run)
+    payload = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), **result, "usage": usage(store)}
+    path = report.write_report("artifacts", payload, render_markdown(payload), args.output_dir)
+    print(f"{'would delete' if args.dry_run else 'deleted'} {len(result['runs_deleted'])} runs and "
+          f"{result['blobs_deleted']} blobs ({result['bytes_freed'] / 1e6:.1f} MB)")
+    print(f"artifacts report: {path}")
+    return 0
+
+
+async def capture(args, store: ArtifactStore) -> int:
+    index = store.new_run("capture")
+    store.save_index(index)
+    work_dir = store.root / "incoming" / index["run_id"]
+    work_dir.mkdir(parents=True, exist_ok=True)
+    statuses = []
+    try:
+        for path in tc_runner.selected(args):
+            plugin = CapturePlugin(store, index, work_dir, args.har, args.trace, args.screenshots)
+            run = await tc_runner.run_test_file(path, [plugin], args.timeout)
+            entries = index["tests"].get(run.test_id, {}).get("artifacts", [])
+            print(f"{run.test_id}: {run.status}, {len(entries)} artifacts, "
+                  f"{sum(e['size'] for e in entries) / 1e6:.1f} MB written, "
+                  f"{sum(e['added'] for e in entries) / 1e6:.1f} MB new in the store")
+            statuses.append(run.status)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    print(f"run {index['run_id']} in {store.index_path(index['run_id'])}")
+    return 0 if all(s == "passed" for s in statuses) else 1
+
+
+def ingest(args, store: ArtifactStore) -> int:
+    index = store.new_run(args.label)
+    files = []
+    for path in args.paths:
+        if not path.exists():
+            raise HarnessError(f"{path}: no such file or directory")
+        files += sorted(p for p in path.rglob("*") if p.is_file()) if path.is_dir() else [path]
+    for path in files:
+        test = args.test or (path.name.split("_", 1)[0].split("-", 1)[0] if path.name.startswith("TC") else "-")
+        entry = store.add(index, test, path)
+        print(f"{test} {entry['name']}: {entry['kind']}, {entry['size']} bytes, {entry['added']} new")
+    store.save_index(index)
+    print(f"run {index['run_id']} in {store.index_path(index['run_id'])}")
+    return 0
+
+
+def list_runs(args, store: ArtifactStore) -> int:
+    if args.run_id:
+        index = store.load_index(args.run_id)
+        rows = [(test, t["status"], e["name"], e["kind"], e["size"], e["added"], len(e["refs"]))
+                for test, t in sorted(index["tests"].items()) for e in t["artifacts"]]
+        print(report.markdown_table(("test", "status", "artifact", "kind", "bytes", "new bytes", "parts"), rows))
+        return 0
+    rows = []
+    for index in store.indexes():
+        entries = [e for t in index["tests"].values() for e in t["artifacts"]]
+        rows.append((index["run_id"], time.strftime("%Y-%m-%d %H:%M", time.localtime(index["created_at"])),
+                     len(index["tests"]), len(entries), sum(e["size"] for e in entries),
+                     sum(e["added"] for e in entries), "failed" if has_failures(index) else "ok",
+                     "yes" if index.get("pinned") else ""))
+    print(report.markdown_table(("run", "created", "tests", "artifacts", "bytes", "new bytes", "status", "pinned"),
+                                rows))
+    return 0
+
+
+def render_markdown(payload: dict) -> str:
+    usage_ = payload["usage"]
+    ratio = f"{usage_['ratio']:.1f}×" if usage_["ratio"] else "—"
+    return "\n".join([
+        "# Artifact store garbage collection",
+        "",
+        f"Generated {payload['generated_at']}{' (dry run)' if payload['dry_run'] else ''}: "
+        f"{len(payload['runs_deleted'])} runs and {payload['blobs_deleted']} blobs deleted, "
+        f"{payload['bytes_freed'] / 1e6:.1f} MB freed. The store now holds {usage_['runs']} runs in "
+        f"{usage_['stored_bytes'] / 1e6:.1f} MB for {usage_['logical_bytes'] / 1e6:.1f} MB of artifacts ({ratio}).",
+        "",
+        report.markdown_table(
+            ("kind", "artifacts", "written MB", "new MB"),
+            [(k, v["count"], v["size"] / 1e6, v["added"] / 1e6) for k, v in sorted(usage_["by_kind"].items())],
+        ),
+        "",
+        f"- deleted runs: {', '.join(payload['runs_deleted']) or 'none'}",
+    ])
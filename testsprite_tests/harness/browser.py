@@ -0,0 +1,33 @@
+"""Chromium launch shared by every browser-driven command.
+
+Launch flags match the generated ``TC*.py`` scripts so harness numbers are
+comparable with what the suite itself sees.
+"""
+
+from contextlib import asynccontextmanager
+
+from harness.deps import require
+
+LAUNCH_ARGS = [
+    "--window-size=1280,720",
+    "--disable-dev-shm-usage",
+    "--ipc=host",
+    "--single-process",
+]
+
+DEFAULT_TIMEOUT_MS = 5000
+
+
+@asynccontextmanager
+async def launch(headless: bool = True, extra_args=()):
+    """Yield ``(playwright, browser)`` and tear both down on exit."""
+    async_api = require("playwright.async_api")
+    pw = await async_api.async_playwright().start()
+    try:
+        browser = await pw.chromium.launch(headless=headless, args=LAUNCH_ARGS + list(extra_args))
+        try:
+            yield pw, browser
+        finally:
+            await browser.close()
+    finally:
+        await pw.stop()
@@ -0,0 +1,275 @@
+"""Page-weight and performance budget gate per app and route.
+
+Budgets live next to each app in ``apps/<app>/web/performance-budget.json``::
+
+    {
+      "role": "medico",
+      "default": {"js_bytes": 650000, "css_bytes": 120000, "image_bytes": 400000,
+                  "font_bytes": 150000, "requests": 90, "lcp_ms": 2500, "tbt_ms": 300},
+      "routes": {"/dashboard": {}, "/dashboard/consulta": {"js_bytes": 800000}}
+    }
+
+``default`` applies to every route of the app, entries under ``routes``
+override it. Byte budgets are the encoded (compressed) size of the
+resources a page loads, read from Resource Timing, so a warm HTTP cache does
+not hide growth. LCP comes from ``largest-contentful-paint`` entries and TBT
+is the sum of long-task time over 50 ms after first contentful paint.
+
+By default the TC flows run and every page they reach is measured. With
+``--budget-only`` no TC script runs: each app's budgeted routes are opened
+directly (signed in as the file's ``role``), which is quick enough for every
+PR. Any metric over budget fails the run (exit 1) and the report shows a diff
+against the last run that passed, kept in ``harness_output/budget/``.
+"""
+
+import asyncio
+import json
+import statistics
+import time
+from pathlib import Path
+
+from harness import browser, config, network, report, sessions, tc_runner
+from harness.errors import HarnessError
+
+BUDGET_FILE = "performance-budget.json"
+METRICS = ("js_bytes", "css_bytes", "image_bytes", "font_bytes", "requests", "lcp_ms", "tbt_ms")
+# Weights are a page's worst visit; timings are the median visit
+TIMINGS = ("lcp_ms", "tbt_ms")
+
+_VITALS_SCRIPT = """
+(() => {
+  const v = window.__harnessVitals = { lcp: null, fcp: null, tbt: 0 };
+  try { performance.setResourceTimingBufferSize(5000); } catch (e) {}
+  const observe = (type, each) => {
+    try { new PerformanceObserver((list) => list.getEntries().forEach(each)).observe({ type, buffered: true }); } catch (e) {}
+  };
+  observe("paint", (e) => { if (e.name === "first-contentful-paint") v.fcp = e.startTime; });
+  observe("largest-contentful-paint", (e) => { v.lcp = e.startTime; });
+  observe("longtask", (e) => { if (v.fcp !== null && e.startTime >= v.fcp) v.tbt += Math.max(0, e.duration - 50); });
+})();
+"""
+
+_MEASURE = """() => {
+  const out = { js_bytes: 0, css_bytes: 0, image_bytes: 0, font_bytes: 0, other_bytes: 0 };
+  const kind = (e) => {
+    const path = new URL(e.name).pathname;
+    if (e.initiatorType === "script" || /\\.m?js$/.test(path)) return "js_bytes";
+    if (/\\.css$/.test(path)) return "css_bytes";
+    if (e.initiatorType === "img" || /\\.(png|jpe?g|gif|webp|avif|svg|ico)$/.test(path)) return "image_bytes";
+    if (/\\.(woff2?|ttf|otf|eot)$/.test(path)) return "font_bytes";
+    return "other_bytes";
+  };
+  const entries = performance.getEntriesByType("resource");
+  for (const e of entries) out[kind(e)] += e.encodedBodySize || e.transferSize || 0;
+  const v = window.__harnessVitals || {};
+  return { ...out, requests: entries.length + 1, lcp_ms: v.lcp, tbt_ms: v.tbt,
+           url: location.href, origin: performance.timeOrigin };
+}"""
+
+
+def load_budgets(repo_dir: Path = None) -> dict:
+    """``{app: budget file contents}`` for every app that has one."""
+    budgets = {}
+    for path in sorted(Path(repo_dir or config.REPO_DIR).glob(f"apps/*/web/{BUDGET_FILE}")):
+        try:
+            budgets[path.parent.parent.name] = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            raise HarnessError(f"{path}: {exc}") from None
+    return budgets
+
+
+def limits_for(budgets: dict, app: str, route: str) -> dict:
+    budget = budgets.get(app)
+    if budget is None:
+        return None
+    return {**budget.get("default", {}), **budget.get("routes", {}).get(route, {})}
+
+
+class BudgetPlugin(tc_runner.Plugin):
+    """Measures page weight and vitals of every document a test loads."""
+
+    name = "budget"
+
+    def __init__(self, visits: dict):
+        self.visits = visits  # (page id, timeOrigin) -> latest measurement; shared across tests
+
+    async def on_context(self, run, context):
+        await context.add_init_script(script=_VITALS_SCRIPT)
+
+    async def on_step_start(self, run, step, page):
+        await measure(page, self.visits)
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            await measure(page, self.visits)
+
+
+async def measure(page, visits: dict):
+    """Record the current document's weight; later samples of it replace earlier ones."""
+    if page.is_closed() or not page.url.startswith("http"):
+        return
+    try:
+        sample = await page.evaluate(_MEASURE)
+    except Exception:
+        return  # mid-navigation
+    visits[(id(page), sample["origin"])] = sample
+
+
+def aggregate(visits) -> dict:
+    """``{(app, route): metrics}`` over all measured documents of budgeted apps."""
+    grouped = {}
+    for sample in visits:
+        app = config.app_for_url(sample["url"])
+        if app:
+            grouped.setdefault((app, network.route_of(sample["url"])), []).append(sample)
+    result = {}
+    for key, samples in grouped.items():
+        metrics = {}
+        for metric in METRICS:
+            values = [s[metric] for s in samples if s.get(metric) is not None]
+            if values:
+                metrics[metric] = statistics.median(values) if metric in TIMINGS else max(values)
+        metrics["visits"] = len(samples)
+        result[key] = metrics
+    return result
+
+
+def check(measured: dict, budgets: dict) -> list:
+    """One row per budgeted (app, route, metric) that was measured."""
+    rows = []
+    for (app, route), metrics in sorted(measured.items()):
+        limits = limits_for(budgets, app, route)
+        if not limits:
+            continue
+        for metric in METRICS:
+            if metric in limits and metric in metrics:
+                rows.append({
+                    "app": app, "route": route, "metric": metric,
+                    "value": metrics[metric], "budget": limits[metric],
+                    "over": metrics[metric] > limits[metric],
+                })
+    return rows
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--budget-only", action="store_true", help="skip TC flows; open budgeted routes directly")
+    parser.add_argument("--apps", default="", help="comma-separated apps for --budget-only (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="visits per route in --budget-only mode")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    budgets = load_budgets()
+    if not budgets:
+        raise HarnessError(f"no apps/*/web/{BUDGET_FILE} found")
+    visits = asyncio.run(_route_visits(args, budgets) if args.budget_only else _e2e_visits(args))
+    measured = aggregate(visits.values())
+    rows = check(measured, budgets)
+    green_path = Path(args.output_dir or config.OUTPUT_DIR) / "budget" / "last-green.json"
+    last_green = json.loads(green_path.read_text()) if green_path.exists() else {}
+    failed = any(r["over"] for r in rows)
+    payload = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": "budget-only" if args.budget_only else "e2e",
+        "passed": not failed,
+        "checks": rows,
+        "measured": {f"{app}:{route}": m for (app, route), m in measured.items()},
+        "last_green": last_green.get("generated_at"),
+        "diff": _diff(measured, last_green.get("measured", {})),
+    }
+    path = report.write_report("budget", payload, render_markdown(payload), args.output_dir)
+    print(f"budget report: {path}")
+    if failed:
+        return 1
+    green_path.parent.mkdir(parents=True, exist_ok=True)
+    green_path.write_text(json.dumps({"generated_at": payload["generated_at"], "measured": payload["measured"]},
+                                     indent=2))
+    return 0
+
+
+async def _e2e_visits(args) -> dict:
+    visits = {}
+    for path in tc_runner.selected(args):
+        run = await tc_runner.run_test_file(path, [BudgetPlugin(visits)], args.timeout)
+        print(f"{run.test_id}: {run.status}")
+    return visits
+
+
+async def _route_visits(args, budgets: dict) -> dict:
+    wanted = [a for a in args.apps.split(",") if a] or list(budgets)
+    visits = {}
+    async with browser.launch(headless=not args.headed) as (_, chromium):
+        for app in wanted:
+            if app not in budgets:
+                raise HarnessError(f"{app} has no {BUDGET_FILE}")
+            role = budgets[app].get("role")
+            options = {"storage_state": str(await sessions.storage_state(chromium, role))} if role else {}
+            for route in budgets[app].get("routes", {}):
+                for _ in range(args.repeat):
+                    # A fresh context per visit keeps every measurement cold
+                    context = await chromium.new_context(**options)
+                    try:
+                        await context.add_init_script(script=_VITALS_SCRIPT)
+                        page = await context.new_page()
+                        await page.goto(config.app_url(app) + route, wait_until="load")
+                        await page.wait_for_timeout(1000)  # let LCP and late chunks settle
+                        await measure(page, visits)
+                    finally:
+                        await context.close()
+                print(f"{app}{route}: measured")
+    return visits
+
+
+def _diff(measured: dict, previous: dict) -> list:
+    rows = []
+    for (app, route), metrics in sorted(measured.items()):
+        before = previous.get(f"{app}:{route}", {})
+        for metric in METRICS:
+            if metric in metrics and before.get(metric) is not None:
+                rows.append({"route": f"{app}:{route}", "metric": metric, "last_green": before[metric],
+                             "now": metrics[metric], "delta": metrics[metric] - before[metric]})
+    return rows
+
+
+def render_markdown(payload: dict) -> str:
+    over = [r for r in payload["checks"] if r["over"]]
+    verdict = "PASSED" if payload["passed"] else f"FAILED — {len(over)} metrics over budget"
+    lines = [
+        "# Performance budgets",
+        "",
+        f"Generated {payload['generated_at']} ({payload['mode']}): **{verdict}**.",
+        "",
+    ]
+    if over:
+        lines += [
+            report.markdown_table(
+                ("route", "metric", "value", "budget", "over by"),
+                [(f"{r['app']}:{r['route']}", r["metric"], r["value"], r["budget"], r["value"] - r["budget"])
+                 for r in over],
+            ),
+            "",
+        ]
+    changed = [d for d in payload["diff"] if d["delta"]]
+    if payload["last_green"]:
+        lines += [f"## Diff against last green run ({payload['last_green']})", ""]
+        lines.append(
+            report.markdown_table(
+                ("route", "metric", "last green", "now", "delta"),
+                [(d["route"], d["metric"], d["last_green"], d["now"], f"{d['delta']:+}") for d in changed],
+            )
+            if changed else "No change."
+        )
+    else:
+        lines.append("No previous green run to diff against.")
+    lines += [
+        "",
+        "## All checks",
+        "",
+        report.markdown_table(
+            ("route", "metric", "value", "budget", ""),
+            [(f"{r['app']}:{r['route']}", r["metric"], r["value"], r["budget"], "OVER" if r["over"] else "ok")
+             for r in payload["checks"]],
+        ),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,285 @@
+"""HTTP caching and conditional-request audit, cold visit vs repeat visit.
+
+Every route is loaded twice in the same fresh browser context: a cold visit
+with an empty HTTP cache, then — after leaving for ``about:blank`` — a warm
+visit, the way a doctor comes back to a page during a shift. Chrome's own
+view of each response comes from CDP (status, ``Cache-Control``, ``ETag``,
+``Last-Modified``, whether it was served from memory or disk cache, bytes on
+the wire), so the audit sees exactly what the browser cache did.
+
+Per route it reports cold and repeat-visit transfer, the share of warm
+requests served from cache or revalidated with a 304, and the responses that
+were downloaded again unchanged — with the headers that would have let the
+browser keep them.
+
+Routes come from running the TC scripts (each route reuses the signed-in
+storage state of the test that reached it) or from ``--urls`` with an
+optional ``--role`` to sign in through the cached sessions.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from urllib.parse import urlsplit
+
+from harness import browser, network, report, sessions, tc_runner
+
+API_TYPES = ("Document", "Fetch", "XHR")
+
+
+class RouteCollector(tc_runner.Plugin):
+    """Pages a TC script visits, with the storage state that reached them."""
+
+    name = "routes"
+
+    def __init__(self):
+        self.urls = []
+        self.state = None
+
+    async def on_step_end(self, run, step, page):
+        if not page.is_closed() and page.url.startswith("http"):
+            self.urls.append(page.url)
+
+    async def before_context_close(self, run, context):
+        self.state = await context.storage_state()
+
+
+class _Capture:
+    """CDP Network events of one visit, keyed by request id."""
+
+    def __init__(self, session):
+        self.session = session
+        self.responses = {}
+        self._pending = set()
+        session.on("Network.responseReceived", self._on_response)
+        session.on("Network.requestServedFromCache", self._on_served_from_cache)
+        session.on("Network.loadingFinished", self._on_finished)
+
+    def reset(self):
+        self.responses = {}
+
+    def _on_response(self, params):
+        response = params["response"]
+        headers = {k.lower(): v for k, v in response.get("headers", {}).items()}
+        entry = self.responses.setdefault(params["requestId"], {})
+        entry.update(
+            url=response["url"],
+            type=params.get("type", "Other"),
+            status=response["status"],
+            from_cache=entry.get("from_cache", False) or response.get("fromDiskCache", False)
+            or response.get("fromPrefetchCache", False),
+            cache_control=headers.get("cache-control", ""),
+            etag=headers.get("etag", ""),
+            last_modified=headers.get("last-modified", ""),
+            bytes=0,
+        )
+
+    def _on_served_from_cache(self, params):
+        self.responses.setdefault(params["requestId"], {})["from_cache"] = True
+
+    def _on_finished(self, params):
+        entry = self.responses.get(params["requestId"])
+        if entry is None or "url" not in entry:
+            return
+        entry["bytes"] = params.get("encodedDataLength", 0)
+        if entry["type"] in API_TYPES and not entry["from_cache"] and entry["status"] == 200:
+            task = asyncio.ensure_future(self._hash_body(params["requestId"], entry))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _hash_body(self, request_id: str, entry: dict):
+        try:
+            body = await self.session.send("Network.getResponseBody", {"requestId": request_id})
+        except Exception:
+            return  # evicted or redirected
+        entry["hash"] = hashlib.sha1(body.get("body", "").encode()).hexdigest()
+
+    async def settle(self) -> list:
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+        return [e for e in self.responses.values() if "url" in e]
+
+
+def cacheability(entry: dict) -> str:
+    """What the response headers allow: ``no-store``, ``fresh``, ``validators`` or ``none``."""
+    cache_control = entry["cache_control"].lower()
+    if "no-store" in cache_control:
+        return "no-store"
+    max_age = re.search(r"(?:s-)?max-age=(\d+)", cache_control)
+    if "immutable" in cache_control or (max_age and int(max_age.group(1)) > 0 and "no-cache" not in cache_control):
+        return "fresh"
+    if entry["etag"] or entry["last_modified"]:
+        return "validators"
+    return "none"
+
+
+def compare_visits(cold: list, warm: list) -> dict:
+    """Repeat-visit numbers for one route and its re-downloaded responses."""
+    cold_by_url = {}
+    for entry in cold:
+        cold_by_url.setdefault(entry["url"], entry)
+    cached = sum(1 for e in warm if e["from_cache"])
+    revalidated = sum(1 for e in warm if e["status"] == 304)
+    redownloaded = []
+    for entry in warm:
+        before = cold_by_url.get(entry["url"])
+        if entry["from_cache"] or entry["status"] != 200 or before is None:
+            continue
+        unchanged = entry.get("hash") == before.get("hash") if "hash" in entry else entry["bytes"] == before["bytes"]
+        if unchanged:
+            redownloaded.append({
+                "url": entry["url"],
+                "type": entry["type"],
+                "bytes": entry["bytes"],
+                "headers": cacheability(before),
+                "cache_control": before["cache_control"],
+                "etag": bool(before["etag"]),
+                "last_modified": bool(before["last_modified"]),
+                "fix": _fix(before),
+            })
+    return {
+        "cold_requests": len(cold),
+        "cold_bytes": sum(e["bytes"] for e in cold),
+        "warm_requests": len(warm),
+        "repeat_visit_bytes": sum(e["bytes"] for e in warm),
+        "cache_hit_rate": cached / len(warm) if warm else 0.0,
+        "revalidated_304": revalidated,
+        "rate_304": revalidated / len(warm) if warm else 0.0,
+        "redownloaded_unchanged": len(redownloaded),
+        "redownloaded_bytes": sum(r["bytes"] for r in redownloaded),
+        "by_type": _by_type(warm),
+        "offenders": sorted(redownloaded, key=lambda r: r["bytes"], reverse=True),
+    }
+
+
+def _fix(entry: dict) -> str:
+    kind = cacheability(entry)
+    if kind == "none":
+        return "send ETag or Last-Modified (or Cache-Control: max-age)"
+    if kind == "validators":
+        return "validators present but not used; check Vary/no-cache and that the ETag is stable"
+    if kind == "no-store":
+        return "no-store on unchanged data; allow private caching with revalidation"
+    return "fresh per headers but refetched; check cache-busting query params or Vary"
+
+
+def _by_type(entries: list) -> dict:
+    result = {}
+    for e in entries:
+        bucket = result.setdefault(e["type"], {"requests": 0, "bytes": 0, "from_cache": 0, "304": 0})
+        bucket["requests"] += 1
+        bucket["bytes"] += e["bytes"]
+        bucket["from_cache"] += int(e["from_cache"])
+        bucket["304"] += int(e["status"] == 304)
+    return result
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--urls", default="", help="comma-separated page URLs to audit instead of running TCs")
+    parser.add_argument("--role", help="sign in as this role for --urls")
+    parser.add_argument("--settle", choices=("load", "networkidle"), default="networkidle")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    payload = asyncio.run(audit(args))
+    path = report.write_report("cache-audit", payload, render_markdown(payload), args.output_dir)
+    print(f"cache-audit report: {path}")
+    return 0
+
+
+async def audit(args) -> dict:
+    routes = []
+    async with browser.launch(headless=not args.headed) as (_, chromium):
+        targets = await _targets(args, chromium)
+        for (origin, route), (url, state) in targets.items():
+            try:
+                result = await _two_visits(chromium, url, state, args.settle)
+            except Exception as exc:  # one broken page should not sink the audit
+                result = {"error": f"{type(exc).__name__}: {exc}"}
+            print(f"{origin}{route}: {result.get('repeat_visit_bytes', result.get('error'))}")
+            routes.append({"origin": origin, "route": route, "url": url, **result})
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "routes": routes,
+    }
+
+
+async def _targets(args, chromium) -> dict:
+    """(origin, route) -> (first URL seen, storage state)."""
+    targets = {}
+    if args.urls:
+        state = str(await sessions.storage_state(chromium, args.role)) if args.role else None
+        for url in (u for u in args.urls.split(",") if u):
+            targets[_key(url)] = (url, state)
+        return targets
+    for path in tc_runner.selected(args):
+        collector = RouteCollector()
+        run = await tc_runner.run_test_file(path, [collector], args.timeout)
+        print(f"{run.test_id}: {run.status}, {len(set(collector.urls))} pages")
+        for url in collector.urls:
+            targets.setdefault(_key(url), (url, collector.state))
+    return targets
+
+
+def _key(url: str) -> tuple:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}", network.route_of(url)
+
+
+async def _two_visits(chromium, url: str, state, settle: str) -> dict:
+    context = await chromium.new_context(storage_state=state)
+    try:
+        page = await context.new_page()
+        session = await context.new_cdp_session(page)
+        capture = _Capture(session)
+        await session.send("Network.enable")
+        await page.goto(url, wait_until=settle)
+        cold = await capture.settle()
+        await page.goto("about:blank")
+        capture.reset()
+        await page.goto(url, wait_until=settle)
+        warm = await capture.settle()
+    finally:
+        await context.close()
+    return compare_visits(cold, warm)
+
+
+def render_markdown(payload: dict) -> str:
+    ok = [r for r in payload["routes"] if "error" not in r]
+    rows = [
+        (
+            r["origin"] + r["route"],
+            r["cold_bytes"],
+            r["repeat_visit_bytes"],
+            f"{r['cache_hit_rate']:.0%}",
+            f"{r['rate_304']:.0%}",
+            r["redownloaded_unchanged"],
+            r["redownloaded_bytes"],
+        )
+        for r in sorted(ok, key=lambda r: r["repeat_visit_bytes"], reverse=True)
+    ]
+    lines = [
+        "# Repeat-visit transfer",
+        "",
+        f"Generated {payload['generated_at']}: {len(ok)} routes, "
+        f"{sum(r['repeat_visit_bytes'] for r in ok)} bytes transferred on repeat visits, "
+        f"{sum(r['redownloaded_bytes'] for r in ok)} of them unchanged data.",
+        "",
+        report.markdown_table(
+            ("route", "cold bytes", "repeat-visit bytes", "cache hits", "304s", "unchanged refetches", "wasted bytes"),
+            rows,
+        ),
+    ]
+    offenders = [(r["origin"] + r["route"], o) for r in ok for o in r["offenders"]]
+    offenders.sort(key=lambda item: item[1]["bytes"], reverse=True)
+    if offenders:
+        lines += ["", "## Cacheable but not cached", ""]
+        lines += [f"- {o['bytes']} B `{o['url'][:100]}` ({o['type']}, on {route}): {o['fix']}"
+                  for route, o in offenders[:30]]
+    failed = [r for r in payload["routes"] if "error" in r]
+    if failed:
+        lines += ["", "## Not audited", ""] + [f"- {r['url']}: {r['error']}" for r in failed]
+    return "\n".join(lines)
@@ -0,0 +1,392 @@
+"""Fault injection between the browser and the backend.
+
+Runs TC scripts with ``context.route`` handlers that degrade matching
+requests: added latency (fixed, uniform, lognormal or exponential), requests
+that hang and then time out, 5xx responses, bodies cut short and connection
+resets. Each rule targets a URL pattern, fires with a probability, and can be
+limited to a window of the test (``window=10-40``) or to periodic bursts
+(``burst=20:5`` — five seconds out of every twenty).
+
+While faults fire the harness records how the frontend reacts:
+
+- retries — the same method and URL requested again after a fault, and (with
+  ``--baseline``) how many requests hit the faulted endpoints compared with a
+  clean run, i.e. whether a degraded backend gets *more* load;
+- time until the UI shows an error (alert roles, toasts, error wording);
+- hangs — a loading indicator such as "Iniciando sesión..." or a spinner
+  staying visible longer than ``--hang-threshold``.
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from harness import report, stats, tc_runner
+from harness.deps import require
+from harness.errors import HarnessError
+
+KINDS = ("latency", "timeout", "error", "truncate", "reset")
+
+PRESETS = {
+    "auth-stall": ["timeout@/auth/v1/token hang_s=30"],
+    "rest-5xx-burst": ["error@/rest/v1/ status=503 burst=20:5"],
+    "slow-backend": ["latency@/(rest|auth)/v1/|/api/ dist=lognormal:1500:0.6"],
+    "flaky-network": ["reset@/rest/v1/ p=0.1", "truncate@/rest/v1/ p=0.1"],
+}
+
+# Polled in every document; navigation starts a fresh record
+_UI_SCRIPT = """
+(() => {
+  const cfg = %s;
+  const state = window.__harnessUi = { errorAt: null, errorText: null, busySince: null, longestBusyMs: 0, busyText: null };
+  const errorRe = new RegExp(cfg.errorPattern, "i");
+  const busyRe = new RegExp(cfg.busyPattern, "i");
+  const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+  const check = () => {
+    if (!document.body) return;
+    const now = Date.now();
+    const text = document.body.innerText || "";
+    if (state.errorAt === null) {
+      const el = [...document.querySelectorAll(cfg.errorSelectors)].find(visible);
+      const match = el ? el.innerText : (text.match(errorRe) || [])[0];
+      if (match) { state.errorAt = now; state.errorText = match.slice(0, 200); }
+    }
+    const el = [...document.querySelectorAll(cfg.busySelectors)].find(visible);
+    const busy = el ? (el.innerText || el.className || "spinner") : (text.match(busyRe) || [])[0];
+    if (busy) {
+      if (state.busySince === null) { state.busySince = now; state.busyText = String(busy).slice(0, 120); }
+      state.longestBusyMs = Math.max(state.longestBusyMs, now - state.busySince);
+    } else {
+      state.busySince = null;
+    }
+  };
+  setInterval(check, 250);
+})();
+"""
+
+UI_PATTERNS = {
+    "errorSelectors": "[role=alert], [data-sonner-toast][data-type=error], .text-destructive, .text-red-600",
+    "errorPattern": "error|no se pudo|fall[oó]|int[eé]nt(a|alo) de nuevo|credenciales inv[aá]lidas",
+    "busySelectors": "[aria-busy=true], .animate-spin",
+    "busyPattern": "Iniciando sesi[oó]n\\.\\.\\.|Cargando\\.\\.\\.|Procesando\\.\\.\\.|Guardando\\.\\.\\.|Enviando\\.\\.\\.",
+}
+
+
+def ui_script() -> str:
+    """Init script keeping ``window.__harnessUi`` (first error shown, longest busy state)."""
+    return _UI_SCRIPT % json.dumps(UI_PATTERNS)
+
+
+@dataclass
+class FaultRule:
+    """One fault: what to inject, for which URLs, and when."""
+
+    kind: str
+    pattern: str
+    probability: float = 1.0
+    dist: str = "fixed:0"
+    status: int = 503
+    hang_s: float = 30.0
+    truncate_ratio: float = 0.5
+    window: tuple = (0.0, float("inf"))
+    burst: tuple = None
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}@{self.pattern}"
+
+    def matches(self, url: str) -> bool:
+        return re.search(self.pattern, url) is not None
+
+    def active(self, elapsed_s: float) -> bool:
+        if not self.window[0] <= elapsed_s < self.window[1]:
+            return False
+        if self.burst:
+            every, length = self.burst
+            return (elapsed_s - self.window[0]) % every < length
+        return True
+
+    def delay_s(self, rng: random.Random) -> float:
+        return sample_ms(self.dist, rng) / 1000
+
+
+def sample_ms(dist: str, rng: random.Random) -> float:
+    """Draw from ``fixed:MS``, ``uniform:LO:HI``, ``lognormal:MEDIAN:SIGMA`` or ``exp:MEAN``."""
+    name, *params = dist.split(":")
+    try:
+        values = [float(p) for p in params]
+        if name == "fixed":
+            return values[0]
+        if name == "uniform":
+            return rng.uniform(values[0], values[1])
+        if name == "lognormal":
+            return rng.lognormvariate(math.log(values[0]), values[1])
+        if name == "exp":
+            return rng.expovariate(1 / values[0])
+    except (IndexError, ValueError, ZeroDivisionError):
+        pass
+    raise HarnessError(f"bad distribution {dist!r}")
+
+
+def parse_rule(spec: str) -> FaultRule:
+    """``KIND@PATTERN [p=0.5] [dist=...] [status=502] [hang_s=30] [window=10-40] [burst=20:5]``."""
+    head, *options = spec.split()
+    kind, sep, pattern = head.partition("@")
+    if not sep or kind not in KINDS or not pattern:
+        raise HarnessError(f"bad fault {spec!r}: expected KIND@PATTERN with KIND in {', '.join(KINDS)}")
+    rule = FaultRule(kind, pattern)
+    for option in options:
+        key, _, value = option.partition("=")
+        try:
+            if key == "p":
+                rule.probability = float(value)
+            elif key == "dist":
+                rule.dist = value
+            elif key == "status":
+                rule.status = int(value)
+            elif key == "hang_s":
+                rule.hang_s = float(value)
+            elif key == "ratio":
+                rule.truncate_ratio = float(value)
+            elif key == "window":
+                start, _, end = value.partition("-")
+                rule.window = (float(start or 0), float(end) if end else float("inf"))
+            elif key == "burst":
+                every, _, length = value.partition(":")
+                rule.burst = (float(every), float(length))
+            else:
+                raise HarnessError(f"unknown fault option {key!r} in {spec!r}")
+        except ValueError:
+            raise HarnessError(f"bad value for {key!r} in {spec!r}") from None
+    return rule
+
+
+def load_rules(args) -> list:
+    specs = []
+    for name in args.preset:
+        if name not in PRESETS:
+            raise HarnessError(f"unknown preset {name!r} (known: {', '.join(PRESETS)})")
+        specs += PRESETS[name]
+    if args.rules:
+        specs += json.loads(Path(args.rules).read_text(encoding="utf-8"))
+    specs += args.fault
+    if not specs:
+        raise HarnessError("no faults given; use --fault, --preset or --rules")
+    return [parse_rule(spec) for spec in specs]
+
+
+class ChaosPlugin(tc_runner.Plugin):
+    """Injects faults into every context of a test and watches the reaction."""
+
+    name = "chaos"
+
+    def __init__(self, rules, seed: int = None, retry_window_s: float = 10.0, inject: bool = True):
+        self.rules = rules
+        self.rng = random.Random(seed)
+        self.retry_window_s = retry_window_s
+        self.inject = inject
+        self.started = None
+        self.requests = []
+        self.faults = []
+        self.ui = {"error_at": None, "error_text": None, "longest_busy_ms": 0, "busy_text": None, "busy_at_end": False}
+
+    async def on_test_start(self, run):
+        self.started = time.monotonic()
+
+    async def on_context(self, run, context):
+        context.on("request", self._on_request)
+        await context.add_init_script(script=ui_script())
+        if self.inject:
+            await context.route("**/*", self._handle)
+
+    def _on_request(self, request):
+        self.requests.append((time.time() * 1000, request.method, request.url))
+
+    async def _handle(self, route, request):
+        async_api = require("playwright.async_api")
+        elapsed = time.monotonic() - self.started
+        rule = next(
+            (r for r in self.rules if r.matches(request.url) and r.active(elapsed) and self.rng.random() < r.probability),
+            None,
+        )
+        try:
+            if rule is None:
+                await route.continue_()
+                return
+            self.faults.append((time.time() * 1000, request.method, request.url, rule.label))
+            if rule.kind == "latency":
+                await asyncio.sleep(rule.delay_s(self.rng))
+                await route.continue_()
+            elif rule.kind == "timeout":
+                await asyncio.sleep(rule.hang_s)
+                await route.abort("timedout")
+            elif rule.kind == "error":
+                await asyncio.sleep(rule.delay_s(self.rng))
+                body = json.dumps({"message": "injected by harness chaos", "code": str(rule.status)})
+                await route.fulfill(status=rule.status, body=body, content_type="application/json")
+            elif rule.kind == "truncate":
+                response = await route.fetch()
+                body = await response.body()
+                await route.fulfill(response=response, body=body[: int(len(body) * rule.truncate_ratio)])
+            elif rule.kind == "reset":
+                await asyncio.sleep(rule.delay_s(self.rng))
+                await route.abort("connectionreset")
+        except async_api.Error:
+            pass  # the page or context went away while the fault was pending
+
+    async def on_step_end(self, run, step, page):
+        await self._collect(page)
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            await self._collect(page, final=True)
+
+    async def _collect(self, page, final: bool = False):
+        if page.is_closed():
+            return
+        try:
+            state = await page.evaluate("window.__harnessUi || null")
+        except Exception:
+            return  # mid-navigation
+        if not state:
+            return
+        if state["errorAt"] and (self.ui["error_at"] is None or state["errorAt"] < self.ui["error_at"]):
+            self.ui["error_at"], self.ui["error_text"] = state["errorAt"], state["errorText"]
+        if state["longestBusyMs"] > self.ui["longest_busy_ms"]:
+            self.ui["longest_busy_ms"], self.ui["busy_text"] = state["longestBusyMs"], state["busyText"]
+        if final:
+            self.ui["busy_at_end"] = self.ui["busy_at_end"] or state["busySince"] is not None
+
+    async def on_test_end(self, run):
+        run.data[self.name] = self.summary()
+
+    def summary(self) -> dict:
+        matching = [r for r in self.requests if any(rule.matches(r[2]) for rule in self.rules)]
+        first_fault = self.faults[0][0] if self.faults else None
+        error_at = self.ui["error_at"]
+        return {
+            "requests": len(self.requests),
+            "matching_requests": len(matching),
+            "faults": _count(f[3] for f in self.faults),
+            "faults_injected": len(self.faults),
+            "retries": self._retries(),
+            "error_shown_ms": error_at - first_fault if error_at and first_fault and error_at >= first_fault else None,
+            "error_text": self.ui["error_text"],
+            "longest_busy_ms": self.ui["longest_busy_ms"],
+            "busy_text": self.ui["busy_text"],
+            "busy_at_end": self.ui["busy_at_end"],
+        }
+
+    def _retries(self) -> int:
+        """Requests repeating a faulted method+URL within the retry window."""
+        retries = 0
+        for at, method, url in self.requests:
+            if any(m == method and u == url and f_at < at <= f_at + self.retry_window_s * 1000
+                   for f_at, m, u, _ in self.faults):
+                retries += 1
+        return retries
+
+
+def _count(labels) -> dict:
+    counts = {}
+    for label in labels:
+        counts[label] = counts.get(label, 0) + 1
+    return counts
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--fault", action="append", default=[], help="KIND@PATTERN [p=] [dist=] [status=] "
+                        "[hang_s=] [ratio=] [window=START-END] [burst=EVERY:LEN]; repeatable")
+    parser.add_argument("--preset", action="append", default=[], help=f"one of {', '.join(PRESETS)}; repeatable")
+    parser.add_argument("--rules", help="JSON file with a list of fault specs")
+    parser.add_argument("--baseline", action="store_true", help="run each test without faults first")
+    parser.add_argument("--hang-threshold", type=float, default=10.0, help="seconds a loading indicator may stay")
+    parser.add_argument("--retry-window", type=float, default=10.0, help="seconds after a fault counted as retry")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def run(args) -> int:
+    rules = load_rules(args)
+    payload = asyncio.run(experiment(args, rules))
+    path = report.write_report("chaos", payload, render_markdown(payload), args.output_dir)
+    print(f"chaos report: {path}")
+    return 1 if any(t["hung"] for t in payload["tests"]) else 0
+
+
+async def experiment(args, rules) -> dict:
+    paths = tc_runner.selected(args)
+    baseline = {}
+    if args.baseline:
+        clean = await tc_runner.run_suite(
+            paths, lambda: [ChaosPlugin(rules, inject=False)], args.timeout
+        )
+        baseline = {r.test_id: r.data["chaos"]["matching_requests"] for r in clean}
+    runs = await tc_runner.run_suite(
+        paths, lambda: [ChaosPlugin(rules, args.seed, args.retry_window)], args.timeout
+    )
+
+    tests = []
+    for r in runs:
+        data = r.data["chaos"]
+        clean_count = baseline.get(r.test_id)
+        tests.append({
+            "test_id": r.test_id,
+            "status": r.status,
+            "error": r.error,
+            **data,
+            "baseline_matching_requests": clean_count,
+            "amplification": data["matching_requests"] / clean_count if clean_count else None,
+            "hung": data["longest_busy_ms"] >= args.hang_threshold * 1000
+                    or (data["busy_at_end"] and r.status != "passed"),
+        })
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rules": [rule.label for rule in rules],
+        "hang_threshold_s": args.hang_threshold,
+        "tests": tests,
+        "error_shown_ms": stats.summarize(t["error_shown_ms"] for t in tests if t["error_shown_ms"] is not None),
+        "retries": sum(t["retries"] for t in tests),
+        "faults_injected": sum(t["faults_injected"] for t in tests),
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (
+            t["test_id"],
+            t["status"],
+            t["faults_injected"],
+            t["retries"],
+            f"{t['amplification']:.2f}x" if t["amplification"] is not None else None,
+            t["error_shown_ms"],
+            t["longest_busy_ms"],
+            "HUNG" if t["hung"] else "",
+        )
+        for t in payload["tests"]
+    ]
+    shown = payload["error_shown_ms"]
+    lines = [
+        "# Fault injection",
+        "",
+        f"Generated {payload['generated_at']} with faults: {', '.join(payload['rules'])}.",
+        "",
+        f"{payload['faults_injected']} faults injected, {payload['retries']} retries issued by the frontend.",
+        f"Error shown after a fault in {shown['n']} tests (p50 {shown.get('p50', 0):.0f} ms).",
+        "",
+        report.markdown_table(
+            ("test", "status", "faults", "retries", "load vs clean", "error shown ms", "longest busy ms", "hang"),
+            rows,
+        ),
+    ]
+    hung = [t for t in payload["tests"] if t["hung"]]
+    if hung:
+        lines += ["", "## Hangs", ""]
+        lines += [f"- {t['test_id']}: \"{t['busy_text']}\" visible for {t['longest_busy_ms'] / 1000:.1f} s"
+                  for t in hung]
+    return "\n".join(lines)
@@ -0,0 +1,186 @@
+"""Step-level checkpoints for long TC flows, and resuming from them.
+
+While a script runs, a checkpoint is taken just before the scheduled steps
+(``--every N`` or ``--at 12,20``): the context's storage state (cookies and
+localStorage, so the Supabase session survives), the page URL, the
+signatures of the steps already done and a seed-data marker naming the
+database state — ``HARNESS_SEED_MARKER`` if set, else a hash of
+``supabase/seed.sql`` and the migrations. Checkpoints live in
+``harness_output/checkpoints/<TC>/``.
+
+``--resume`` restarts a test from its latest checkpoint before the step that
+last failed (or before ``--from``): the context starts from the saved
+storage state, every earlier step and pause of the script is skipped, and
+the saved URL is opened before the first step that runs. An edited script
+resumes as long as the steps before the checkpoint are unchanged; otherwise
+the run stops and names the first step that differs. A checkpoint taken
+against another seed marker is refused unless ``--force`` is given, since
+the data earlier steps created may no longer exist.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from harness import config, report, tc_runner
+from harness.errors import HarnessError
+
+MANIFEST = "latest.json"
+
+
+def checkpoint_dir(output_dir, test: str) -> Path:
+    return Path(output_dir or config.OUTPUT_DIR) / "checkpoints" / test
+
+
+def seed_marker() -> str:
+    if config.SEED_MARKER:
+        return config.SEED_MARKER
+    supabase = config.REPO_DIR / "supabase"
+    digest = hashlib.sha1()
+    for path in [supabase / "seed.sql", *sorted((supabase / "migrations").glob("*.sql"))]:
+        if path.exists():
+            digest.update(path.name.encode())
+            digest.update(path.read_bytes())
+    return f"files:{digest.hexdigest()[:12]}"
+
+
+def schedule(every: int = 0, at: str = ""):
+    """Predicate over step indexes that get a checkpoint."""
+    explicit = {int(i) for i in at.split(",") if i.strip()}
+    return lambda index: index in explicit or (every > 0 and index > 0 and index % every == 0)
+
+
+class CheckpointPlugin(tc_runner.Plugin):
+    """Saves a checkpoint before every scheduled step."""
+
+    name = "checkpoint"
+
+    def __init__(self, directory: Path, wanted, marker: str):
+        self.directory = directory
+        self.wanted = wanted
+        self.marker = marker
+        self.saved = []
+
+    async def on_test_start(self, run):
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    async def on_step_start(self, run, step, page):
+        resume = run.options.get("resume")
+        if not self.wanted(step.index) or not page.url.startswith("http"):
+            return
+        if resume and step.index == resume["step"]:
+            return  # that is the checkpoint we started from
+        state_path = self.directory / f"step-{step.index:03d}.storage.json"
+        await page.context.storage_state(path=str(state_path))
+        elapsed_s = (time.time() * 1000 - run.started_at) / 1000 + (resume["elapsed_s"] if resume else 0.0)
+        checkpoint = {
+            "test_id": run.test_id,
+            "step": step.index,
+            "url": page.url,
+            "storage_state": str(state_path),
+            "signatures": [s.signature for s in run.steps[: step.index]],
+            "seed_marker": self.marker,
+            "elapsed_s": elapsed_s,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        (self.directory / f"step-{step.index:03d}.json").write_text(json.dumps(checkpoint, indent=2))
+        self.saved.append(step.index)
+
+    async def on_test_end(self, run):
+        failed = next((s.index for s in run.steps if s.error), None)
+        manifest = {
+            "test_id": run.test_id,
+            "status": run.status,
+            "failed_step": failed if failed is not None else (len(run.steps) if run.status != "passed" else None),
+            "finished_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        (self.directory / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+
+def available(directory: Path) -> list:
+    return sorted(
+        (json.loads(p.read_text()) for p in directory.glob("step-[0-9][0-9][0-9].json")),
+        key=lambda c: c["step"],
+    )
+
+
+def pick(directory: Path, before: int = None, marker: str = None, force: bool = False) -> dict:
+    """Latest checkpoint at or before ``before`` (default: the last failed step)."""
+    checkpoints = available(directory)
+    if not checkpoints:
+        raise HarnessError(f"no checkpoints in {directory}")
+    if before is None and (directory / MANIFEST).exists():
+        before = json.loads((directory / MANIFEST).read_text()).get("failed_step")
+    usable = [c for c in checkpoints if before is None or c["step"] <= before]
+    if not usable:
+        raise HarnessError(f"no checkpoint at or before step {before} in {directory}")
+    chosen = usable[-1]
+    if marker and chosen["seed_marker"] != marker and not force:
+        raise HarnessError(
+            f"checkpoint {chosen['step']} was taken against seed {chosen['seed_marker']}, "
+            f"database is now {marker} (use --force to resume anyway)"
+        )
+    return chosen
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--every", type=int, default=5, help="checkpoint before every Nth step (0: off)")
+    parser.add_argument("--at", default="", help="comma-separated step indexes to checkpoint before")
+    parser.add_argument("--resume", action="store_true", help="start from the latest usable checkpoint")
+    parser.add_argument("--from", dest="from_step", type=int, help="resume from the latest checkpoint ≤ this step")
+    parser.add_argument("--force", action="store_true", help="resume even if the seed marker changed")
+
+
+def run(args) -> int:
+    payload = asyncio.run(run_with_checkpoints(args))
+    path = report.write_report("checkpoint", payload, render_markdown(payload), args.output_dir)
+    print(f"checkpoint report: {path}")
+    return 0 if all(t["status"] == "passed" for t in payload["tests"]) else 1
+
+
+async def run_with_checkpoints(args) -> dict:
+    marker, wanted, tests = seed_marker(), schedule(args.every, args.at), []
+    for path in tc_runner.selected(args):
+        test = tc_runner.test_id(path)
+        directory = checkpoint_dir(args.output_dir, test)
+        options = {}
+        if args.resume or args.from_step is not None:
+            options["resume"] = pick(directory, args.from_step, marker, args.force)
+        plugin = CheckpointPlugin(directory, wanted, marker)
+        run = await tc_runner.run_test_file(path, [plugin], args.timeout, options)
+        resume = options.get("resume")
+        print(f"{test}: {run.status}" + (f" (resumed at step {resume['step']})" if resume else ""))
+        tests.append({
+            "test_id": test,
+            "status": run.status,
+            "error": run.error,
+            "resumed_from": resume["step"] if resume else None,
+            "skipped_steps": sum(1 for s in run.steps if s.skipped),
+            "replay_saved_s": resume["elapsed_s"] if resume else 0.0,
+            "duration_s": run.duration_s,
+            "checkpoints": plugin.saved,
+            "failed_step": next((s.index for s in run.steps if s.error), None),
+        })
+    return {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "seed_marker": marker, "tests": tests}
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (t["test_id"], t["status"], t["resumed_from"], t["skipped_steps"], t["replay_saved_s"], t["duration_s"],
+         ", ".join(map(str, t["checkpoints"])), t["failed_step"], t["error"])
+        for t in payload["tests"]
+    ]
+    return "\n".join([
+        "# Checkpointed runs",
+        "",
+        f"Generated {payload['generated_at']} against seed `{payload['seed_marker']}`.",
+        "",
+        report.markdown_table(
+            ("test", "status", "resumed at", "skipped steps", "replay saved s", "duration s", "checkpoints",
+             "failed step", "error"),
+            rows,
+        ),
+    ])
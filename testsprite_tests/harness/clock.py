@@ -0,0 +1,277 @@
+"""Virtual time for time-dependent flows.
+
+Some behaviour only appears after real time passes: the POS session timeout
+(``NEXT_PUBLIC_POS_TIMEOUT_MINUTES``), inventory expiry warnings
+(``NEXT_PUBLIC_EXPIRY_WARNING_DAYS`` / ``_CRITICAL_DAYS``), the 90-day account
+deletion grace period and the 24-hour stuck-appointment cutoff. Jumps move
+three clocks together:
+
+* the browser, through Playwright's clock (``BrowserContext.clock``,
+  Playwright 1.45+): ``Date`` and timers are faked from the first script on,
+  and a jump fast-forwards them, firing due timers once;
+* the service stand-ins, when started with ``stubs --virtual-clock``,
+  through their ``/__harness/clock`` admin endpoint;
+* the database, whose ``now()`` cannot be faked, by *backdating*: the
+  timestamps of the rows under test are moved into the past by the jump.
+
+Durations are written ``90s``, ``31m``, ``2h30m`` or ``91d``.
+"""
+
+import asyncio
+import contextlib
+import json
+import re
+import time
+import urllib.request
+from datetime import datetime, timedelta
+
+from harness import browser, config, report, sessions, tc_runner
+from harness.deps import require
+from harness.errors import HarnessError
+from harness.supabase_rest import SupabaseRest
+
+_UNITS = {"d": 86400, "h": 3600, "m": 60, "s": 1, "ms": 0.001}
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|d|h|m|s)")
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in ``"2h30m"``-style text; a bare number is seconds."""
+    text = text.strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(text)
+    if not parts or "".join(n + u for n, u in parts) != text:
+        raise HarnessError(f"bad duration {text!r} (expected e.g. 90s, 31m, 2h30m, 91d)")
+    return sum(float(n) * _UNITS[u] for n, u in parts)
+
+
+class VirtualClock:
+    """Wall clock plus an offset that only moves forward; call it for epoch seconds."""
+
+    def __init__(self, start: float = None):
+        self.offset = (start - time.time()) if start is not None else 0.0
+
+    def __call__(self) -> float:
+        return time.time() + self.offset
+
+    def advance(self, seconds: float):
+        if seconds < 0:
+            raise HarnessError("virtual time only moves forward")
+        self.offset += seconds
+
+
+async def install(context, virtual: VirtualClock):
+    """Fake ``Date`` and timers in ``context`` starting at the virtual now."""
+    clock = getattr(context, "clock", None)
+    if clock is None:
+        raise HarnessError("virtual browser time needs Playwright 1.45+ (BrowserContext.clock)")
+    await clock.install(time=virtual())
+
+
+def advance_stubs(url: str, seconds: float) -> dict:
+    """Move a ``stubs --virtual-clock`` process forward; any of its ports will do."""
+    request = urllib.request.Request(
+        url.rstrip("/") + "/__harness/clock",
+        data=json.dumps({"advance_s": seconds}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+    except OSError as exc:
+        raise HarnessError(f"stub clock at {url}: {exc}") from None
+
+
+def parse_backdate(spec: str) -> tuple:
+    """``"profiles:scheduled_deletion_at,deletion_initiated_at:id=eq.UUID"`` -> (table, columns, filters)."""
+    table, _, rest = spec.partition(":")
+    columns, _, query = rest.partition(":")
+    if not table or not columns:
+        raise HarnessError(f"bad backdate {spec!r} (expected TABLE:COL[,COL]:FILTER[&FILTER])")
+    filters = dict(item.split("=", 1) for item in query.split("&") if "=" in item)
+    return table, columns.split(","), filters
+
+
+def shift(value: str, seconds: float) -> str:
+    return (datetime.fromisoformat(value.replace("Z", "+00:00")) - timedelta(seconds=seconds)).isoformat()
+
+
+async def backdate(rest, table: str, columns: list, filters: dict, seconds: float) -> int:
+    """Move ``columns`` of the matching rows ``seconds`` into the past; returns rows changed."""
+    rows = await rest.select(table, {**filters, "select": ",".join(["id", *columns])})
+    changed = 0
+    for row in rows:
+        values = {c: shift(row[c], seconds) for c in columns if row.get(c)}
+        if values:
+            await rest.update(table, {"id": f"eq.{row['id']}"}, values)
+            changed += 1
+    return changed
+
+
+class Jumper:
+    """Applies one jump to every clock in play and logs it."""
+
+    def __init__(self, virtual: VirtualClock, stub_url: str = None, rest=None, backdates=()):
+        self.virtual = virtual
+        self.stub_url = stub_url
+        self.rest = rest
+        self.backdates = list(backdates)
+        self.contexts = []
+        self.log = []
+
+    async def jump(self, seconds: float, label: str):
+        started = time.perf_counter()
+        self.virtual.advance(seconds)
+        for context in self.contexts:
+            await context.clock.fast_forward(int(seconds * 1000))
+        if self.stub_url:
+            await asyncio.to_thread(advance_stubs, self.stub_url, seconds)
+        rows = 0
+        for table, columns, filters in self.backdates:
+            rows += await backdate(self.rest, table, columns, filters, seconds)
+        self.log.append({
+            "at": label,
+            "advanced_s": seconds,
+            "virtual_time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.virtual())),
+            "backdated_rows": rows,
+            "wall_ms": (time.perf_counter() - started) * 1000,
+        })
+
+
+class ClockPlugin(tc_runner.Plugin):
+    """Runs a TC script on virtual time, jumping after the given steps."""
+
+    name = "clock"
+
+    def __init__(self, jumper: Jumper, jumps: dict):
+        self.jumper = jumper
+        self.jumps = jumps  # step index -> seconds
+
+    async def on_context(self, run, context):
+        await install(context, self.jumper.virtual)
+        self.jumper.contexts.append(context)
+
+    async def on_step_end(self, run, step, page):
+        if step.index in self.jumps:
+            await self.jumper.jump(self.jumps[step.index], f"{run.test_id} after step {step.index}")
+
+    async def before_context_close(self, run, context):
+        if context in self.jumper.contexts:
+            self.jumper.contexts.remove(context)
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--jump", action="append", default=[], metavar="STEP=DURATION",
+                        help="TC mode: jump after step N (e.g. 12=31m); repeatable")
+    parser.add_argument("--app", help="direct mode: app to open (e.g. farmacia)")
+    parser.add_argument("--role", help="sign in as this role (default: the app's)")
+    parser.add_argument("--path", default="/dashboard")
+    parser.add_argument("--advance", action="append", default=[], metavar="DURATION",
+                        help="direct mode: jumps applied in order after the page loads")
+    parser.add_argument("--expect", help="direct mode: text that must be visible after the last jump")
+    parser.add_argument("--settle-ms", type=int, default=1500, help="real time to wait after each jump")
+    parser.add_argument("--start", help="virtual start time (ISO 8601; default: now)")
+    parser.add_argument("--stub-url", help="also advance a `stubs --virtual-clock` process")
+    parser.add_argument("--backdate", action="append", default=[], metavar="TABLE:COLS:FILTER",
+                        help="shift these rows' timestamps back by every jump (service role)")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    if bool(args.jump) == bool(args.app):
+        raise HarnessError("give either --jump (TC mode) or --app with --advance (direct mode)")
+    start = datetime.fromisoformat(args.start).timestamp() if args.start else None
+    payload = asyncio.run(_run(args, VirtualClock(start)))
+    path = report.write_report("clock", payload, render_markdown(payload), args.output_dir)
+    print(f"clock report: {path}")
+    return 0 if payload.get("expect_found", True) else 1
+
+
+async def _run(args, virtual: VirtualClock) -> dict:
+    backdates = [parse_backdate(spec) for spec in args.backdate]
+    payload = {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "start": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(virtual()))}
+    async with contextlib.AsyncExitStack() as stack:
+        rest = None
+        if backdates:
+            pw = await stack.enter_async_context(require("playwright.async_api").async_playwright())
+            request = await pw.request.new_context()
+            stack.push_async_callback(request.dispose)
+            rest = SupabaseRest.service(request)
+        jumper = Jumper(virtual, args.stub_url, rest, backdates)
+        if args.jump:
+            payload["tests"] = await _tc_mode(args, jumper)
+        else:
+            payload.update(await _direct(args, jumper))
+    payload["jumps"] = jumper.log
+    payload["virtual_end"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(virtual()))
+    return payload
+
+
+async def _tc_mode(args, jumper: Jumper) -> list:
+    jumps = {}
+    for item in args.jump:
+        step, _, duration = item.partition("=")
+        if not step.isdigit():
+            raise HarnessError(f"bad --jump {item!r} (expected STEP=DURATION)")
+        jumps[int(step)] = parse_duration(duration)
+    tests = []
+    for path in tc_runner.selected(args):
+        run = await tc_runner.run_test_file(path, [ClockPlugin(jumper, jumps)], args.timeout)
+        print(f"{run.test_id}: {run.status}")
+        tests.append({"test_id": run.test_id, "status": run.status, "error": run.error, "duration_s": run.duration_s})
+    return tests
+
+
+async def _direct(args, jumper: Jumper) -> dict:
+    role = args.role or args.app
+    async with browser.launch(headless=not args.headed) as (_, chromium):
+        context = await sessions.new_context(chromium, role)
+        try:
+            await install(context, jumper.virtual)
+            jumper.contexts.append(context)
+            page = await context.new_page()
+            started = time.perf_counter()
+            await page.goto(config.app_url(args.app) + args.path, wait_until="load")
+            for duration in args.advance:
+                await jumper.jump(parse_duration(duration), duration)
+                await page.wait_for_timeout(args.settle_ms)
+            result = {"app": args.app, "path": args.path, "final_url": page.url,
+                      "wall_s": time.perf_counter() - started}
+            if args.expect:
+                result["expect"] = args.expect
+                result["expect_found"] = await page.get_by_text(args.expect).count() > 0
+            return result
+        finally:
+            await context.close()
+
+
+def render_markdown(payload: dict) -> str:
+    virtual_s = sum(j["advanced_s"] for j in payload["jumps"])
+    lines = [
+        "# Virtual clock run",
+        "",
+        f"Generated {payload['generated_at']}: virtual time {payload['start']} → {payload['virtual_end']} "
+        f"({virtual_s / 3600:.1f} h skipped).",
+        "",
+        report.markdown_table(
+            ("jump", "advanced", "virtual time", "backdated rows", "wall ms"),
+            [(j["at"], f"{j['advanced_s']:.0f} s", j["virtual_time"], j["backdated_rows"], j["wall_ms"])
+             for j in payload["jumps"]],
+        ),
+    ]
+    if "tests" in payload:
+        lines += ["", report.markdown_table(("test", "status", "duration s", "error"),
+                                            [(t["test_id"], t["status"], t["duration_s"], t["error"])
+                                             for t in payload["tests"]])]
+    else:
+        lines += ["", f"{payload['app']}{payload['path']} ended on {payload['final_url']} "
+                      f"after {payload['wall_s']:.1f} s of wall time."]
+        if "expect" in payload:
+            found = "found" if payload["expect_found"] else "**not found**"
+            lines.append(f"Expected text “{payload['expect']}”: {found}.")
+    return "\n".join(lines)
@@ -0,0 +1,279 @@
+"""A/B performance comparison of two deployments with a significance test.
+
+Runs the selected TC flows ``--runs`` times against two targets, A and B —
+two revisions or two configurations of the apps, each served on its own
+origin (e.g. ``main`` on :3000 and a ``git worktree`` of the branch on
+:4000). The scripts are written against ``--origin`` (``HARNESS_BASE_URL``);
+every ``goto`` under it is sent to the target's URL instead.
+
+Runs are interleaved to cancel drift — the dev server warming up, the
+database growing, a noisy neighbour: each round runs every test on both
+targets back to back, and the order alternates between rounds (AB, BA,
+AB…). ``--warmup`` rounds run first and are discarded. Only passing runs
+count.
+
+For every test and metric — test duration, each step's latency, API p95,
+LCP per route and bytes transferred — the report gives both medians, the
+change of B against A with a bootstrap confidence interval, and a
+Mann-Whitney U p-value, Holm-corrected within its family so that testing
+many metrics does not manufacture a finding. Each test has two families:
+its headline metrics (duration, API p95, LCP, bytes), which decide the
+verdict, and its step latencies, which are reported with their own
+correction. One family across the whole suite would put the Holm floor
+above any usable alpha at a few runs per target, and nothing would ever
+be significant. A metric is ``slower`` or
+``faster`` only when the corrected p-value is under ``--alpha``, the
+interval excludes zero and the change is at least ``--min-effect``;
+anything else is ``no change``. Families whose smallest achievable
+adjusted p-value is still above ``--alpha`` are flagged as underpowered,
+and ``--runs`` too low for even one uncorrected result is refused. The
+command exits 1 when B is slower, so it can gate a merge.
+"""
+
+import asyncio
+import math
+import statistics
+import time
+
+from harness import budget, config, network, report, stats, tc_runner
+from harness.errors import HarnessError
+
+HEADLINE = ("duration", "api_p95", "lcp", "bytes")
+PHRASES = {"slower": "is slower than", "faster": "is faster than", "no change": "shows no change against",
+           "mixed": "is mixed (some metrics slower, some faster) against"}
+
+
+def parse_target(spec: str, default_name: str) -> tuple:
+    """``"main=http://localhost:3000"`` or a bare URL -> (name, url)."""
+    name, sep, url = spec.partition("=")
+    if not sep or name.startswith("http"):
+        name, url = default_name, spec
+    if not url.startswith("http"):
+        raise HarnessError(f"bad target {spec!r} (expected [NAME=]URL)")
+    return name, url.rstrip("/")
+
+
+def trial_metrics(run, recorder, visits: dict) -> dict:
+    """``{(kind, label): value}`` for one run of one test."""
+    metrics = {("duration", "test duration (s)"): run.duration_s}
+    for step in run.steps:
+        if step.ended_at and not step.error:
+            metrics[("step", f"step {step.index:02d} {step.signature[:70]}")] = step.duration_ms
+    api = [e.duration_ms for e in recorder.exchanges if e.is_api and e.ended_at]
+    if api:
+        metrics[("api_p95", "API p95 (ms)")] = stats.percentile(api, 95)
+    metrics[("bytes", "bytes transferred")] = sum(e.total_bytes for e in recorder.exchanges)
+    lcp = {}
+    for sample in visits.values():
+        if sample.get("lcp_ms") is not None:
+            lcp.setdefault(network.route_of(sample["url"]), []).append(sample["lcp_ms"])
+    for route, values in lcp.items():
+        metrics[("lcp", f"LCP {route} (ms)")] = statistics.median(values)
+    return metrics
+
+
+def rounds(count: int, warmup: int) -> list:
+    """Arm order per round, alternating AB / BA; warm-up rounds flagged."""
+    return [(index < warmup, ("a", "b") if index % 2 == 0 else ("b", "a")) for index in range(warmup + count)]
+
+
+def compare_samples(a: list, b: list, confidence: float) -> dict:
+    low, high = stats.bootstrap_ratio_ci(a, b, confidence)
+    median_a, median_b = stats.median(a), stats.median(b)
+    return {
+        "n_a": len(a),
+        "n_b": len(b),
+        "median_a": median_a,
+        "median_b": median_b,
+        "change": median_b / median_a - 1 if median_a else math.nan,
+        "ci_low": low,
+        "ci_high": high,
+        "p": stats.mann_whitney(a, b),
+    }
+
+
+def verdict(row: dict, alpha: float, min_effect: float, min_samples: int = 3) -> str:
+    if min(row["n_a"], row["n_b"]) < min_samples:
+        return "insufficient data"
+    significant = row["p_adjusted"] < alpha and (row["ci_low"] > 0 or row["ci_high"] < 0)
+    if not significant or abs(row["change"]) < min_effect:
+        return "no change"
+    return "slower" if row["change"] > 0 else "faster"
+
+
+def combine(verdicts) -> str:
+    found = set(verdicts)
+    if "slower" in found and "faster" in found:
+        return "mixed"
+    if "slower" in found:
+        return "slower"
+    return "faster" if "faster" in found else "no change"
+
+
+def min_p(n_a: int, n_b: int) -> float:
+    """Smallest two-sided Mann-Whitney p-value samples of these sizes can reach."""
+    return stats.mann_whitney(range(n_a), range(n_a, n_a + n_b))
+
+
+def family(row: dict) -> str:
+    return f"{row['test_id']} {'headline' if row['kind'] in HEADLINE else 'steps'}"
+
+
+def underpowered(rows: list, alpha: float) -> dict:
+    """``{family: floor}`` for families whose best possible Holm-adjusted p exceeds ``alpha``."""
+    families = {}
+    for row in rows:
+        families.setdefault(row["family"], []).append(row)
+    floors = {name: min(min_p(r["n_a"], r["n_b"]) for r in members) * len(members)
+              for name, members in families.items()}
+    return {name: floor for name, floor in sorted(floors.items()) if floor > alpha}
+
+
+def analyze(trials: list, alpha: float, min_effect: float, confidence: float) -> list:
+    samples = {}
+    for trial in trials:
+        if trial["warmup"] or trial["status"] != "passed":
+            continue
+        for (kind, label), value in trial["metrics"]:
+            entry = samples.setdefault((trial["test_id"], kind, label), {"a": [], "b": []})
+            entry[trial["arm"]].append(value)
+    rows = [
+        {"test_id": test, "kind": kind, "metric": label, **compare_samples(v["a"], v["b"], confidence)}
+        for (test, kind, label), v in sorted(samples.items())
+        if v["a"] and v["b"]
+    ]
+    families = {}
+    for row in rows:
+        row["family"] = family(row)
+        families.setdefault(row["family"], []).append(row)
+    for members in families.values():
+        for row, adjusted in zip(members, stats.holm([r["p"] for r in members])):
+            row["p_adjusted"] = adjusted
+            row["verdict"] = verdict(row, alpha, min_effect)
+    return rows
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--a", default=config.BASE_URL, metavar="[NAME=]URL", help="baseline target")
+    parser.add_argument("--b", required=True, metavar="[NAME=]URL", help="candidate target")
+    parser.add_argument("--origin", default=config.BASE_URL, help="origin the TC scripts navigate to")
+    parser.add_argument("--runs", type=int, default=7, help="measured runs per test and target")
+    parser.add_argument("--warmup", type=int, default=1, help="discarded rounds before measuring")
+    parser.add_argument("--alpha", type=float, default=0.05, help="significance level after Holm correction")
+    parser.add_argument("--min-effect", type=float, default=0.03,
+                        help="smallest relative change reported as faster/slower")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+
+
+def run(args) -> int:
+    if args.runs < 3:
+        raise HarnessError("--runs must be at least 3 for a significance test")
+    if min_p(args.runs, args.runs) > args.alpha:
+        raise HarnessError(f"with --runs {args.runs} no metric can reach p < {args.alpha} even uncorrected "
+                           f"(best possible p = {min_p(args.runs, args.runs):.3f}); raise --runs")
+    targets = {"a": parse_target(args.a, "A"), "b": parse_target(args.b, "B")}
+    trials = asyncio.run(execute(args, targets))
+    rows = analyze(trials, args.alpha, args.min_effect, args.confidence)
+    payload = summarize(args, targets, trials, rows)
+    for name, floor in payload["underpowered"].items():
+        print(f"warning: {name}: best possible adjusted p is {floor:.3f} > α = {args.alpha}; "
+              f"these metrics cannot change verdicts at --runs {args.runs}")
+    path = report.write_report("compare", payload, render_markdown(payload), args.output_dir)
+    print(f"compare report: {path}")
+    return 1 if payload["verdict"] in ("slower", "mixed") else 0
+
+
+async def execute(args, targets: dict) -> list:
+    paths, trials = tc_runner.selected(args), []
+    for number, (warmup, order) in enumerate(rounds(args.runs, args.warmup)):
+        for path in paths:
+            for arm in order:
+                name, url = targets[arm]
+                visits, recorder = {}, network.NetworkRecorder()
+                run = await tc_runner.run_test_file(
+                    path, [recorder, budget.BudgetPlugin(visits)], args.timeout, {"origins": {args.origin: url}}
+                )
+                label = "warm-up" if warmup else f"round {number - args.warmup + 1}/{args.runs}"
+                print(f"[{label}] {run.test_id} on {name}: {run.status} in {run.duration_s:.1f} s")
+                trials.append({
+                    "round": number,
+                    "warmup": warmup,
+                    "arm": arm,
+                    "test_id": run.test_id,
+                    "status": run.status,
+                    "metrics": list(trial_metrics(run, recorder, visits).items()),
+                })
+    return trials
+
+
+def summarize(args, targets: dict, trials: list, rows: list) -> dict:
+    tests = {}
+    for row in rows:
+        if row["kind"] in HEADLINE:
+            tests.setdefault(row["test_id"], []).append(row["verdict"])
+    failed = {}
+    for trial in trials:
+        if not trial["warmup"] and trial["status"] != "passed":
+            key = f"{trial['test_id']} on {targets[trial['arm']][0]}"
+            failed[key] = failed.get(key, 0) + 1
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "a": {"name": targets["a"][0], "url": targets["a"][1]},
+        "b": {"name": targets["b"][0], "url": targets["b"][1]},
+        "runs": args.runs,
+        "warmup": args.warmup,
+        "alpha": args.alpha,
+        "min_effect": args.min_effect,
+        "confidence": args.confidence,
+        "verdict": combine(v for verdicts in tests.values() for v in verdicts),
+        "tests": {test: combine(verdicts) for test, verdicts in sorted(tests.items())},
+        "failed_runs": failed,
+        "underpowered": underpowered(rows, args.alpha),
+        "metrics": rows,
+    }
+
+
+def _change(row: dict) -> str:
+    return (f"{row['change']:+.1%} [{row['ci_low']:+.1%}, {row['ci_high']:+.1%}]"
+            if not math.isnan(row["change"]) else "—")
+
+
+def render_markdown(payload: dict) -> str:
+    a, b = payload["a"]["name"], payload["b"]["name"]
+    headers = ("test", "metric", f"{a} median", f"{b} median", "change [CI]", "p (Holm)", "verdict")
+
+    def table(rows):
+        return report.markdown_table(headers, [
+            (r["test_id"], r["metric"], r["median_a"], r["median_b"], _change(r), r["p_adjusted"], r["verdict"])
+            for r in rows
+        ])
+
+    headline = [r for r in payload["metrics"] if r["kind"] in HEADLINE]
+    steps = [r for r in payload["metrics"] if r["kind"] == "step" and r["verdict"] in ("slower", "faster")]
+    lines = [
+        "# A/B comparison",
+        "",
+        f"Generated {payload['generated_at']}: **{b} {PHRASES[payload['verdict']]} {a}** "
+        f"({payload['b']['url']} vs {payload['a']['url']}; {payload['runs']} interleaved runs per target after "
+        f"{payload['warmup']} warm-up rounds; α = {payload['alpha']}, minimum effect {payload['min_effect']:.0%}, "
+        f"{payload['confidence']:.0%} bootstrap intervals; p-values Holm-corrected per test, headline metrics "
+        f"and step latencies as separate families).",
+        "",
+        report.markdown_table(("test", "verdict"), sorted(payload["tests"].items())),
+        "",
+        "## Headline metrics",
+        "",
+        table(headline),
+        "",
+        "## Steps that changed",
+        "",
+        table(steps) if steps else "No step changed significantly.",
+    ]
+    if payload["underpowered"]:
+        lines += ["", "Underpowered families (nothing in them can reach significance at this many runs): "
+                  + ", ".join(f"{k} (best adjusted p {v:.3f})" for k, v in payload["underpowered"].items()) + "."]
+    if payload["failed_runs"]:
+        lines += ["", "Failed runs (left out): "
+                  + ", ".join(f"{k} ×{n}" for k, n in sorted(payload["failed_runs"].items())) + "."]
+    return "\n".join(lines)
@@ -0,0 +1,267 @@
+"""Per-route JavaScript and CSS coverage, merged across TC runs.
+
+Each page of a TC run gets a CDP session with V8 precise (block) coverage and
+CSS rule-usage tracking. Coverage is taken before every step and when the
+context closes, and each delta is credited to the route the page was on, so
+"route" means *what was used while the user was on that page*. Used ranges
+are unioned per route and script across all tests.
+
+The report lists, per route, every Next.js chunk (or, under ``next dev``,
+every ``webpack-internal`` module) with its size and unused share, and ranks
+lazy-load candidates: code loaded on routes that use little or none of it.
+With ``--source-maps`` chunk bytes are attributed to source modules through
+the chunk's source map, which is how components such as the academy 3D hero
+or the EEG montage tables show up by name. Sizes are in characters of the
+script text, which equals bytes for ASCII bundles.
+"""
+
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from harness import config, network, report, sourcemap, tc_runner
+
+# Modules called out in the report when they are loaded but unused
+WATCHED = (
+    "components/academy/hero/AcademyHero3D",
+    "components/modules/eeg/eeg-montages-data",
+)
+
+
+def used_intervals(functions: list) -> list:
+    """Disjoint ``(start, end)`` ranges with a non-zero count.
+
+    V8 block ranges nest, inner ranges overriding outer ones, so painting them
+    outermost first yields the executed bytes.
+    """
+    ranges = [r for f in functions for r in f["ranges"]]
+    if not ranges:
+        return []
+    ranges.sort(key=lambda r: (r["startOffset"], -r["endOffset"]))
+    length = max(r["endOffset"] for r in ranges)
+    painted = bytearray(length)
+    for r in ranges:
+        painted[r["startOffset"]:r["endOffset"]] = (b"\x01" if r["count"] else b"\x00") * (r["endOffset"] - r["startOffset"])
+    return _runs(painted)
+
+
+def _runs(painted) -> list:
+    result, start = [], painted.find(1)
+    while start != -1:
+        end = painted.find(0, start)
+        if end == -1:
+            end = len(painted)
+        result.append((start, end))
+        start = painted.find(1, end)
+    return result
+
+
+def union(a: list, b: list) -> list:
+    merged = []
+    for start, end in sorted(a + b):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def covered(intervals: list) -> int:
+    return sum(end - start for start, end in intervals)
+
+
+def route_label(url: str) -> str:
+    app = config.app_for_url(url)
+    return f"{app or urlsplit(url).netloc}:{network.route_of(url)}"
+
+
+class CoveragePlugin(tc_runner.Plugin):
+    """Collects JS block coverage and CSS rule usage per route."""
+
+    name = "coverage"
+
+    def __init__(self, store: dict, source_maps: bool = False):
+        # store: route -> url -> {"kind", "size", "used", "spans"}; shared across tests
+        self.store = store
+        self.source_maps = source_maps
+        self.sessions = {}  # page -> (session, scripts, sheets)
+        self.sources = {}
+
+    async def on_context(self, run, context):
+        context.on("page", lambda page: asyncio.ensure_future(self._attach(context, page)))
+        for page in context.pages:
+            await self._attach(context, page)
+
+    async def _attach(self, context, page):
+        scripts, sheets = {}, {}
+
+        def on_script(params):
+            if params.get("url", "").startswith(("http://", "https://", "webpack-internal://")):
+                scripts[params["scriptId"]] = params
+
+        def on_sheet(params):
+            if params["header"].get("sourceURL"):
+                sheets[params["header"]["styleSheetId"]] = params["header"]
+
+        try:
+            session = await context.new_cdp_session(page)
+            session.on("Debugger.scriptParsed", on_script)
+            session.on("CSS.styleSheetAdded", on_sheet)
+            await session.send("Debugger.enable")
+            await session.send("Profiler.enable")
+            await session.send("Profiler.startPreciseCoverage", {"callCount": False, "detailed": True})
+            await session.send("DOM.enable")
+            await session.send("CSS.enable")
+            await session.send("CSS.startRuleUsageTracking")
+        except Exception:
+            return  # page closed before we got to it
+        self.sessions[page] = (session, scripts, sheets)
+
+    async def on_step_start(self, run, step, page):
+        await self._take(page)
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            await self._take(page)
+
+    async def _take(self, page):
+        if page not in self.sessions or page.is_closed() or not page.url.startswith("http"):
+            return
+        session, scripts, sheets = self.sessions[page]
+        route = self.store.setdefault(route_label(page.url), {})
+        try:
+            js = await session.send("Profiler.takePreciseCoverage")
+            css = await session.send("CSS.takeCoverageDelta")
+        except Exception:
+            return  # mid-navigation; the next take picks the delta up
+        for entry in js["result"]:
+            script = scripts.get(entry["scriptId"])
+            if not script:
+                continue
+            used = used_intervals(entry["functions"])
+            size = script.get("length") or max((end for _, end in used), default=0)
+            await self._merge(route, session, script, "js", size, used)
+        for sheet_id, header in sheets.items():
+            used = sorted((r["startOffset"], r["endOffset"]) for r in css["coverage"]
+                          if r["styleSheetId"] == sheet_id and r["used"])
+            await self._merge(route, session, {"url": header["sourceURL"], "scriptId": None},
+                              "css", int(header.get("length", 0)), used)
+
+    async def _merge(self, route: dict, session, script: dict, kind: str, size: int, used: list):
+        entry = route.setdefault(script["url"], {"kind": kind, "size": size, "used": [], "spans": None})
+        entry["size"] = max(entry["size"], size)
+        entry["used"] = union(entry["used"], used)
+        if self.source_maps and kind == "js" and entry["spans"] is None and script.get("sourceMapURL"):
+            entry["spans"] = await self._spans(session, script)
+
+    async def _spans(self, session, script: dict) -> list:
+        if script["url"] in self.sources:
+            return self.sources[script["url"]]
+        spans = []
+        try:
+            source = await session.send("Debugger.getScriptSource", {"scriptId": script["scriptId"]})
+            source_map = await asyncio.to_thread(sourcemap.load, script["url"], script["sourceMapURL"])
+            spans = sourcemap.spans(source_map, source["scriptSource"])
+        except Exception:
+            pass  # no map served; the chunk is reported as a whole
+        self.sources[script["url"]] = spans
+        return spans
+
+
+def chunk_name(url: str) -> str:
+    if url.startswith("webpack-internal://"):
+        return sourcemap.clean_source(url)
+    path = urlsplit(url).path
+    return path.split("/_next/static/", 1)[1] if "/_next/static/" in path else path
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--source-maps", action="store_true", help="attribute chunk bytes to source modules")
+    parser.add_argument("--lazy-threshold", type=float, default=0.1,
+                        help="used share below which a chunk/module is a lazy-load candidate on a route")
+    parser.add_argument("--top", type=int, default=25)
+
+
+def run(args) -> int:
+    payload = asyncio.run(collect(args))
+    path = report.write_report("coverage", payload, render_markdown(payload), args.output_dir)
+    print(f"coverage report: {path}")
+    return 0
+
+
+async def collect(args) -> dict:
+    store, tests = {}, []
+    for path in tc_runner.selected(args):
+        run = await tc_runner.run_test_file(path, [CoveragePlugin(store, args.source_maps)], args.timeout)
+        print(f"{run.test_id}: {run.status}")
+        tests.append({"test_id": run.test_id, "status": run.status})
+    return summarize(store, args.lazy_threshold, args.top, tests)
+
+
+def summarize(store: dict, lazy_threshold: float, top: int = 25, tests=()) -> dict:
+    routes, candidates = [], {}
+    for route, entries in sorted(store.items()):
+        items = []
+        for url, entry in entries.items():
+            used = covered(entry["used"])
+            unit = {"chunk": chunk_name(url), "kind": entry["kind"], "size": entry["size"],
+                    "used": used, "unused": max(0, entry["size"] - used)}
+            units = [(unit["chunk"], entry["size"], used)]
+            if entry["spans"]:
+                modules = sourcemap.attribute(entry["spans"], entry["used"])
+                unit["modules"] = sorted(
+                    ({"module": m, "size": t, "used": u} for m, (t, u) in modules.items()),
+                    key=lambda m: m["size"] - m["used"], reverse=True,
+                )
+                units = [(m["module"], m["size"], m["used"]) for m in unit["modules"]]
+            items.append(unit)
+            for name, size, used_bytes in units:
+                if size and used_bytes / size < lazy_threshold:
+                    candidate = candidates.setdefault(name, {"name": name, "unused": 0, "routes": []})
+                    candidate["unused"] += size - used_bytes
+                    candidate["routes"].append(route)
+        items.sort(key=lambda u: u["unused"], reverse=True)
+        routes.append({
+            "route": route,
+            "js_size": sum(u["size"] for u in items if u["kind"] == "js"),
+            "js_unused": sum(u["unused"] for u in items if u["kind"] == "js"),
+            "css_size": sum(u["size"] for u in items if u["kind"] == "css"),
+            "css_unused": sum(u["unused"] for u in items if u["kind"] == "css"),
+            "chunks": items,
+        })
+    ranked = sorted(candidates.values(), key=lambda c: c["unused"], reverse=True)
+    for c in ranked:
+        c["watched"] = any(w in c["name"] for w in WATCHED)
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tests": list(tests),
+        "lazy_threshold": lazy_threshold,
+        "top": top,
+        "routes": routes,
+        "lazy_load_candidates": ranked,
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (r["route"], r["js_size"], r["js_unused"], f"{r['js_unused'] / r['js_size']:.0%}" if r["js_size"] else None,
+         r["css_size"], r["css_unused"])
+        for r in sorted(payload["routes"], key=lambda r: r["js_unused"], reverse=True)
+    ]
+    candidates = [
+        (("**" + c["name"] + "**") if c["watched"] else c["name"], c["unused"], len(c["routes"]),
+         ", ".join(c["routes"][:4]) + (" …" if len(c["routes"]) > 4 else ""))
+        for c in payload["lazy_load_candidates"][: payload["top"]]
+    ]
+    return "\n".join([
+        "# JS/CSS coverage per route",
+        "",
+        f"Generated {payload['generated_at']} from {len(payload['tests'])} tests.",
+        "",
+        report.markdown_table(("route", "JS bytes", "JS unused", "unused %", "CSS bytes", "CSS unused"), rows),
+        "",
+        f"## Lazy-load candidates (used < {payload['lazy_threshold']:.0%} on the route)",
+        "",
+        report.markdown_table(("chunk / module", "unused bytes", "routes", "where"), candidates),
+    ])
@@ -0,0 +1,273 @@
+"""Per-step main-thread CPU profiles with long-task attribution.
+
+Opt-in because sampling slows the page down. Every page of a TC run gets a
+CDP session running the V8 sampling profiler; the profile is cut at each
+step boundary, so each click, fill or navigation owns everything the page
+did until the next step started (the scripts pause between actions, which is
+when most of the triggered work happens). Long tasks are collected alongside
+through a ``PerformanceObserver``.
+
+For every step the report splits the window into script time (JS
+functions), GC, ``(program)`` — native browser work: style, layout, paint,
+parsing — and the time requests were in flight, and names the largest as
+the step's bottleneck: JS, rendering or network. Self time is aggregated by
+source file and function across the suite for a top-N table, and all step
+profiles are exported as one speedscope file (open it at speedscope.app).
+"""
+
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from harness import network, report, tc_runner
+
+_LONG_TASKS = """
+(() => {
+  window.__harnessLongTasks = [];
+  try {
+    new PerformanceObserver((list) => list.getEntries().forEach((e) =>
+      window.__harnessLongTasks.push({ at: performance.timeOrigin + e.startTime, ms: e.duration })
+    )).observe({ type: "longtask", buffered: true });
+  } catch (e) {}
+})();
+"""
+_DRAIN = "() => (window.__harnessLongTasks || []).splice(0)"
+SPECIAL = {"(garbage collector)": "gc", "(program)": "program", "(idle)": "idle", "(root)": None}
+
+
+class CpuProfilePlugin(tc_runner.Plugin):
+    """Cuts one CPU profile per step on every page of the test."""
+
+    name = "cpu-profile"
+
+    def __init__(self, interval_us: int = 200):
+        self.interval_us = interval_us
+        self.sessions = {}
+        self.current = None
+        self.window_start = None
+        self.steps = {}  # step index -> {"profiles": [...], "long_tasks": [...], "window": (start, end)}
+
+    async def on_context(self, run, context):
+        await context.add_init_script(script=_LONG_TASKS)
+        context.on("page", lambda page: asyncio.ensure_future(self._attach(context, page)))
+        for page in context.pages:
+            await self._attach(context, page)
+
+    async def _attach(self, context, page):
+        try:
+            session = await context.new_cdp_session(page)
+            await session.send("Profiler.enable")
+            await session.send("Profiler.setSamplingInterval", {"interval": self.interval_us})
+            if self.current is not None:
+                await session.send("Profiler.start")
+        except Exception:
+            return
+        self.sessions[page] = session
+
+    async def on_step_start(self, run, step, page):
+        await self._rotate(step)
+
+    async def before_context_close(self, run, context):
+        await self._rotate(None)
+
+    async def _rotate(self, step):
+        now = time.time() * 1000
+        if self.current is not None:
+            bucket = self.steps.setdefault(self.current, {"profiles": [], "long_tasks": [], "window": None})
+            bucket["window"] = (self.window_start, now)
+            for page, session in list(self.sessions.items()):
+                try:
+                    bucket["profiles"].append((await session.send("Profiler.stop"))["profile"])
+                    if not page.is_closed():
+                        bucket["long_tasks"] += await page.evaluate(_DRAIN)
+                except Exception:
+                    pass  # page gone or mid-navigation; its slice is lost
+        self.current = step.index if step else None
+        self.window_start = now
+        if step is not None:
+            for session in self.sessions.values():
+                try:
+                    await session.send("Profiler.start")
+                except Exception:
+                    pass
+
+
+def self_times(profile: dict) -> dict:
+    """``{node id: self ms}`` from samples and time deltas."""
+    times = {}
+    for node_id, delta in zip(profile.get("samples", []), profile.get("timeDeltas", [])):
+        times[node_id] = times.get(node_id, 0.0) + delta / 1000
+    return times
+
+
+def categorize(profile: dict, times: dict) -> dict:
+    nodes = {n["id"]: n for n in profile["nodes"]}
+    result = {"script": 0.0, "gc": 0.0, "program": 0.0, "idle": 0.0}
+    for node_id, ms in times.items():
+        name = nodes[node_id]["callFrame"]["functionName"]
+        category = SPECIAL.get(name, "script")
+        if category:
+            result[category] += ms
+    return result
+
+
+def function_key(call_frame: dict) -> tuple:
+    url = call_frame.get("url", "")
+    file = urlsplit(url).path.rsplit("/", 1)[-1] if url else "(native)"
+    return file, call_frame.get("functionName") or "(anonymous)"
+
+
+def busy_ms(exchanges, window) -> float:
+    """Time within ``window`` with at least one request in flight."""
+    start, end = window
+    spans = sorted((max(start, e.started_at), min(end, e.ended_at or end)) for e in exchanges)
+    total, cursor = 0.0, start
+    for s, e in spans:
+        if e <= cursor:
+            continue
+        total += e - max(s, cursor)
+        cursor = e
+    return total
+
+
+class Speedscope:
+    """Accumulates step profiles into one speedscope file."""
+
+    def __init__(self):
+        self.frames, self.index, self.profiles = [], {}, []
+
+    def add(self, name: str, profile: dict):
+        nodes = {n["id"]: n for n in profile["nodes"]}
+        parents = {child: n["id"] for n in profile["nodes"] for child in n.get("children", [])}
+        stacks = {}
+
+        def stack(node_id):
+            chain = []
+            while node_id is not None and node_id not in stacks:
+                chain.append(node_id)
+                node_id = parents.get(node_id)
+            prefix = stacks.get(node_id, [])
+            for current in reversed(chain):
+                frame = nodes[current]["callFrame"]
+                prefix = prefix if frame["functionName"] == "(root)" else prefix + [self._frame(frame)]
+                stacks[current] = prefix
+            return prefix
+
+        samples = profile.get("samples", [])
+        weights = [d / 1000 for d in profile.get("timeDeltas", [])]
+        self.profiles.append({
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": [stack(s) for s in samples],
+            "weights": weights,
+        })
+
+    def _frame(self, call_frame: dict) -> int:
+        key = (call_frame["functionName"], call_frame.get("url", ""), call_frame.get("lineNumber", -1))
+        if key not in self.index:
+            self.index[key] = len(self.frames)
+            self.frames.append({"name": key[0] or "(anonymous)", "file": key[1], "line": key[2] + 1})
+        return self.index[key]
+
+    def document(self) -> dict:
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": self.profiles,
+            "exporter": "harness cpu-profile",
+        }
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--interval-us", type=int, default=200, help="sampling interval")
+    parser.add_argument("--top", type=int, default=30)
+
+
+def run(args) -> int:
+    payload, speedscope = asyncio.run(profile_suite(args))
+    path = report.write_report("cpu-profile", payload, render_markdown(payload), args.output_dir)
+    speedscope_path = path.with_suffix(".speedscope.json")
+    speedscope_path.write_text(json.dumps(speedscope.document()))
+    print(f"cpu-profile report: {path}\nspeedscope profile: {speedscope_path}")
+    return 0
+
+
+async def profile_suite(args):
+    speedscope, functions, steps = Speedscope(), {}, []
+    for path in tc_runner.selected(args):
+        profiler, recorder = CpuProfilePlugin(args.interval_us), network.NetworkRecorder()
+        run = await tc_runner.run_test_file(path, [recorder, profiler], args.timeout)
+        print(f"{run.test_id}: {run.status}, {len(profiler.steps)} step profiles")
+        by_step = recorder.by_step()
+        for index, bucket in sorted(profiler.steps.items()):
+            step = run.steps[index]
+            cpu = {"script": 0.0, "gc": 0.0, "program": 0.0, "idle": 0.0}
+            step_functions = {}
+            for profile in bucket["profiles"]:
+                times = self_times(profile)
+                for key, ms in categorize(profile, times).items():
+                    cpu[key] += ms
+                nodes = {n["id"]: n for n in profile["nodes"]}
+                for node_id, ms in times.items():
+                    frame = nodes[node_id]["callFrame"]
+                    if frame["functionName"] in SPECIAL:
+                        continue
+                    key = function_key(frame)
+                    step_functions[key] = step_functions.get(key, 0.0) + ms
+                speedscope.add(f"{run.test_id} step {index} {step.kind} {step.target[:60]}", profile)
+            for key, ms in step_functions.items():
+                functions[key] = functions.get(key, 0.0) + ms
+            net = busy_ms(by_step.get(index, []), bucket["window"])
+            breakdown = {"js": cpu["script"] + cpu["gc"], "rendering": cpu["program"], "network": net}
+            steps.append({
+                "test_id": run.test_id,
+                "step": index,
+                "action": f"{step.kind} {step.target}",
+                "window_ms": bucket["window"][1] - bucket["window"][0],
+                "cpu_ms": cpu,
+                "network_busy_ms": net,
+                "long_tasks": len(bucket["long_tasks"]),
+                "long_task_ms": sum(t["ms"] for t in bucket["long_tasks"]),
+                "bottleneck": max(breakdown, key=breakdown.get) if any(breakdown.values()) else None,
+                "top_functions": [
+                    {"file": f, "function": fn, "self_ms": ms}
+                    for (f, fn), ms in sorted(step_functions.items(), key=lambda kv: kv[1], reverse=True)[:5]
+                ],
+            })
+    ranked = sorted(functions.items(), key=lambda kv: kv[1], reverse=True)
+    payload = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "interval_us": args.interval_us,
+        "steps": steps,
+        "functions": [{"file": f, "function": fn, "self_ms": ms} for (f, fn), ms in ranked[: args.top]],
+    }
+    return payload, speedscope
+
+
+def render_markdown(payload: dict) -> str:
+    steps = sorted(payload["steps"], key=lambda s: s["cpu_ms"]["script"] + s["cpu_ms"]["program"], reverse=True)
+    step_rows = [
+        (s["test_id"], s["step"], s["action"][:50], s["cpu_ms"]["script"], s["cpu_ms"]["program"],
+         s["network_busy_ms"], s["long_tasks"], s["bottleneck"])
+        for s in steps[:30]
+    ]
+    function_rows = [(f["file"], f["function"], f["self_ms"]) for f in payload["functions"]]
+    return "\n".join([
+        "# Main-thread CPU per step",
+        "",
+        f"Generated {payload['generated_at']} (sampling every {payload['interval_us']} µs).",
+        "",
+        report.markdown_table(
+            ("test", "step", "action", "JS ms", "rendering ms", "network ms", "long tasks", "bottleneck"),
+            step_rows,
+        ),
+        "",
+        "## Top functions by self time",
+        "",
+        report.markdown_table(("file", "function", "self ms"), function_rows),
+    ])
@@ -0,0 +1,55 @@
+"""Direct Postgres access for the database-level benchmarks.
+
+Queries run the way PostgREST runs them: inside a transaction, switched to the
+``authenticated`` role, with the caller's JWT claims exposed through
+``request.jwt.claims`` so ``auth.uid()`` and the RLS policies see a real user.
+Every transaction is rolled back, so benchmarks never leave data behind.
+"""
+
+import json
+from contextlib import asynccontextmanager
+
+from harness import config
+from harness.deps import require
+
+
+async def connect(dsn: str = None):
+    """Open an asyncpg connection (superuser DSN, see ``HARNESS_DB_URL``)."""
+    asyncpg = require("asyncpg")
+    return await asyncpg.connect(dsn or config.DB_URL)
+
+
+def jwt_claims(subject: str, app_role: str) -> dict:
+    """Claims shaped like a Supabase access token for ``subject``."""
+    return {
+        "sub": subject,
+        "role": "authenticated",
+        "aud": "authenticated",
+        "user_metadata": {"role": app_role},
+        "app_metadata": {"role": app_role},
+    }
+
+
+@asynccontextmanager
+async def as_user(conn, subject: str, app_role: str, bypass_rls: bool = False):
+    """Run the enclosed statements as ``subject``; always rolls back.
+
+    With ``bypass_rls`` the same claims are set but the database role is
+    ``service_role`` (``BYPASSRLS`` on Supabase), which isolates the cost of
+    the policies from the cost of the query itself.
+    """
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        db_role = "service_role" if bypass_rls else "authenticated"
+        await conn.execute(f"SET LOCAL ROLE {db_role}")
+        await conn.execute(
+            "SELECT set_config('request.jwt.claims', $1, true),"
+            " set_config('request.jwt.claim.sub', $2, true),"
+            " set_config('request.jwt.claim.role', 'authenticated', true)",
+            json.dumps(jwt_claims(subject, app_role)),
+            subject,
+        )
+        yield conn
+    finally:
+        await transaction.rollback()
@@ -0,0 +1,26 @@
+"""Lazy imports for optional third-party dependencies.
+
+Only the subcommand that needs a driver pays for importing it, and a missing
+package produces a readable error instead of an ``ImportError`` at startup.
+"""
+
+import importlib
+
+from harness.errors import HarnessError
+
+# Import name -> pip distribution name
+_DISTRIBUTIONS = {
+    "asyncpg": "asyncpg",
+    "playwright.async_api": "playwright",
+}
+
+
+def require(module: str):
+    """Import ``module`` or raise :class:`HarnessError` with an install hint."""
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        dist = _DISTRIBUTIONS.get(module, module.split(".")[0])
+        raise HarnessError(
+            f"'{module}' is required for this command: pip install {dist}"
+        ) from exc
@@ -0,0 +1,222 @@
+"""Device profiles (CPU and network throttling) and the emulation matrix.
+
+Our pharmacy and patient users run on hardware several times slower than a
+development machine, over mobile or clinic links. A :class:`DeviceProfile`
+models one such device with CDP ``Emulation.setCPUThrottlingRate`` and
+``Network.emulateNetworkConditions``; :func:`apply_profile` puts it on a page
+and :class:`DevicePlugin` on every page of a TC run.
+
+The ``device-matrix`` command runs the TC flows once per profile with the
+step timer and the page vitals collector from :mod:`harness.budget`
+attached, and compares test duration, per-step time, LCP and TBT against the
+unthrottled ``dev`` baseline. Viewports stay at the scripts' 1280×720 unless
+``--emulate-viewport`` is given, because the generated XPath selectors
+assume the desktop layout.
+"""
+
+import asyncio
+import statistics
+import time
+from dataclasses import dataclass
+
+from harness import budget, report, tc_runner
+from harness.errors import HarnessError
+
+
+@dataclass(frozen=True)
+class DeviceProfile:
+    name: str
+    cpu_slowdown: float
+    latency_ms: float = 0.0
+    download_kbps: float = 0.0  # 0 = unthrottled
+    upload_kbps: float = 0.0
+    viewport: tuple = None
+    mobile: bool = False
+
+    def network_conditions(self) -> dict:
+        return {
+            "offline": False,
+            "latency": self.latency_ms,
+            "downloadThroughput": self.download_kbps * 1000 / 8 if self.download_kbps else -1,
+            "uploadThroughput": self.upload_kbps * 1000 / 8 if self.upload_kbps else -1,
+        }
+
+
+PROFILES = {
+    "dev": DeviceProfile("dev", 1),
+    "low-end-android": DeviceProfile("low-end-android", 6, 150, 1600, 750, (360, 740), True),
+    "budget-laptop": DeviceProfile("budget-laptop", 4, 40, 10000, 3000, (1366, 768)),
+    "clinic-desktop": DeviceProfile("clinic-desktop", 2, 60, 5000, 1000, (1280, 720)),
+}
+
+
+async def apply_profile(context, page, profile: DeviceProfile):
+    """Throttle ``page``'s CPU and network to ``profile`` over CDP."""
+    session = await context.new_cdp_session(page)
+    if profile.cpu_slowdown != 1:
+        await session.send("Emulation.setCPUThrottlingRate", {"rate": profile.cpu_slowdown})
+    if profile.latency_ms or profile.download_kbps or profile.upload_kbps:
+        await session.send("Network.enable")
+        await session.send("Network.emulateNetworkConditions", profile.network_conditions())
+    return session
+
+
+class DevicePlugin(tc_runner.Plugin):
+    """Applies a device profile to every page of a test.
+
+    Throttling starts as soon as a page opens, and the first step on each page
+    waits for it, so the script's first navigation is already throttled.
+    """
+
+    name = "device"
+
+    def __init__(self, profile: DeviceProfile, emulate_viewport: bool = False):
+        self.profile = profile
+        self.emulate_viewport = emulate_viewport
+        self.applied = {}  # page -> task applying the profile
+
+    def on_context_options(self, run, options):
+        if self.emulate_viewport and self.profile.viewport:
+            width, height = self.profile.viewport
+            options["viewport"] = {"width": width, "height": height}
+            options["is_mobile"] = self.profile.mobile
+            options["has_touch"] = self.profile.mobile
+
+    async def on_context(self, run, context):
+        context.on("page", lambda page: self._start(run, context, page))
+        for page in context.pages:
+            await self._start(run, context, page)
+
+    async def on_step_start(self, run, step, page):
+        task = self.applied.get(page)
+        if task is None:
+            task = self._start(run, page.context, page)
+        await task
+
+    def _start(self, run, context, page):
+        if page not in self.applied:
+            self.applied[page] = asyncio.ensure_future(self._apply(run, context, page))
+        return self.applied[page]
+
+    async def _apply(self, run, context, page):
+        try:
+            await apply_profile(context, page, self.profile)
+        except Exception as exc:
+            if not page.is_closed():
+                run.data.setdefault("plugin_errors", []).append(f"{self.name}: {self.profile.name} not applied: {exc}")
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--profiles", default=",".join(PROFILES), help=f"comma-separated, from {', '.join(PROFILES)}")
+    parser.add_argument("--baseline", default="dev", help="profile the others are compared with")
+    parser.add_argument("--emulate-viewport", action="store_true", help="also apply the profile's viewport")
+
+
+def run(args) -> int:
+    names = [p for p in args.profiles.split(",") if p]
+    unknown = [p for p in names + [args.baseline] if p not in PROFILES]
+    if unknown:
+        raise HarnessError(f"unknown profiles: {', '.join(unknown)}")
+    if args.baseline not in names:
+        names.insert(0, args.baseline)
+    payload = asyncio.run(matrix(args, [PROFILES[n] for n in names]))
+    path = report.write_report("device-matrix", payload, render_markdown(payload), args.output_dir)
+    print(f"device-matrix report: {path}")
+    return 0
+
+
+async def matrix(args, profiles) -> dict:
+    paths = tc_runner.selected(args)
+    results = {}
+    for profile in profiles:
+        visits, runs = {}, []
+        for path in paths:
+            plugins = [DevicePlugin(profile, args.emulate_viewport), budget.BudgetPlugin(visits)]
+            run = await tc_runner.run_test_file(path, plugins, args.timeout)
+            print(f"[{profile.name}] {run.test_id}: {run.status} in {run.duration_s:.1f} s")
+            for error in run.data.get("plugin_errors", []):
+                print(f"[{profile.name}] {run.test_id}: warning: {error}")
+            runs.append(run)
+        results[profile.name] = _summarize(runs, visits)
+
+    base = results[args.baseline]
+    for name, result in results.items():
+        result["slowdown"] = {
+            "test_duration": _ratio(result["tests"], base["tests"], "duration_s"),
+            "step_ms": _ratio(result["steps"], base["steps"], "p50"),
+            "lcp_ms": _ratio(result["routes"], base["routes"], "lcp_ms"),
+            "tbt_ms": _ratio(result["routes"], base["routes"], "tbt_ms"),
+        }
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "baseline": args.baseline,
+        "profiles": {p.name: p.__dict__ for p in profiles},
+        "results": results,
+    }
+
+
+def _summarize(runs, visits) -> dict:
+    steps = {}
+    for run in runs:
+        for step in run.steps:
+            if step.ended_at:
+                steps.setdefault(step.kind, []).append(step.duration_ms)
+    return {
+        "passed": sum(1 for r in runs if r.status == "passed"),
+        "tests": {
+            r.test_id: {"status": r.status, "duration_s": r.duration_s, "plugin_errors": r.data.get("plugin_errors", [])}
+            for r in runs
+        },
+        "steps": {kind: {"p50": statistics.median(v), "n": len(v)} for kind, v in steps.items()},
+        "routes": {f"{app}:{route}": m for (app, route), m in budget.aggregate(visits.values()).items()},
+    }
+
+
+def _ratio(current: dict, baseline: dict, key: str):
+    """Median over shared keys of ``current[k][key] / baseline[k][key]``."""
+    ratios = [
+        current[k][key] / baseline[k][key]
+        for k in current
+        if k in baseline and current[k].get(key) and baseline[k].get(key)
+    ]
+    return statistics.median(ratios) if ratios else None
+
+
+def render_markdown(payload: dict) -> str:
+    results = payload["results"]
+    names = list(results)
+    summary = [
+        (
+            name,
+            f"{results[name]['passed']}/{len(results[name]['tests'])}",
+            *(results[name]["slowdown"][k] for k in ("test_duration", "step_ms", "lcp_ms", "tbt_ms")),
+        )
+        for name in names
+    ]
+    tests = sorted({t for r in results.values() for t in r["tests"]})
+    per_test = [
+        (t, *(f"{results[n]['tests'][t]['duration_s']:.1f} s ({results[n]['tests'][t]['status']})"
+              if t in results[n]["tests"] else None for n in names))
+        for t in tests
+    ]
+    routes = sorted({r for res in results.values() for r in res["routes"]})
+    per_route = [
+        (r, *(results[n]["routes"].get(r, {}).get("lcp_ms") for n in names))
+        for r in routes
+    ]
+    return "\n".join([
+        "# Device emulation matrix",
+        "",
+        f"Generated {payload['generated_at']}; ratios are medians relative to `{payload['baseline']}`.",
+        "",
+        report.markdown_table(("profile", "passed", "test time ×", "step time ×", "LCP ×", "TBT ×"), summary),
+        "",
+        "## Test duration",
+        "",
+        report.markdown_table(("test", *names), per_test),
+        "",
+        "## LCP per route (ms)",
+        "",
+        report.markdown_table(("route", *names), per_route),
+    ])
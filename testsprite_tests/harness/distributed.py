@@ -0,0 +1,558 @@
+"""Coordinator/worker execution across machines.
+
+The coordinator holds the work queue and serves it over plain HTTP; workers
+on any machine with a checkout of this repository (and the same local stack
+or ``HARNESS_*`` URLs) pull one job at a time, run it and send back the
+result. A job is either a TC script (``--tests``, run in the worker's own
+process) or a harness command line (``--job "soak --iterations 400"``, run
+as ``python -m harness`` in a subprocess whose report files are uploaded as
+the job's artifacts). TC jobs go out longest first, using the durations the
+``schedule`` command keeps in its history; command jobs go out before them.
+
+Every job is leased for ``--lease`` seconds. While it runs, the worker
+heartbeats every third of the lease and streams progress with each beat —
+step results for TC scripts, output lines for commands. A worker that stops
+heartbeating (killed, machine gone, network split) loses its lease and the
+job goes back to the front of the queue, up to ``--max-attempts`` times;
+late results for a lease that was taken away are ignored.
+
+Endpoints (``X-Harness-Token`` must match ``--token`` when one is set):
+
+- ``POST /lease``                        ``{"worker"}`` -> a job, ``{"job": null}`` or ``{"done": true}``
+- ``POST /heartbeat``                    ``{"job", "lease", "lines"}`` -> ``{"ok"}``
+- ``PUT  /artifact/<job>/<path>?lease=`` raw body, streamed to disk
+- ``POST /result``                       ``{"job", "lease", "result"}``
+- ``GET  /status``                       queue state
+
+``--local-workers N`` starts N workers as subprocesses of the coordinator,
+which is how the mode is tried out (and requeueing exercised, by killing
+one) on a single machine.
+"""
+
+import asyncio
+import collections
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from urllib.parse import parse_qs, quote, urlsplit
+
+from harness import config, report, schedule, stats, tc_runner
+from harness.errors import HarnessError
+
+DEFAULT_PORT = 4200
+TERMINAL = ("passed", "failed", "error", "lost")
+_CHUNK = 1 << 20
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str  # "tc" or "command"
+    spec: str  # test id or harness command line
+    timeout_s: float
+    status: str = "pending"
+    attempts: list = field(default_factory=list)  # {"worker", "outcome", "duration_s"}
+    worker: str = None
+    lease: str = None
+    deadline: float = 0.0
+    leased_at: float = 0.0
+    result: dict = None
+    log: list = field(default_factory=list)
+    artifacts: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "spec": self.spec,
+            "status": self.status,
+            "worker": self.worker,
+            "attempts": self.attempts,
+            "result": self.result,
+            "artifacts": self.artifacts,
+            "log_tail": self.log[-20:],
+        }
+
+
+def build_jobs(args) -> list:
+    jobs = []
+    for index, command in enumerate(args.job, 1):
+        name = shlex.split(command)[0]
+        jobs.append(Job(f"cmd{index}-{name}", "command", command, args.command_timeout))
+    if args.tests or not args.job:
+        history = schedule.load_history(schedule.history_path(args.output_dir))
+
+        def expected(path):
+            runs = history.get(tc_runner.test_id(path), [])
+            return stats.percentile([r["duration_s"] for r in runs[-20:]], 75) if runs else 0.0
+
+        for path in sorted(tc_runner.selected(args), key=expected, reverse=True):
+            test = tc_runner.test_id(path)
+            for repeat in range(args.repeat):
+                jobs.append(Job(test if args.repeat == 1 else f"{test}#{repeat + 1}", "tc", test, args.timeout))
+    return jobs
+
+
+class WorkQueue:
+    """Jobs, leases and requeueing; not thread-safe, owned by the coordinator's event loop."""
+
+    def __init__(self, jobs: list, lease_s: float, max_attempts: int):
+        self.jobs = {job.id: job for job in jobs}
+        self.pending = collections.deque(job.id for job in jobs)
+        self.lease_s = lease_s
+        self.max_attempts = max_attempts
+        self.workers = {}  # worker -> {"first_seen", "last_seen", "jobs"}
+        self.requeued = 0
+
+    @property
+    def done(self) -> bool:
+        return all(job.status in TERMINAL for job in self.jobs.values())
+
+    def seen(self, worker: str):
+        now = time.time()
+        entry = self.workers.setdefault(worker, {"first_seen": now, "last_seen": now, "jobs": 0})
+        entry["last_seen"] = now
+
+    def lease(self, worker: str):
+        self.reap()
+        self.seen(worker)
+        if not self.pending:
+            return None
+        job = self.jobs[self.pending.popleft()]
+        job.status, job.worker, job.lease = "leased", worker, uuid.uuid4().hex
+        job.leased_at = time.time()
+        job.deadline = job.leased_at + self.lease_s
+        self.workers[worker]["jobs"] += 1
+        return job
+
+    def holder(self, job_id: str, lease: str):
+        """The job if ``lease`` is still its current lease, else None."""
+        job = self.jobs.get(job_id)
+        return job if job and job.status == "leased" and job.lease == lease else None
+
+    def heartbeat(self, job_id: str, lease: str, lines: list) -> bool:
+        job = self.holder(job_id, lease)
+        if not job:
+            return False
+        self.seen(job.worker)
+        job.deadline = time.time() + self.lease_s
+        job.log.extend(lines)
+        return True
+
+    def complete(self, job_id: str, lease: str, result: dict) -> bool:
+        job = self.holder(job_id, lease)
+        if not job:
+            return False
+        self.seen(job.worker)
+        job.status = result.get("status") if result.get("status") in TERMINAL else "error"
+        job.result = result
+        job.lease = None
+        job.attempts.append({"worker": job.worker, "outcome": job.status,
+                             "duration_s": time.time() - job.leased_at})
+        return True
+
+    def reap(self) -> list:
+        """Requeue (at the front) jobs whose lease ran out; returns their ids."""
+        now, expired = time.time(), []
+        for job in self.jobs.values():
+            if job.status == "leased" and job.deadline < now:
+                job.attempts.append({"worker": job.worker, "outcome": "lease expired",
+                                     "duration_s": now - job.leased_at})
+                job.lease = None
+                if len(job.attempts) >= self.max_attempts:
+                    job.status = "lost"
+                else:
+                    job.status = "pending"
+                    self.pending.appendleft(job.id)
+                    self.requeued += 1
+                expired.append(job.id)
+        return expired
+
+    def status(self) -> dict:
+        counts = collections.Counter(job.status for job in self.jobs.values())
+        return {"counts": dict(counts), "pending": list(self.pending), "requeued": self.requeued,
+                "leased": {j.id: j.worker for j in self.jobs.values() if j.status == "leased"}}
+
+
+class Coordinator:
+    """Serves a :class:`WorkQueue` over HTTP and stores uploaded artifacts."""
+
+    def __init__(self, queue: WorkQueue, artifact_dir: Path, token: str = None):
+        self.queue = queue
+        self.artifact_dir = artifact_dir
+        self.token = token
+
+    async def handle(self, reader, writer):
+        try:
+            method, target, headers = await _read_head(reader)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        url = urlsplit(target)
+        length = int(headers.get("content-length", 0))
+        try:
+            if self.token and headers.get("x-harness-token") != self.token:
+                await reader.readexactly(length)
+                status, body = 403, {"error": "bad token"}
+            elif method == "PUT" and url.path.startswith("/artifact/"):
+                status, body = await self._artifact(url, reader, length)
+            else:
+                payload = json.loads(await reader.readexactly(length) or b"{}")
+                status, body = self._route(method, url.path, payload)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError) as exc:
+            status, body = 400, {"error": str(exc)}
+        await _write_json(writer, status, body)
+        writer.close()
+
+    def _route(self, method: str, path: str, payload: dict):
+        queue = self.queue
+        if (method, path) == ("POST", "/lease"):
+            job = queue.lease(payload.get("worker", "?"))
+            if job:
+                print(f"{job.id}: leased to {job.worker}" + (f" (attempt {len(job.attempts) + 1})" if job.attempts else ""))
+                return 200, {"job": {"id": job.id, "kind": job.kind, "spec": job.spec, "timeout_s": job.timeout_s},
+                             "lease": job.lease, "lease_s": queue.lease_s}
+            return 200, {"done": True} if queue.done else {"job": None, "retry_s": 2}
+        if (method, path) == ("POST", "/heartbeat"):
+            return 200, {"ok": queue.heartbeat(payload["job"], payload["lease"], payload.get("lines", []))}
+        if (method, path) == ("POST", "/result"):
+            ok = queue.complete(payload["job"], payload["lease"], payload["result"])
+            if ok:
+                job = queue.jobs[payload["job"]]
+                print(f"{job.id}: {job.status} on {job.worker}")
+            return 200, {"ok": ok}
+        if (method, path) == ("GET", "/status"):
+            return 200, queue.status()
+        return 404, {"error": "Not found"}
+
+    async def _artifact(self, url, reader, length: int):
+        _, _, job_id, *parts = url.path.split("/")
+        lease = parse_qs(url.query).get("lease", [""])[0]
+        job = self.queue.holder(job_id, lease)
+        name = PurePosixPath(*parts) if parts else None
+        if not job or not name or ".." in name.parts:
+            await reader.readexactly(length)
+            return 409, {"error": "no such lease or bad name"}
+        target = self.artifact_dir / job.id / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        remaining = length
+        with target.open("wb") as handle:
+            while remaining:
+                chunk = await reader.read(min(_CHUNK, remaining))
+                if not chunk:
+                    raise ConnectionError("artifact upload cut short")
+                handle.write(chunk)
+                remaining -= len(chunk)
+        job.artifacts.append({"name": str(name), "bytes": length, "path": str(target)})
+        return 200, {"ok": True}
+
+    async def serve(self, host: str, port: int, linger_s: float, on_started=None):
+        server = await asyncio.start_server(self.handle, host, port)
+        try:
+            if on_started:
+                on_started()
+            while not self.queue.done:
+                await asyncio.sleep(0.5)
+                for job_id in self.queue.reap():
+                    job = self.queue.jobs[job_id]
+                    print(f"{job_id}: lease expired on {job.attempts[-1]['worker']}, "
+                          + ("requeued" if job.status == "pending" else "giving up"))
+            await asyncio.sleep(linger_s)  # let polling workers hear that we are done
+        finally:
+            server.close()
+            await server.wait_closed()
+
+
+async def _read_head(reader) -> tuple:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+
+async def _write_json(writer, status: int, payload):
+    body = json.dumps(payload, ensure_ascii=False, default=str).encode()
+    head = (
+        f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+class Client:
+    """Worker side of the protocol."""
+
+    def __init__(self, url: str, token: str = None, patience_s: float = 60.0):
+        self.url = url.rstrip("/")
+        self.token = token
+        self.patience_s = patience_s
+
+    def call(self, method: str, path: str, payload: dict = None, data=None, length: int = None) -> dict:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["X-Harness-Token"] = self.token
+        if data is None:
+            data = json.dumps(payload or {}).encode()
+        else:
+            headers["Content-Type"] = "application/octet-stream"
+            headers["Content-Length"] = str(length)
+        give_up = time.monotonic() + self.patience_s
+        while True:
+            request = urllib.request.Request(self.url + path, data=data, headers=headers, method=method)
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    return json.loads(response.read())
+            except urllib.error.HTTPError as exc:
+                raise HarnessError(f"coordinator {method} {path}: HTTP {exc.code} {exc.read()[:200]!r}") from None
+            except OSError as exc:
+                if time.monotonic() > give_up or not isinstance(data, bytes):
+                    raise HarnessError(f"coordinator at {self.url} unreachable: {exc}") from None
+                time.sleep(2)
+
+    def upload(self, job: dict, lease: str, path: Path, name: str):
+        with path.open("rb") as handle:
+            self.call("PUT", f"/artifact/{quote(job['id'])}/{quote(name)}?lease={lease}", data=handle,
+                      length=path.stat().st_size)
+
+
+class Heartbeat(threading.Thread):
+    """Keeps a lease alive and ships queued progress lines with every beat."""
+
+    def __init__(self, client: Client, job: dict, lease: str, interval_s: float):
+        super().__init__(daemon=True)
+        self.client = client
+        self.job = job
+        self.lease = lease
+        self.interval_s = interval_s
+        self.lines = collections.deque()
+        self.lost = threading.Event()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval_s):
+            self.beat()
+
+    def beat(self):
+        lines = [self.lines.popleft() for _ in range(len(self.lines))]
+        try:
+            ok = self.client.call("POST", "/heartbeat", {"job": self.job["id"], "lease": self.lease, "lines": lines})
+        except HarnessError:
+            return  # the next beat may get through before the lease runs out
+        if not ok.get("ok"):
+            self.lost.set()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.beat()  # flush the last lines
+
+
+class Progress(tc_runner.Plugin):
+    """Streams step outcomes of a TC job through the heartbeat."""
+
+    name = "progress"
+
+    def __init__(self, heartbeat: Heartbeat):
+        self.heartbeat = heartbeat
+
+    async def on_step_end(self, run, step, page):
+        outcome = f"error: {step.error}" if step.error else "ok"
+        self.heartbeat.lines.append(f"step {step.index} {step.signature} {step.duration_ms:.0f} ms {outcome}")
+
+
+def run_tc(job: dict, heartbeat: Heartbeat) -> dict:
+    path = tc_runner.discover([job["spec"]])[0]
+    run = asyncio.run(tc_runner.run_test_file(path, [Progress(heartbeat)], job["timeout_s"]))
+    return run.as_dict()
+
+
+def run_command(job: dict, heartbeat: Heartbeat, client: Client, lease: str, work_dir: Path) -> dict:
+    output = Path(tempfile.mkdtemp(prefix=job["id"].replace("#", "-") + "-", dir=work_dir))
+    argv = [sys.executable, "-m", "harness", "--output-dir", str(output), *shlex.split(job["spec"])]
+    started = time.monotonic()
+    process = subprocess.Popen(argv, cwd=config.TESTS_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, bufsize=1)
+    timer = threading.Timer(job["timeout_s"], process.kill)
+    timer.start()
+    try:
+        for line in process.stdout:
+            heartbeat.lines.append(line.rstrip())
+            if heartbeat.lost.is_set():
+                process.kill()
+        code = process.wait()
+    finally:
+        timer.cancel()
+    artifacts = sorted(p for p in output.rglob("*") if p.is_file())
+    if not heartbeat.lost.is_set():
+        for path in artifacts:
+            client.upload(job, lease, path, path.relative_to(output).as_posix())
+    status = {0: "passed", 1: "failed"}.get(code, "error")
+    return {"status": status, "exit_code": code, "duration_s": time.monotonic() - started,
+            "artifacts": [p.relative_to(output).as_posix() for p in artifacts]}
+
+
+def work(args) -> int:
+    client = Client(args.coordinator, args.token, args.patience)
+    worker = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    work_dir = Path(args.output_dir or config.OUTPUT_DIR) / "distributed" / f"worker-{worker}"
+    work_dir.mkdir(parents=True, exist_ok=True)
+    done = 0
+    print(f"worker {worker} pulling from {client.url}")
+    while not args.max_jobs or done < args.max_jobs:
+        lease = client.call("POST", "/lease", {"worker": worker})
+        if lease.get("done"):
+            break
+        if not lease.get("job"):
+            time.sleep(lease.get("retry_s", 2))
+            continue
+        job = lease["job"]
+        heartbeat = Heartbeat(client, job, lease["lease"], lease["lease_s"] / 3)
+        heartbeat.start()
+        print(f"{job['id']}: running")
+        try:
+            if job["kind"] == "tc":
+                result = run_tc(job, heartbeat)
+            else:
+                result = run_command(job, heartbeat, client, lease["lease"], work_dir)
+        except Exception as exc:  # report it; the coordinator decides what a broken job means
+            result = {"status": "error", "error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            heartbeat.stop()
+        if heartbeat.lost.is_set():
+            print(f"{job['id']}: lease was taken away, dropping the result")
+        else:
+            client.call("POST", "/result", {"job": job["id"], "lease": lease["lease"], "result": result})
+            print(f"{job['id']}: {result['status']}")
+        done += 1
+    print(f"worker {worker} finished after {done} jobs")
+    return 0
+
+
+def coordinate(args) -> int:
+    jobs = build_jobs(args)
+    if not jobs:
+        raise HarnessError("nothing to run")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    artifact_dir = Path(args.output_dir or config.OUTPUT_DIR) / "distributed" / stamp
+    queue = WorkQueue(jobs, args.lease, args.max_attempts)
+    coordinator = Coordinator(queue, artifact_dir, args.token)
+    url = f"http://{'127.0.0.1' if args.host in ('0.0.0.0', '') else args.host}:{args.port}"
+    workers = []
+
+    def started():
+        print(f"coordinator on {args.host}:{args.port}: {len(jobs)} jobs, lease {args.lease:.0f} s")
+        for index in range(args.local_workers):
+            argv = [sys.executable, "-m", "harness", "distributed", "worker", "--coordinator", url,
+                    "--worker-id", f"local{index + 1}"]
+            if args.output_dir:
+                argv[3:3] = ["--output-dir", str(args.output_dir)]
+            if args.token:
+                argv += ["--token", args.token]
+            workers.append(subprocess.Popen(argv, cwd=config.TESTS_DIR))
+
+    began = time.monotonic()
+    try:
+        asyncio.run(coordinator.serve(args.host, args.port, args.linger, started))
+    finally:
+        for process in workers:
+            try:
+                process.wait(timeout=args.linger + 5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    payload = summarize(queue, time.monotonic() - began, str(artifact_dir))
+    path = report.write_report("distributed", payload, render_markdown(payload), args.output_dir)
+    print(f"distributed report: {path}")
+    return 0 if all(j["status"] == "passed" for j in payload["jobs"]) else 1
+
+
+def summarize(queue: WorkQueue, wall_s: float, artifact_dir: str) -> dict:
+    jobs = [job.as_dict() for job in queue.jobs.values()]
+    busy = collections.defaultdict(float)
+    for job in jobs:
+        for attempt in job["attempts"]:
+            busy[attempt["worker"]] += attempt["duration_s"]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "wall_s": wall_s,
+        "busy_s": sum(busy.values()),
+        "requeued": queue.requeued,
+        "artifact_dir": artifact_dir,
+        "workers": [{"worker": w, **info, "busy_s": busy[w]} for w, info in sorted(queue.workers.items())],
+        "jobs": jobs,
+    }
+
+
+def configure_parser(parser):
+    parser.add_argument("role", choices=("coordinator", "worker"))
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--token", default=config.DISTRIBUTED_TOKEN,
+                        help="shared secret workers must send (default: $HARNESS_DISTRIBUTED_TOKEN)")
+    coordinator = parser.add_argument_group("coordinator")
+    coordinator.add_argument("--job", action="append", default=[], metavar="COMMAND",
+                             help='harness command line to run as one job, e.g. "soak --iterations 400"; repeatable')
+    coordinator.add_argument("--repeat", type=int, default=1, help="queue every TC script this many times")
+    coordinator.add_argument("--host", default="127.0.0.1", help="0.0.0.0 to accept workers from other machines")
+    coordinator.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator.add_argument("--lease", type=float, default=60.0, help="seconds without a heartbeat before requeueing")
+    coordinator.add_argument("--max-attempts", type=int, default=2)
+    coordinator.add_argument("--command-timeout", type=float, default=4 * 3600.0, help="seconds per command job")
+    coordinator.add_argument("--local-workers", type=int, default=0, help="start this many workers here")
+    coordinator.add_argument("--linger", type=float, default=5.0, help="seconds to keep answering after the last job")
+    worker = parser.add_argument_group("worker")
+    worker.add_argument("--coordinator", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    worker.add_argument("--worker-id", help="default: <hostname>-<pid>")
+    worker.add_argument("--max-jobs", type=int, default=0, help="exit after this many jobs (0: until done)")
+    worker.add_argument("--patience", type=float, default=60.0, help="seconds to retry an unreachable coordinator")
+
+
+def run(args) -> int:
+    return coordinate(args) if args.role == "coordinator" else work(args)
+
+
+def render_markdown(payload: dict) -> str:
+    jobs = payload["jobs"]
+    counts = collections.Counter(j["status"] for j in jobs)
+    summary = ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+    return "\n".join([
+        "# Distributed run",
+        "",
+        f"Generated {payload['generated_at']}: {len(jobs)} jobs ({summary}) on {len(payload['workers'])} workers "
+        f"in {payload['wall_s']:.0f} s wall, {payload['busy_s']:.0f} s of work; {payload['requeued']} requeued. "
+        f"Artifacts in `{payload['artifact_dir']}`.",
+        "",
+        report.markdown_table(
+            ("job", "kind", "status", "worker", "attempts", "duration s", "artifacts", "error"),
+            [(j["id"], j["kind"], j["status"], j["worker"],
+              " → ".join(f"{a['worker']}: {a['outcome']}" for a in j["attempts"]) or "-",
+              (j["result"] or {}).get("duration_s"), len(j["artifacts"]), (j["result"] or {}).get("error"))
+             for j in jobs],
+        ),
+        "",
+        report.markdown_table(
+            ("worker", "jobs leased", "busy s", "last seen"),
+            [(w["worker"], w["jobs"], w["busy_s"], time.strftime("%H:%M:%S", time.localtime(w["last_seen"])))
+             for w in payload["workers"]],
+        ),
+    ])
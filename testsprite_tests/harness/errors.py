@@ -0,0 +1,5 @@
+"""Exceptions raised by the harness."""
+
+
+class HarnessError(RuntimeError):
+    """A benchmark could not run (missing dependency, bad config, no seed data)."""
@@ -0,0 +1,290 @@
+"""Next.js hydration cost and time-to-interactive per route.
+
+Every document a TC run loads gets an init script that timestamps, relative
+to navigation start:
+
+* HTML first byte and last byte, ``domInteractive`` and first contentful
+  paint (Navigation Timing and paint entries);
+* hydration start — Next.js's ``beforeRender`` mark when the Pages Router
+  sets it, else React's first scheduled root update (development builds),
+  else the moment react-dom registered with the DevTools hook;
+* hydration end — the commit whose previous root state was still
+  dehydrated, i.e. the shell finished hydrating and React owns the DOM;
+* the first input the page accepted (Event Timing ``first-input``: when it
+  happened and how long it waited for the main thread);
+* every click that landed on an element React had not hydrated yet. Those
+  clicks are silently dropped, which is why TC001/TC003 click the role-card
+  SVGs several times.
+
+Hydration mismatch warnings (``Text content does not match``, ``Hydration
+failed``, minified React errors #418/#423/#425) are collected from the
+console. The report gives per route the medians of those marks, the
+paint-to-interactive gap, mismatch counts, clicks before hydration, and the
+steps a script repeated back to back on the same target.
+"""
+
+import asyncio
+import re
+import statistics
+import time
+
+from harness import coverage, report, tc_runner
+
+_SCRIPT = """
+(() => {
+  const h = window.__harnessHydration = {
+    url: location.href, injected: null, scheduled: null, first_commit: null, end: null, mode: null,
+    render_ms: null, commits_before: 0, first_input: null, marks: {}, clicks: [],
+  };
+  const now = () => performance.now();
+  const observe = (type, each) => {
+    try { new PerformanceObserver((list) => list.getEntries().forEach(each)).observe({ type, buffered: true }); } catch (e) {}
+  };
+  observe("first-input", (e) => {
+    if (!h.first_input) h.first_input = { at: e.startTime, delay: e.processingStart - e.startTime, type: e.name };
+  });
+  observe("mark", (e) => { if (!(e.name in h.marks)) h.marks[e.name] = e.startTime; });
+  const hydrated = (el) => !!el && Object.keys(el).some((k) => k.startsWith("__reactFiber$"));
+  addEventListener("click", (e) => {
+    h.clicks.push({ at: now(), hydrated: hydrated(e.target), target: e.target.tagName || "" });
+  }, true);
+
+  const noop = () => {};
+  const hook = window.__REACT_DEVTOOLS_GLOBAL_HOOK__ || (window.__REACT_DEVTOOLS_GLOBAL_HOOK__ = {
+    renderers: new Map(), supportsFiber: true, isDisabled: false,
+    inject(renderer) { const id = this.renderers.size + 1; this.renderers.set(id, renderer); return id; },
+    onCommitFiberRoot: noop, onCommitFiberUnmount: noop, onPostCommitFiberRoot: noop,
+    onScheduleFiberRoot: noop, checkDCE: noop, on: noop, off: noop, emit: noop, sub: () => noop,
+  });
+  const chain = (name, before) => {
+    const original = hook[name] || noop;
+    hook[name] = function () {
+      try { before.apply(null, arguments); } catch (e) {}
+      return original.apply(this, arguments);
+    };
+  };
+  chain("inject", () => { if (h.injected === null) h.injected = now(); });
+  chain("onScheduleFiberRoot", () => { if (h.scheduled === null) h.scheduled = now(); });
+  chain("onCommitFiberRoot", (id, root) => {
+    if (h.end !== null) return;
+    if (h.first_commit === null) h.first_commit = now();
+    const previous = root.current.alternate && root.current.alternate.memoizedState;
+    if (previous && previous.isDehydrated) {
+      h.end = now();
+      h.mode = "hydrate";
+      if (typeof root.current.actualDuration === "number") h.render_ms = root.current.actualDuration;
+    } else {
+      h.mode = h.mode || "client";
+      h.commits_before++;
+    }
+  });
+})();
+"""
+
+_SNAPSHOT = """() => {
+  const h = window.__harnessHydration;
+  if (!h) return null;
+  const nav = performance.getEntriesByType("navigation")[0] || {};
+  const fcp = performance.getEntriesByName("first-contentful-paint")[0];
+  return { ...h, origin: performance.timeOrigin, html_first_byte: nav.responseStart, html_done: nav.responseEnd,
+           dom_interactive: nav.domInteractive, fcp: fcp ? fcp.startTime : null };
+}"""
+
+MISMATCH = re.compile(
+    r"hydrat|did not match|does not match server|Minified React error #(418|422|423|425)",
+    re.IGNORECASE,
+)
+
+
+def hydration_start(doc: dict):
+    """``(ms, source)`` for the best available hydration start mark."""
+    if doc["marks"].get("beforeRender") is not None:
+        return doc["marks"]["beforeRender"], "next-mark"
+    if doc["scheduled"] is not None:
+        return doc["scheduled"], "react-schedule"
+    if doc["injected"] is not None:
+        return doc["injected"], "react-inject"
+    return None, None
+
+
+def document_metrics(doc: dict) -> dict:
+    start, source = hydration_start(doc)
+    end = doc["end"] if doc["end"] is not None else doc["marks"].get("afterHydrate")
+    if end is None and doc["mode"] == "client":
+        end = doc["first_commit"]  # rendered on the client: interactive once React first commits
+    first_input = doc["first_input"] or {}
+    return {
+        "route": coverage.route_label(doc["url"]),
+        "mode": doc["mode"] or "no-react",
+        "html_first_byte_ms": doc["html_first_byte"],
+        "html_done_ms": doc["html_done"],
+        "dom_interactive_ms": doc["dom_interactive"],
+        "fcp_ms": doc["fcp"],
+        "hydration_start_ms": start,
+        "hydration_start_source": source,
+        "hydration_end_ms": end,
+        "hydration_ms": end - start if end is not None and start is not None else None,
+        "hydration_render_ms": doc["render_ms"],
+        "paint_to_interactive_ms": end - doc["fcp"] if end is not None and doc["fcp"] is not None else None,
+        "first_input_ms": first_input.get("at"),
+        "first_input_delay_ms": first_input.get("delay"),
+        "clicks": len(doc["clicks"]),
+        "clicks_before_hydration": sum(1 for c in doc["clicks"] if not c["hydrated"]),
+    }
+
+
+class HydrationPlugin(tc_runner.Plugin):
+    """Collects hydration marks per document and mismatch warnings per route."""
+
+    name = "hydration"
+
+    def __init__(self, documents: dict, mismatches: list):
+        self.documents = documents  # (page id, timeOrigin) -> latest snapshot; shared across tests
+        self.mismatches = mismatches
+
+    async def on_context(self, run, context):
+        await context.add_init_script(script=_SCRIPT)
+        context.on("page", lambda page: self._listen(run, page))
+        for page in context.pages:
+            self._listen(run, page)
+
+    def _listen(self, run, page):
+        def on_console(message):
+            if message.type in ("error", "warning") and MISMATCH.search(message.text):
+                self._mismatch(run, page, message.text)
+
+        def on_error(error):
+            if MISMATCH.search(str(error)):
+                self._mismatch(run, page, str(error))
+
+        page.on("console", on_console)
+        page.on("pageerror", on_error)
+
+    def _mismatch(self, run, page, text: str):
+        self.mismatches.append({
+            "test_id": run.test_id,
+            "route": coverage.route_label(page.url),
+            "step": run.current_step.index if run.current_step else None,
+            "message": text.strip().splitlines()[0][:300],
+        })
+
+    async def on_step_start(self, run, step, page):
+        await self._snapshot(page)
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            await self._snapshot(page)
+
+    async def _snapshot(self, page):
+        if page.is_closed() or not page.url.startswith("http"):
+            return
+        try:
+            doc = await page.evaluate(_SNAPSHOT)
+        except Exception:
+            return  # mid-navigation
+        if doc:
+            self.documents[(id(page), doc["origin"])] = doc
+
+
+def repeated_steps(run) -> list:
+    """Back-to-back steps of the same kind on the same target (re-clicks)."""
+    repeats, previous = [], None
+    for step in run.steps:
+        if previous and step.kind == previous.kind and step.target == previous.target:
+            if repeats and repeats[-1]["last_step"] == previous.index:
+                repeats[-1]["count"] += 1
+                repeats[-1]["last_step"] = step.index
+            else:
+                repeats.append({"test_id": run.test_id, "kind": step.kind, "target": step.target,
+                                "first_step": previous.index, "last_step": step.index, "count": 2})
+        previous = step
+    return repeats
+
+
+def aggregate(documents) -> list:
+    grouped = {}
+    for doc in documents:
+        metrics = document_metrics(doc)
+        grouped.setdefault(metrics["route"], []).append(metrics)
+    routes = []
+    for route, visits in sorted(grouped.items()):
+        row = {"route": route, "visits": len(visits),
+               "hydrated_visits": sum(1 for v in visits if v["mode"] == "hydrate")}
+        for key in ("html_done_ms", "fcp_ms", "hydration_start_ms", "hydration_end_ms", "hydration_ms",
+                    "hydration_render_ms", "paint_to_interactive_ms", "first_input_delay_ms"):
+            values = [v[key] for v in visits if v[key] is not None]
+            row[key] = statistics.median(values) if values else None
+        row["clicks_before_hydration"] = sum(v["clicks_before_hydration"] for v in visits)
+        routes.append(row)
+    return routes
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+
+
+def run(args) -> int:
+    payload = asyncio.run(collect(args))
+    path = report.write_report("hydration", payload, render_markdown(payload), args.output_dir)
+    print(f"hydration report: {path}")
+    return 0
+
+
+async def collect(args) -> dict:
+    documents, mismatches, repeats = {}, [], []
+    for path in tc_runner.selected(args):
+        run = await tc_runner.run_test_file(path, [HydrationPlugin(documents, mismatches)], args.timeout)
+        print(f"{run.test_id}: {run.status}")
+        repeats += repeated_steps(run)
+    routes = aggregate(documents.values())
+    for row in routes:
+        row["mismatches"] = sum(1 for m in mismatches if m["route"] == row["route"])
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "routes": routes,
+        "mismatches": mismatches,
+        "repeated_steps": repeats,
+        "documents": [document_metrics(d) for d in documents.values()],
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (r["route"], r["visits"], r["html_done_ms"], r["fcp_ms"], r["hydration_start_ms"], r["hydration_end_ms"],
+         r["hydration_ms"], r["paint_to_interactive_ms"], r["first_input_delay_ms"], r["clicks_before_hydration"],
+         r["mismatches"])
+        for r in sorted(payload["routes"], key=lambda r: r["paint_to_interactive_ms"] or 0, reverse=True)
+    ]
+    lines = [
+        "# Hydration cost per route",
+        "",
+        f"Generated {payload['generated_at']}. Times are medians in ms from navigation start.",
+        "",
+        report.markdown_table(
+            ("route", "visits", "HTML", "FCP", "hydration start", "interactive", "hydration ms",
+             "paint → interactive", "first input delay", "clicks before hydration", "mismatches"),
+            rows,
+        ),
+    ]
+    if payload["mismatches"]:
+        lines += [
+            "",
+            "## Hydration mismatch warnings",
+            "",
+            report.markdown_table(
+                ("test", "step", "route", "message"),
+                [(m["test_id"], m["step"], m["route"], m["message"][:120]) for m in payload["mismatches"]],
+            ),
+        ]
+    if payload["repeated_steps"]:
+        lines += [
+            "",
+            "## Actions the scripts repeated back to back",
+            "",
+            report.markdown_table(
+                ("test", "steps", "action", "times"),
+                [(r["test_id"], f"{r['first_step']}–{r['last_step']}", f"{r['kind']} {r['target'][:60]}", r["count"])
+                 for r in payload["repeated_steps"]],
+            ),
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,339 @@
+"""Test impact analysis: run only the TC scripts a change can affect.
+
+``--record`` runs the scripts with coverage and network recording on and
+writes, per test, what it touched into ``harness_output/impact/map.json``:
+the apps and routes it visited, the JS chunks it loaded, the source files
+behind them (through source maps with ``--source-maps``; ``next dev``
+modules need none), the Supabase tables and RPCs it called and the app's
+own ``/api`` routes. Recording again only replaces the tests that ran.
+
+``--changed-since REV`` lists the files changed since a git revision and
+maps each one to the tests that could notice:
+
+* a TC script selects itself; harness code and workspace-wide config
+  (``package.json``, the lockfile, ``nx.json``, ``tsconfig*.json``) select
+  everything, documentation nothing;
+* a migration selects the tests touching the tables and functions it
+  creates, alters, indexes, puts policies or triggers on — or everything,
+  when no name can be read from it;
+* a file under ``apps/<app>/web`` selects the tests that loaded it; failing
+  that, a ``page``/``layout`` file selects the tests that visited its route
+  and an ``api/**/route.ts`` the tests that called it; anything else (server
+  components, middleware, config) every test that visited the app;
+* a file under ``packages/<pkg>`` selects the tests that loaded it and those
+  visiting an app whose ``web/package.json`` depends on ``@red-salud/<pkg>``.
+
+Tests missing from the map are always selected. ``--run`` then runs the
+selection.
+"""
+
+import asyncio
+import json
+import posixpath
+import re
+import subprocess
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from harness import config, coverage, network, report, sourcemap, tc_runner
+from harness.errors import HarnessError
+
+ROOT_CONFIG = re.compile(r"^(package\.json|pnpm-lock\.yaml|pnpm-workspace\.yaml|nx\.json|tsconfig[\w.]*\.json)$")
+DOCS = re.compile(r"(\.md$|^docs/|^openspec/)")
+MIGRATIONS = ("supabase/migrations/", "database/migrations/", "supabase/seed.sql")
+ROUTE_FILES = re.compile(r"^(page|layout|template|loading|error|not-found)\.(tsx?|jsx?)$")
+_NAME = r"((?:\"?\w+\"?\.)?\"?\w+\"?)(?![\w\".])"  # not "public" out of a dynamic "public.%I"
+SQL_TABLES = [
+    re.compile(r"\b(?:create|alter|drop)\s+table\s+(?:if\s+(?:not\s+)?exists\s+)?(?:only\s+)?" + _NAME, re.I),
+    re.compile(r"\bcreate\s+(?:unique\s+)?index\s+(?:concurrently\s+)?(?:if\s+not\s+exists\s+)?\w*\s*on\s+(?:only\s+)?"
+               + _NAME, re.I),
+    re.compile(r"\bcreate\s+policy\s+(?:\"[^\"]+\"|\w+)\s+on\s+" + _NAME, re.I),
+    re.compile(r"\bcreate\s+(?:or\s+replace\s+)?trigger\s+\w+[^;]*?\bon\s+" + _NAME, re.I),
+    # "for update" (policies, row locks) is consumed without a name so its "using"/"to"/"skip" is not a table
+    re.compile(r"\bfor\s+update\b|\b(?:insert\s+into|update|delete\s+from)\s+" + _NAME, re.I),
+]
+SQL_FUNCTION = re.compile(r"\bcreate\s+(?:or\s+replace\s+)?function\s+" + _NAME + r"\s*\(", re.I)
+SKIPPED_SCHEMAS = ("auth", "storage", "pg_catalog", "information_schema", "cron", "extensions")
+SQL_KEYWORDS = {"on", "of", "set", "or", "only", "if"}  # e.g. the "update on" of a trigger
+
+
+def map_path(output_dir) -> Path:
+    return Path(output_dir or config.OUTPUT_DIR) / "impact" / "map.json"
+
+
+def load_map(path: Path) -> dict:
+    if not path.exists():
+        return {"tests": {}}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def repo_source(source: str, app: str) -> str:
+    """A source-map or ``webpack-internal`` source as a repo-relative path, or None."""
+    source = sourcemap.clean_source(source)
+    if "[project]/" in source:  # turbopack
+        return source.split("[project]/", 1)[1]
+    source = re.sub(r"^\([\w-]+\)/", "", source)  # webpack layer, e.g. (app-pages-browser)
+    while source.startswith("./"):
+        source = source[2:]
+    if "node_modules/" in source or source.startswith(("webpack/", "next/")) or not app:
+        return None
+    path = posixpath.normpath(f"apps/{app}/web/{source}")
+    return None if path.startswith("..") else path
+
+
+def footprint(store: dict, exchanges: list) -> dict:
+    """What one test touched, from its coverage store and network exchanges."""
+    apps, routes, chunks, sources, tables, api = set(), set(), set(), set(), set(), set()
+    for route, entries in store.items():
+        app, _, _ = route.partition(":")
+        routes.add(route)
+        if app in config.APP_PORTS:
+            apps.add(app)
+        for url, entry in entries.items():
+            if entry["kind"] != "js":
+                continue
+            chunks.add(coverage.chunk_name(url))
+            names = {name for _, _, name in entry["spans"] or ()}
+            if url.startswith("webpack-internal://"):
+                names.add(url)
+            for name in names:
+                path = repo_source(name, app if app in config.APP_PORTS else None)
+                if path:
+                    sources.add(path)
+    for exchange in exchanges:
+        app = config.app_for_url(exchange.url)
+        if network.is_rest(exchange.url):
+            tables.add(network.rest_table(exchange.url))
+        elif app and urlsplit(exchange.url).path.startswith("/api/"):
+            api.add(f"{app}:{network.route_of(exchange.url)}")
+        if app and exchange.resource_type == "document":
+            apps.add(app)
+            routes.add(f"{app}:{network.route_of(exchange.url)}")
+    return {key: sorted(value) for key, value in (
+        ("apps", apps), ("routes", routes), ("chunks", chunks), ("sources", sources),
+        ("tables", tables - {""}), ("api", api),
+    )}
+
+
+def changed_files(rev: str) -> list:
+    try:
+        result = subprocess.run(
+            ["git", "diff", "--name-only", rev], cwd=config.REPO_DIR, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError) as exc:
+        raise HarnessError(f"git diff {rev}: {getattr(exc, 'stderr', '') or exc}".strip()) from None
+    return [line for line in result.stdout.splitlines() if line.strip()]
+
+
+def sql_objects(text: str) -> set:
+    """Tables (``name``) and functions (``rpc/name``) a migration touches, public schema only."""
+    text = re.sub(r"--[^\n]*", "", text)
+    text = re.sub(r"\"[^\"\n]*\s[^\"\n]*\"", '"_"', text)  # policy names read like DML: "Allow update to ..."
+    found = set()
+    for pattern, prefix in [(p, "") for p in SQL_TABLES] + [(SQL_FUNCTION, "rpc/")]:
+        for match in pattern.finditer(text):
+            if match.group(1) is None:
+                continue
+            schema, _, name = match.group(1).replace('"', "").rpartition(".")
+            if schema in SKIPPED_SCHEMAS or name.lower() in SQL_KEYWORDS:
+                continue
+            found.add(prefix + name.lower())
+    return found
+
+
+def route_pattern(parts: list) -> str:
+    """Directories under ``src/app`` -> regex source for the route (``(groups)`` dropped, ``[id]`` any segment)."""
+    segments = [p for p in parts if not (p.startswith("(") and p.endswith(")")) and not p.startswith("@")]
+    path = "".join("/" + (r"[^/]+" if s.startswith("[") else re.escape(s)) for s in segments)
+    return path or "/"
+
+
+def app_dependencies() -> dict:
+    """``{package dir: apps whose web/package.json depends on it}``."""
+    names = {}
+    for manifest in (config.REPO_DIR / "packages").glob("*/package.json"):
+        names[json.loads(manifest.read_text(encoding="utf-8")).get("name")] = manifest.parent.name
+    users = {}
+    for manifest in (config.REPO_DIR / "apps").glob("*/web/package.json"):
+        data = json.loads(manifest.read_text(encoding="utf-8"))
+        for dependency in {**data.get("dependencies", {}), **data.get("devDependencies", {})}:
+            if dependency in names:
+                users.setdefault(names[dependency], set()).add(manifest.parent.parent.name)
+    return users
+
+
+def affected(path: str, tests: dict, everything: set, dependents: dict = None) -> tuple:
+    """``(tests, reason)`` for one changed repo-relative path."""
+    if path.startswith("testsprite_tests/"):
+        name = path.rsplit("/", 1)[-1]
+        if re.match(r"TC\d+", name):
+            test = name.split("_", 1)[0]
+            return {test} & everything, "TC script"
+        if path.startswith("testsprite_tests/harness/") and not name.endswith(".md"):
+            return set(everything), "harness code"
+        return set(), "test data"
+    if DOCS.search(path):
+        return set(), "documentation"
+    if ROOT_CONFIG.match(path):
+        return set(everything), "workspace config"
+    if path.startswith(MIGRATIONS):
+        full = config.REPO_DIR / path
+        objects = sql_objects(full.read_text(encoding="utf-8")) if full.exists() else set()
+        if not objects:
+            return set(everything), "migration (no tables parsed)"
+        hit = {t for t, fp in tests.items() if objects & set(fp["tables"])}
+        return hit, f"migration: {', '.join(sorted(objects))}"
+    parts = path.split("/")
+    if parts[0] == "apps" and len(parts) > 2:
+        app = parts[1]
+        if parts[2] != "web":
+            return set(), f"{app} {parts[2]} (not exercised)"
+        hit = {t for t, fp in tests.items() if path in fp["sources"]}
+        if hit:
+            return hit, "loaded by test"
+        if parts[3:5] == ["src", "app"]:
+            inner = parts[5:-1]
+            if inner[:1] == ["api"] and re.match(r"route\.(ts|js)$", parts[-1]):
+                pattern = re.compile(f"^{re.escape(app)}:{route_pattern(inner)}$")
+                return {t for t, fp in tests.items() if any(pattern.match(a) for a in fp["api"])}, "API route"
+            if ROUTE_FILES.match(parts[-1]):
+                tail = "" if parts[-1].startswith("page.") else "(/.*)?"
+                pattern = re.compile(f"^{re.escape(app)}:{route_pattern(inner).rstrip('/')}{tail}/?$")
+                return {t for t, fp in tests.items() if any(pattern.match(r) for r in fp["routes"])}, "route file"
+        return {t for t, fp in tests.items() if app in fp["apps"]}, f"{app} web (not in client coverage)"
+    if parts[0] == "packages" and len(parts) > 1:
+        package = parts[1]
+        prefix = f"packages/{package}/"
+        apps = (dependents if dependents is not None else app_dependencies()).get(package, set())
+        hit = {t for t, fp in tests.items()
+               if any(s.startswith(prefix) for s in fp["sources"]) or apps & set(fp["apps"])}
+        return hit, f"package used by {', '.join(sorted(apps)) or 'no web app'}"
+    return set(), "outside the apps under test"
+
+
+def select(files: list, tests: dict, everything: set) -> tuple:
+    """``(selected tests, per-file entries, unmapped tests)``; unmapped tests are always selected."""
+    dependents = app_dependencies()
+    unmapped = everything - set(tests)
+    chosen, entries = set(unmapped), []
+    for path in files:
+        hit, reason = affected(path, tests, everything, dependents)
+        chosen |= hit
+        entries.append({"path": path, "reason": reason, "tests": sorted(hit)})
+    return chosen, entries, sorted(unmapped)
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--record", action="store_true", help="run the tests and record what each one touches")
+    parser.add_argument("--source-maps", action="store_true", help="resolve chunks to source files while recording")
+    parser.add_argument("--changed-since", metavar="REV", help="select the tests affected by changes since REV")
+    parser.add_argument("--run", action="store_true", help="run the selected tests")
+
+
+def run(args) -> int:
+    if bool(args.record) == bool(args.changed_since):
+        raise HarnessError("give either --record or --changed-since REV")
+    path = map_path(args.output_dir)
+    if args.record:
+        payload = asyncio.run(record(args, path))
+        markdown = render_record(payload)
+    else:
+        payload = asyncio.run(analyze(args, path))
+        markdown = render_markdown(payload)
+    out = report.write_report("impact", payload, markdown, args.output_dir)
+    print(f"impact report: {out}")
+    return 0 if all(r["status"] == "passed" for r in payload.get("results", [])) else 1
+
+
+async def record(args, path: Path) -> dict:
+    impact_map = load_map(path)
+    results = []
+    for test_path in tc_runner.selected(args):
+        store, recorder = {}, network.NetworkRecorder()
+        run = await tc_runner.run_test_file(
+            test_path, [coverage.CoveragePlugin(store, args.source_maps), recorder], args.timeout
+        )
+        entry = footprint(store, recorder.exchanges)
+        impact_map["tests"][run.test_id] = {**entry, "status": run.status,
+                                            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        print(f"{run.test_id}: {run.status}, {len(entry['sources'])} sources, {len(entry['tables'])} tables")
+        results.append({"test_id": run.test_id, "status": run.status, "duration_s": run.duration_s})
+    impact_map["git_rev"] = _head()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(impact_map, indent=2), encoding="utf-8")
+    return {"generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "mode": "record", "map": str(path),
+            "results": results, "tests": {r["test_id"]: impact_map["tests"][r["test_id"]] for r in results}}
+
+
+async def analyze(args, path: Path) -> dict:
+    impact_map = load_map(path)
+    paths = {tc_runner.test_id(p): p for p in tc_runner.selected(args)}
+    tests = {t: fp for t, fp in impact_map["tests"].items() if t in paths}
+    files = changed_files(args.changed_since)
+    chosen, entries, unmapped = select(files, tests, set(paths))
+    for test in sorted(paths):
+        print(f"{'run ' if test in chosen else 'skip'} {test}")
+    results = []
+    if args.run:
+        runs = await tc_runner.run_suite([paths[t] for t in sorted(chosen)], list, args.timeout)
+        results = [{"test_id": r.test_id, "status": r.status, "duration_s": r.duration_s, "error": r.error}
+                   for r in runs]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": "changed-since",
+        "rev": args.changed_since,
+        "map_rev": impact_map.get("git_rev"),
+        "files": entries,
+        "unmapped": unmapped,
+        "selected": sorted(chosen),
+        "skipped": sorted(set(paths) - chosen),
+        "results": results,
+    }
+
+
+def _head() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=config.REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def render_record(payload: dict) -> str:
+    rows = [(t, fp["status"], len(fp["apps"]), len(fp["routes"]), len(fp["chunks"]), len(fp["sources"]),
+             ", ".join(fp["tables"]) or "-")
+            for t, fp in sorted(payload["tests"].items())]
+    return "\n".join([
+        "# Test impact map",
+        "",
+        f"Generated {payload['generated_at']}; map written to `{payload['map']}`.",
+        "",
+        report.markdown_table(("test", "status", "apps", "routes", "chunks", "sources", "tables"), rows),
+    ])
+
+
+def render_markdown(payload: dict) -> str:
+    total = len(payload["selected"]) + len(payload["skipped"])
+    lines = [
+        "# Test impact",
+        "",
+        f"Generated {payload['generated_at']}: {len(payload['files'])} files changed since `{payload['rev']}`; "
+        f"{len(payload['selected'])} of {total} tests selected (map recorded at {payload['map_rev'] or 'unknown'}).",
+        "",
+        report.markdown_table(
+            ("file", "reason", "tests"),
+            [(f["path"], f["reason"], ", ".join(f["tests"]) or "-") for f in payload["files"]],
+        ),
+        "",
+        f"- selected: {', '.join(payload['selected']) or 'none'}",
+        f"- skipped: {', '.join(payload['skipped']) or 'none'}",
+    ]
+    if payload["unmapped"]:
+        lines.append(f"- not in the map (always run): {', '.join(payload['unmapped'])}")
+    if payload["results"]:
+        lines += ["", report.markdown_table(("test", "status", "duration s", "error"),
+                                            [(r["test_id"], r["status"], r["duration_s"], r["error"])
+                                             for r in payload["results"]])]
+    return "\n".join(lines)
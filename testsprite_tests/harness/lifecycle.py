@@ -0,0 +1,232 @@
+"""Cross-role prescription lifecycle scenario with cycle-time metrics.
+
+Turns the PRD's headline goal ("Reducir tiempos de ciclo clínico-
+farmacéutico") into a number. Each lifecycle runs four stages:
+
+1. ``create``   — médico inserts a prescription for the test patient
+2. ``validate`` — farmacia can see it, pending and unexpired (the hand-off)
+3. ``dispense`` — farmacia marks it dispensed
+4. ``observe``  — paciente's Recetas page, on its "Todas" tab (reloaded
+   every ``--reload-interval``), shows it as "Dispensada"
+
+Writes go through each role's own Supabase session (the same PostgREST path
+the apps use); the patient stage is observed in a browser context started
+from the cached paciente login. Every hand-off is timestamped, and running
+``--lifecycles`` of them ``--concurrency`` at a time yields throughput.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from harness import browser, config, report, sessions, stats, watch
+from harness.deps import require
+from harness.errors import HarnessError
+from harness.supabase_rest import SupabaseRest
+
+STAGES = ("create", "validate", "dispense", "observe")
+RECETAS_PATH = "/dashboard/recetas"
+
+
+@dataclass
+class Lifecycle:
+    """Timestamps (epoch ms) of one prescription's trip through the roles."""
+
+    index: int
+    marker: str
+    prescription_id: str = None
+    marks: dict = field(default_factory=dict)
+    error: str = None
+
+    def mark(self, stage: str):
+        self.marks[stage] = time.time() * 1000
+
+    def durations(self) -> dict:
+        """Per-stage durations: each stage ends at its mark, starts at the previous one."""
+        result = {}
+        previous = self.marks.get("start")
+        for stage in STAGES:
+            if stage not in self.marks:
+                break
+            result[stage] = self.marks[stage] - previous
+            previous = self.marks[stage]
+        if "observe" in self.marks:
+            result["total"] = self.marks["observe"] - self.marks["start"]
+        return result
+
+
+@dataclass
+class Actors:
+    medico: SupabaseRest
+    farmacia: SupabaseRest
+    paciente: SupabaseRest
+
+
+def configure_parser(parser):
+    parser.add_argument("--lifecycles", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=3)
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between farmacia visibility checks")
+    parser.add_argument("--reload-interval", type=float, default=2.0, help="seconds between paciente page reloads")
+    parser.add_argument("--stage-timeout", type=float, default=60.0)
+    parser.add_argument("--keep", action="store_true", help="keep the created prescriptions")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    payload = asyncio.run(scenario(args))
+    path = report.write_report("lifecycle", payload, render_markdown(payload), args.output_dir)
+    print(f"lifecycle report: {path}")
+    return 0 if not payload["failed"] else 1
+
+
+async def scenario(args) -> dict:
+    async with browser.launch(headless=not args.headed) as (pw, chromium):
+        request = await pw.request.new_context()
+        try:
+            actors = Actors(
+                medico=await SupabaseRest.sign_in(request, "medico"),
+                farmacia=await SupabaseRest.sign_in(request, "farmacia"),
+                paciente=await SupabaseRest.sign_in(request, "paciente"),
+            )
+            # Warm the cached paciente login once instead of racing N logins
+            await sessions.storage_state(chromium, "paciente")
+            slots = asyncio.Semaphore(args.concurrency)
+            lifecycles = [Lifecycle(i, f"harness-cycle-{uuid.uuid4().hex[:8]}") for i in range(args.lifecycles)]
+
+            async def bounded(lifecycle):
+                async with slots:
+                    await run_lifecycle(chromium, actors, lifecycle, args)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(bounded(lc) for lc in lifecycles))
+            wall_s = time.perf_counter() - started
+            if not args.keep:
+                await _cleanup(actors, lifecycles)
+        finally:
+            await request.dispose()
+
+    completed = [lc for lc in lifecycles if lc.error is None]
+    per_stage = {
+        stage: stats.summarize(lc.durations()[stage] for lc in completed)
+        for stage in STAGES + ("total",)
+    }
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "lifecycles": args.lifecycles,
+        "concurrency": args.concurrency,
+        "wall_s": wall_s,
+        "throughput_per_min": len(completed) / wall_s * 60 if wall_s else 0.0,
+        "completed": len(completed),
+        "failed": [{"index": lc.index, "stage_reached": (list(lc.marks) or ["setup"])[-1], "error": lc.error}
+                   for lc in lifecycles if lc.error],
+        "stages_ms": per_stage,
+        "runs": [{"index": lc.index, "prescription_id": lc.prescription_id, "durations_ms": lc.durations()}
+                 for lc in lifecycles],
+    }
+
+
+async def run_lifecycle(chromium, actors: Actors, lifecycle: Lifecycle, args):
+    async_api = require("playwright.async_api")
+    context = None
+    try:
+        context = await sessions.new_context(chromium, "paciente")
+        await context.add_init_script(script=watch.card_status_script(lifecycle.marker))
+        page = await context.new_page()
+        lifecycle.mark("start")  # browser start-up is not part of the cycle
+        await _create(actors, lifecycle)
+        await _validate(actors, lifecycle, args)
+        await _dispense(actors, lifecycle)
+        await _observe(page, lifecycle, args)
+    except (HarnessError, async_api.Error) as exc:
+        lifecycle.error = str(exc)
+    finally:
+        if context:
+            await context.close()
+
+
+async def _create(actors: Actors, lifecycle: Lifecycle):
+    now = datetime.now(timezone.utc)
+    row = await actors.medico.insert(
+        "prescriptions",
+        {
+            "patient_id": actors.paciente.user_id,
+            "doctor_id": actors.medico.user_id,
+            "diagnosis": lifecycle.marker,
+            "prescribed_at": now.isoformat(),
+            "expires_at": (now + timedelta(days=30)).isoformat(),
+            "status": "pending",
+        },
+    )
+    lifecycle.prescription_id = row["id"]
+    lifecycle.mark("create")
+
+
+async def _validate(actors: Actors, lifecycle: Lifecycle, args):
+    deadline = time.monotonic() + args.stage_timeout
+    params = {"select": "id,status,expires_at", "id": f"eq.{lifecycle.prescription_id}"}
+    while time.monotonic() < deadline:
+        rows = await actors.farmacia.select("prescriptions", params)
+        if rows and rows[0]["status"] == "pending" and _unexpired(rows[0]["expires_at"]):
+            lifecycle.mark("validate")
+            return
+        await asyncio.sleep(args.poll_interval)
+    raise HarnessError("farmacia never saw the prescription as pending")
+
+
+def _unexpired(expires_at: str) -> bool:
+    if not expires_at:
+        return True
+    return datetime.fromisoformat(expires_at.replace("Z", "+00:00")) > datetime.now(timezone.utc)
+
+
+async def _dispense(actors: Actors, lifecycle: Lifecycle):
+    rows = await actors.farmacia.update(
+        "prescriptions",
+        {"id": f"eq.{lifecycle.prescription_id}"},
+        {"status": "dispensed", "dispensed_at": datetime.now(timezone.utc).isoformat()},
+    )
+    if not rows:
+        raise HarnessError("farmacia update matched no rows (RLS?)")
+    lifecycle.mark("dispense")
+
+
+async def _observe(page, lifecycle: Lifecycle, args):
+    since = lifecycle.marks["dispense"]
+    await watch.load_all(page, config.app_url("paciente") + RECETAS_PATH)
+    seen_at = await watch.wait_for_status(
+        page, "dispensed", since, args.stage_timeout, args.reload_interval
+    )
+    if seen_at is None:
+        raise HarnessError("paciente never saw the prescription as dispensed")
+    lifecycle.marks["observe"] = seen_at
+
+
+async def _cleanup(actors: Actors, lifecycles):
+    for lifecycle in lifecycles:
+        if lifecycle.prescription_id:
+            try:
+                await actors.medico.delete("prescriptions", {"id": f"eq.{lifecycle.prescription_id}"})
+            except HarnessError as exc:
+                print(f"cleanup: could not delete {lifecycle.prescription_id}: {exc}")
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (stage, s.get("p50"), s.get("p95"), s.get("max"), s.get("n", 0))
+        for stage, s in payload["stages_ms"].items()
+    ]
+    lines = [
+        "# Prescription cycle time",
+        "",
+        f"Generated {payload['generated_at']}: {payload['completed']}/{payload['lifecycles']} "
+        f"lifecycles completed at concurrency {payload['concurrency']} in {payload['wall_s']:.1f} s "
+        f"({payload['throughput_per_min']:.1f} cycles/min).",
+        "",
+        report.markdown_table(("stage", "p50 ms", "p95 ms", "max ms", "n"), rows),
+    ]
+    if payload["failed"]:
+        lines += ["", "## Failed", ""]
+        lines += [f"- #{f['index']} after {f['stage_reached']}: {f['error']}" for f in payload["failed"]]
+    return "\n".join(lines)
@@ -0,0 +1,236 @@
+"""Per-step network log for TC runs.
+
+:class:`NetworkRecorder` is a :mod:`harness.tc_runner` plugin that records
+every request a test's contexts make as an :class:`Exchange`, tagged with the
+step (click, fill or goto) that was current when the request started. It can
+keep response bodies for matching URLs and, through a CDP session per page,
+the JavaScript frame that initiated each request — which is what points a
+finding back at a component.
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from urllib.parse import parse_qsl, urlsplit
+
+from harness import tc_runner
+
+REST_PATH = "/rest/v1/"
+MAX_BODY_BYTES = 512 * 1024
+
+
+@dataclass
+class Exchange:
+    """One request/response pair as the browser saw it."""
+
+    step: int
+    method: str
+    url: str
+    resource_type: str
+    post_data: str = None
+    page_url: str = ""
+    request_headers: dict = field(default_factory=dict)
+    started_at: float = 0.0
+    ended_at: float = 0.0
+    status: int = None
+    failure: str = None
+    request_headers_bytes: int = 0
+    response_headers_bytes: int = 0
+    body_bytes: int = 0
+    response_headers: dict = field(default_factory=dict)
+    body: str = None
+    initiator: str = None
+
+    @property
+    def duration_ms(self) -> float:
+        return max(0.0, self.ended_at - self.started_at)
+
+    @property
+    def total_bytes(self) -> int:
+        return self.request_headers_bytes + self.response_headers_bytes + self.body_bytes
+
+    @property
+    def is_api(self) -> bool:
+        return self.resource_type in ("fetch", "xhr")
+
+    def as_dict(self) -> dict:
+        return {
+            "step": self.step,
+            "method": self.method,
+            "url": self.url,
+            "resource_type": self.resource_type,
+            "status": self.status,
+            "failure": self.failure,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "bytes": self.total_bytes,
+            "initiator": self.initiator,
+        }
+
+
+def is_rest(url: str) -> bool:
+    return REST_PATH in url
+
+
+def rest_table(url: str) -> str:
+    """Table or ``rpc/<fn>`` addressed by a PostgREST URL."""
+    path = urlsplit(url).path
+    return path.split(REST_PATH, 1)[1].strip("/") if REST_PATH in path else ""
+
+
+def query_shape(url: str) -> str:
+    """The URL with filter values blanked, so per-item requests compare equal."""
+    parts = urlsplit(url)
+    params = []
+    for key, value in parse_qsl(parts.query, keep_blank_values=True):
+        if key in ("select", "order", "limit", "offset", "on_conflict", "columns"):
+            params.append(f"{key}={value}")
+        else:
+            operator = value.split(".", 1)[0] if "." in value else ""
+            params.append(f"{key}={operator}.?")
+    return parts.path + ("?" + "&".join(sorted(params)) if params else "")
+
+
+def route_of(url: str) -> str:
+    """Page path with ids collapsed (``/dashboard/recetas/:id``)."""
+    path = urlsplit(url).path or "/"
+    return re.sub(r"/([0-9a-f]{8}-[0-9a-f-]{27,}|\d+)(?=/|$)", "/:id", path)
+
+
+class NetworkRecorder(tc_runner.Plugin):
+    """Records every exchange of a test, attributed to steps."""
+
+    name = "network"
+
+    def __init__(self, capture_bodies=None, initiators: bool = False):
+        self.capture_bodies = capture_bodies or (lambda exchange: False)
+        self.initiators = initiators
+        self.exchanges = []
+        self.run = None
+        self._open = {}
+        self._pending = set()
+        self._initiator_queue = {}
+
+    async def on_test_start(self, run):
+        self.run = run
+
+    async def on_context(self, run, context):
+        context.on("request", self._on_request)
+        context.on("requestfinished", lambda request: self._schedule(self._on_finished(request)))
+        context.on("requestfailed", self._on_failed)
+        if self.initiators:
+            context.on("page", lambda page: self._schedule(self._attach_cdp(context, page)))
+            for page in context.pages:
+                await self._attach_cdp(context, page)
+
+    def _schedule(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _on_request(self, request):
+        step = self.run.current_step
+        exchange = Exchange(
+            step=step.index if step else -1,
+            method=request.method,
+            url=request.url,
+            resource_type=request.resource_type,
+            post_data=request.post_data,
+            page_url=_frame_url(request),
+            request_headers=request.headers,
+            started_at=time.time() * 1000,
+        )
+        self._open[request] = exchange
+        self.exchanges.append(exchange)
+        self._take_initiator(exchange)
+
+    def _take_initiator(self, exchange: Exchange):
+        queue = self._initiator_queue.get(exchange.url)
+        if queue and exchange.initiator is None:
+            exchange.initiator = queue.pop(0)
+
+    async def _on_finished(self, request):
+        exchange = self._open.pop(request, None)
+        if exchange is None:
+            return
+        exchange.ended_at = time.time() * 1000
+        _apply_timing(exchange, request.timing)
+        self._take_initiator(exchange)  # the CDP event can trail Playwright's
+        try:
+            sizes = await request.sizes()
+            exchange.request_headers_bytes = sizes["requestHeadersSize"]
+            exchange.response_headers_bytes = sizes["responseHeadersSize"]
+            exchange.body_bytes = sizes["responseBodySize"]
+            response = await request.response()
+            if response:
+                exchange.status = response.status
+                exchange.response_headers = await response.all_headers()
+                if self.capture_bodies(exchange) and exchange.body_bytes <= MAX_BODY_BYTES:
+                    exchange.body = (await response.body()).decode("utf-8", "replace")
+        except Exception:
+            pass  # the page navigated away or the context closed first
+
+    def _on_failed(self, request):
+        exchange = self._open.pop(request, None)
+        if exchange:
+            exchange.ended_at = time.time() * 1000
+            exchange.failure = request.failure
+
+    async def _attach_cdp(self, context, page):
+        try:
+            session = await context.new_cdp_session(page)
+            session.on("Network.requestWillBeSent", self._on_will_be_sent)
+            await session.send("Network.enable")
+        except Exception:
+            pass  # not Chromium, or the page closed already
+
+    def _on_will_be_sent(self, params):
+        label = initiator_label(params.get("initiator") or {})
+        if label:
+            self._initiator_queue.setdefault(params["request"]["url"], []).append(label)
+
+    async def before_context_close(self, run, context):
+        await self.settle()
+
+    async def settle(self):
+        """Wait for in-flight size/body lookups."""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    async def on_test_end(self, run):
+        await self.settle()
+
+    def by_step(self) -> dict:
+        steps = {}
+        for exchange in self.exchanges:
+            steps.setdefault(exchange.step, []).append(exchange)
+        return steps
+
+
+def _frame_url(request) -> str:
+    try:
+        return request.frame.url
+    except Exception:
+        return ""  # service-worker requests have no frame
+
+
+def _apply_timing(exchange: Exchange, timing: dict):
+    if timing and timing.get("startTime", -1) > 0 and timing.get("responseEnd", -1) >= 0:
+        exchange.started_at = timing["startTime"]
+        exchange.ended_at = timing["startTime"] + timing["responseEnd"]
+
+
+def initiator_label(initiator: dict) -> str:
+    """``function@file:line`` of the application frame that issued a request."""
+    frames = []
+    stack = initiator.get("stack")
+    while stack:
+        frames += stack.get("callFrames", [])
+        stack = stack.get("parent")
+    if not frames:
+        return initiator.get("url") or None
+    app = [f for f in frames if "/chunks/app/" in f["url"] or "/src/" in f["url"]]
+    frame = (app or frames)[0]
+    name = frame.get("functionName") or "(anonymous)"
+    return f"{name}@{frame['url'].rsplit('/', 1)[-1].split('?')[0]}:{frame['lineNumber'] + 1}"
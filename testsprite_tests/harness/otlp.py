@@ -0,0 +1,389 @@
+"""Local stand-in for an OpenTelemetry collector (OTLP over HTTP).
+
+Accepts what apps and services export with ``OTEL_EXPORTER_OTLP_ENDPOINT``
+pointed at it — ``POST /v1/traces``, ``/v1/metrics`` and ``/v1/logs`` in
+either OTLP encoding (``http/protobuf``, the SDK default, or ``http/json``),
+gzip or not — and keeps it in memory. Browser exporters are answered with
+permissive CORS headers. Only the fields the harness reads are decoded:
+span ids, names, kinds, times, attributes and status; metric names and
+data-point counts; log record counts.
+
+Admin endpoints:
+
+- ``GET /__harness/spans?trace_id=``  received spans (all, or one trace)
+- ``GET /__harness/metrics``           received metrics and log counts
+
+Every span is also appended to ``harness_output/otlp/spans-<timestamp>.jsonl``.
+"""
+
+import asyncio
+import base64
+import gzip
+import json
+import struct
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from harness import config
+
+DEFAULT_PORT = 4318
+SPAN_KINDS = {0: "unspecified", 1: "internal", 2: "server", 3: "client", 4: "producer", 5: "consumer"}
+METRIC_TYPES = {5: "gauge", 7: "sum", 9: "histogram", 10: "exponential_histogram", 11: "summary"}
+_CORS = (
+    "Access-Control-Allow-Origin: *\r\n"
+    "Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n"
+    "Access-Control-Allow-Headers: *\r\n"
+)
+
+
+# --- protobuf wire format, just enough for the OTLP messages ---
+
+def _varint(buf: bytes, i: int) -> tuple:
+    result = shift = 0
+    while True:
+        byte = buf[i]
+        i += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, i
+        shift += 7
+
+
+def fields(buf: bytes) -> dict:
+    """``{field number: [raw values]}`` of one protobuf message."""
+    result, i = {}, 0
+    while i < len(buf):
+        key, i = _varint(buf, i)
+        number, wire = key >> 3, key & 7
+        if wire == 0:
+            value, i = _varint(buf, i)
+        elif wire == 1:
+            value, i = buf[i:i + 8], i + 8
+        elif wire == 2:
+            length, i = _varint(buf, i)
+            value, i = buf[i:i + length], i + length
+        elif wire == 5:
+            value, i = buf[i:i + 4], i + 4
+        else:
+            raise ValueError(f"unsupported wire type {wire}")
+        result.setdefault(number, []).append(value)
+    return result
+
+
+def _pb_value(buf: bytes):
+    f = fields(buf)
+    if 1 in f:
+        return f[1][0].decode("utf-8", "replace")
+    if 2 in f:
+        return bool(f[2][0])
+    if 3 in f:
+        value = f[3][0]
+        return value - (1 << 64) if value >= 1 << 63 else value
+    if 4 in f:
+        return struct.unpack("<d", f[4][0])[0]
+    return None  # arrays, maps and bytes are not needed
+
+
+def _pb_attributes(items: list) -> dict:
+    attributes = {}
+    for item in items:
+        kv = fields(item)
+        attributes[kv[1][0].decode("utf-8", "replace")] = _pb_value(kv[2][0]) if 2 in kv else None
+    return attributes
+
+
+def _pb_resource(resource_fields: dict) -> dict:
+    return _pb_attributes(fields(resource_fields[1][0]).get(1, [])) if 1 in resource_fields else {}
+
+
+def decode_traces_pb(body: bytes) -> list:
+    spans = []
+    for resource_spans in fields(body).get(1, []):
+        rs = fields(resource_spans)
+        resource = _pb_resource(rs)
+        for scope_spans in rs.get(2, []):
+            for raw in fields(scope_spans).get(2, []):
+                s = fields(raw)
+                status = fields(s[15][0]) if 15 in s else {}
+                spans.append(_span(
+                    resource,
+                    trace_id=s.get(1, [b""])[0].hex(),
+                    span_id=s.get(2, [b""])[0].hex(),
+                    parent=s.get(4, [b""])[0].hex(),
+                    name=s.get(5, [b""])[0].decode("utf-8", "replace"),
+                    kind=SPAN_KINDS.get(s.get(6, [0])[0], "unspecified"),
+                    start=int.from_bytes(s.get(7, [b"\0" * 8])[0], "little"),
+                    end=int.from_bytes(s.get(8, [b"\0" * 8])[0], "little"),
+                    attributes=_pb_attributes(s.get(9, [])),
+                    status=status.get(3, [0])[0],
+                ))
+    return spans
+
+
+def decode_metrics_pb(body: bytes) -> list:
+    metrics = []
+    for resource_metrics in fields(body).get(1, []):
+        rm = fields(resource_metrics)
+        service = _pb_resource(rm).get("service.name", "unknown")
+        for scope_metrics in rm.get(2, []):
+            for raw in fields(scope_metrics).get(2, []):
+                m = fields(raw)
+                kind = next((METRIC_TYPES[n] for n in METRIC_TYPES if n in m), "unknown")
+                points = sum(len(fields(m[n][0]).get(1, [])) for n in METRIC_TYPES if n in m)
+                metrics.append({"service": service, "name": m.get(1, [b""])[0].decode("utf-8", "replace"),
+                                "unit": m.get(3, [b""])[0].decode("utf-8", "replace"), "type": kind,
+                                "points": points})
+    return metrics
+
+
+def decode_logs_pb(body: bytes) -> dict:
+    counts = {}
+    for resource_logs in fields(body).get(1, []):
+        rl = fields(resource_logs)
+        service = _pb_resource(rl).get("service.name", "unknown")
+        records = sum(len(fields(scope_logs).get(2, [])) for scope_logs in rl.get(2, []))
+        counts[service] = counts.get(service, 0) + records
+    return counts
+
+
+# --- OTLP/JSON ---
+
+def _json_id(value: str) -> str:
+    """Ids are hex in OTLP/JSON; some exporters send the protobuf-JSON base64 instead."""
+    if not value:
+        return ""
+    try:
+        int(value, 16)
+        return value.lower()
+    except ValueError:
+        return base64.b64decode(value).hex()
+
+
+def _json_value(value: dict):
+    for key in ("stringValue", "boolValue", "doubleValue"):
+        if key in value:
+            return value[key]
+    return int(value["intValue"]) if "intValue" in value else None
+
+
+def _json_attributes(items: list) -> dict:
+    return {item["key"]: _json_value(item.get("value", {})) for item in items or ()}
+
+
+def _json_kind(kind) -> str:
+    if isinstance(kind, str):
+        return kind.replace("SPAN_KIND_", "").lower()
+    return SPAN_KINDS.get(kind or 0, "unspecified")
+
+
+def decode_traces_json(body: bytes) -> list:
+    spans = []
+    for rs in json.loads(body).get("resourceSpans", []):
+        resource = _json_attributes(rs.get("resource", {}).get("attributes"))
+        for ss in rs.get("scopeSpans", []):
+            for s in ss.get("spans", []):
+                spans.append(_span(
+                    resource,
+                    trace_id=_json_id(s.get("traceId")),
+                    span_id=_json_id(s.get("spanId")),
+                    parent=_json_id(s.get("parentSpanId")),
+                    name=s.get("name", ""),
+                    kind=_json_kind(s.get("kind")),
+                    start=int(s.get("startTimeUnixNano", 0)),
+                    end=int(s.get("endTimeUnixNano", 0)),
+                    attributes=_json_attributes(s.get("attributes")),
+                    status=s.get("status", {}).get("code", 0),
+                ))
+    return spans
+
+
+def decode_metrics_json(body: bytes) -> list:
+    metrics = []
+    for rm in json.loads(body).get("resourceMetrics", []):
+        service = _json_attributes(rm.get("resource", {}).get("attributes")).get("service.name", "unknown")
+        for sm in rm.get("scopeMetrics", []):
+            for m in sm.get("metrics", []):
+                kind = next((k for k in ("gauge", "sum", "histogram", "exponentialHistogram", "summary") if k in m),
+                            "unknown")
+                points = len(m.get(kind, {}).get("dataPoints", [])) if kind != "unknown" else 0
+                metrics.append({"service": service, "name": m.get("name", ""), "unit": m.get("unit", ""),
+                                "type": kind, "points": points})
+    return metrics
+
+
+def decode_logs_json(body: bytes) -> dict:
+    counts = {}
+    for rl in json.loads(body).get("resourceLogs", []):
+        service = _json_attributes(rl.get("resource", {}).get("attributes")).get("service.name", "unknown")
+        records = sum(len(sl.get("logRecords", [])) for sl in rl.get("scopeLogs", []))
+        counts[service] = counts.get(service, 0) + records
+    return counts
+
+
+def _span(resource: dict, trace_id, span_id, parent, name, kind, start, end, attributes, status) -> dict:
+    return {
+        "trace_id": trace_id,
+        "span_id": span_id,
+        "parent_span_id": parent or None,
+        "name": name,
+        "kind": kind,
+        "service": resource.get("service.name", "unknown"),
+        "start_ms": start / 1e6,
+        "end_ms": end / 1e6,
+        "duration_ms": (end - start) / 1e6,
+        "attributes": attributes,
+        "error": status == 2,
+    }
+
+
+def to_otlp_json(spans: list) -> dict:
+    """Normalized spans back to an OTLP/JSON export, grouped by service (for Jaeger, Tempo...)."""
+    kinds = {v: k for k, v in SPAN_KINDS.items()}
+    by_service = {}
+    for s in spans:
+        by_service.setdefault(s["service"], []).append({
+            "traceId": s["trace_id"],
+            "spanId": s["span_id"],
+            **({"parentSpanId": s["parent_span_id"]} if s["parent_span_id"] else {}),
+            "name": s["name"],
+            "kind": kinds.get(s["kind"], 0),
+            "startTimeUnixNano": str(int(s["start_ms"] * 1e6)),
+            "endTimeUnixNano": str(int(s["end_ms"] * 1e6)),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in s["attributes"].items() if v is not None],
+            "status": {"code": 2 if s["error"] else 0},
+        })
+    return {"resourceSpans": [
+        {"resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service}}]},
+         "scopeSpans": [{"scope": {"name": "harness"}, "spans": items}]}
+        for service, items in by_service.items()
+    ]}
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Collector:
+    """OTLP/HTTP receiver; use as an async context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, log_path: Path = None):
+        self.host = host
+        self.port = port
+        self.log_path = log_path
+        self.spans = []
+        self.metrics = []
+        self.logs = {}  # service -> records
+        self.rejected = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self):
+        async with self:
+            await self._server.serve_forever()
+
+    def spans_for(self, trace_id: str) -> list:
+        return [s for s in self.spans if s["trace_id"] == trace_id]
+
+    def accept(self, path: str, body: bytes, content_type: str):
+        """Decode one export; returns the number of items taken in."""
+        as_json = "json" in content_type
+        if path == "/v1/traces":
+            spans = decode_traces_json(body) if as_json else decode_traces_pb(body)
+            self.spans += spans
+            if self.log_path:
+                with self.log_path.open("a", encoding="utf-8") as handle:
+                    handle.writelines(json.dumps(s, default=str) + "\n" for s in spans)
+            return len(spans)
+        if path == "/v1/metrics":
+            metrics = decode_metrics_json(body) if as_json else decode_metrics_pb(body)
+            self.metrics += metrics
+            return len(metrics)
+        if path == "/v1/logs":
+            counts = decode_logs_json(body) if as_json else decode_logs_pb(body)
+            for service, n in counts.items():
+                self.logs[service] = self.logs.get(service, 0) + n
+            return sum(counts.values())
+        raise KeyError(path)
+
+    async def _handle(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, _ = lines[0].split(" ", 2)
+            headers = {k.strip().lower(): v.strip() for k, _, v in (l.partition(":") for l in lines[1:] if ":" in l)}
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        url = urlsplit(target)
+        content_type = headers.get("content-type", "application/x-protobuf")
+        status, payload = 200, b""
+        if method == "OPTIONS":
+            status = 204
+        elif method == "GET" and url.path == "/__harness/spans":
+            trace_id = parse_qs(url.query).get("trace_id", [None])[0]
+            payload = json.dumps(self.spans_for(trace_id) if trace_id else self.spans, default=str).encode()
+            content_type = "application/json"
+        elif method == "GET" and url.path == "/__harness/metrics":
+            payload = json.dumps({"metrics": self.metrics, "logs": self.logs}).encode()
+            content_type = "application/json"
+        elif method == "POST":
+            if headers.get("content-encoding") == "gzip":
+                body = gzip.decompress(body)
+            try:
+                self.accept(url.path, body, content_type)
+                payload = b"{}" if "json" in content_type else b""  # an empty Export*ServiceResponse
+            except KeyError:
+                status, payload = 404, b""
+            except (ValueError, IndexError, struct.error):
+                self.rejected += 1
+                status, payload = 400, b""
+        else:
+            status = 404
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n{_CORS}"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+            + payload
+        )
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+
+def configure_parser(parser):
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+
+
+def run(args) -> int:
+    log_dir = Path(args.output_dir or config.OUTPUT_DIR) / "otlp"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / f"spans-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    collector = Collector(args.host, args.port, log_path)
+    print(f"OTLP/HTTP collector: {collector.url} (OTEL_EXPORTER_OTLP_ENDPOINT={collector.url})")
+    print(f"span log: {log_path}")
+    try:
+        asyncio.run(collector.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,282 @@
+"""PostgREST over-fetch analyzer for the Supabase calls the apps make.
+
+Runs TC scripts, keeps the body of every ``/rest/v1/`` response and
+snapshots each page's rendered text (plus link targets and input values)
+before every step and when the context closes. For each request it then
+checks:
+
+- the query itself: ``select=*``, list reads without ``limit``, embedded
+  resources (``select=...,doctor:profiles(*)``);
+- every returned field: *rendered* if one of its values shows up in a later
+  snapshot of the same route, *structural* if it looks like a key (``id``,
+  ``*_id``, UUID values), *unknown* for booleans, nulls and very short values,
+  and otherwise *unrendered*.
+
+Unrendered fields are waste; their share of the JSON is applied to the
+transferred body size to give wasted bytes per request, per endpoint and per
+route. Values the page shows through a lookup (a status rendered as a
+Spanish label, say) count as unrendered, so read the field list before
+dropping a column.
+"""
+
+import asyncio
+import json
+import re
+import time
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+
+from harness import network, report, tc_runner
+
+MONTHS_ES = ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+             "agosto", "septiembre", "octubre", "noviembre", "diciembre")
+
+_SNAPSHOT = """() => {
+  if (!document.body) return "";
+  const attrs = [...document.querySelectorAll("a[href], input, textarea, select, [title], img[alt]")]
+    .map((el) => [el.getAttribute("href"), el.value, el.getAttribute("title"), el.getAttribute("alt")]
+      .filter(Boolean).join(" "));
+  return document.body.innerText + "\\n" + attrs.join("\\n");
+}"""
+
+_UUID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_ISO = re.compile(r"^(\d{4})-(\d{2})-(\d{2})")
+
+
+class DomSnapshots(tc_runner.Plugin):
+    """Rendered text of each page, taken before every step and at close."""
+
+    name = "dom-snapshots"
+
+    def __init__(self):
+        self.snapshots = []  # (epoch ms, route, normalised text)
+
+    async def on_step_start(self, run, step, page):
+        await self._take(page)
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            await self._take(page)
+
+    async def _take(self, page):
+        if page.is_closed() or page.url in ("", "about:blank"):
+            return
+        try:
+            text = await page.evaluate(_SNAPSHOT)
+        except Exception:
+            return  # mid-navigation
+        self.snapshots.append((time.time() * 1000, network.route_of(page.url), _normalise(text)))
+
+    def text_after(self, when: float, route: str) -> str:
+        return "\n".join(text for at, r, text in self.snapshots if at >= when and r == route)
+
+
+def _normalise(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").lower()
+
+
+def query_flags(exchange) -> list:
+    """Query-level smells of a PostgREST GET."""
+    params = dict(parse_qsl(urlsplit(exchange.url).query, keep_blank_values=True))
+    select = params.get("select", "*")
+    flags = []
+    if select == "*" or select.startswith("*,") or ",*" in select:
+        flags.append("select=*")
+    if "(" in select:
+        flags.append("embed")
+    single = "vnd.pgrst.object" in exchange.request_headers.get("accept", "") or any(
+        v.startswith("eq.") and k in ("id", "user_id") for k, v in params.items()
+    )
+    if exchange.method == "GET" and "limit" not in params and not single:
+        flags.append("no-limit")
+    return flags
+
+
+def classify_fields(rows, text: str) -> dict:
+    """Field path -> rendered | structural | unknown | unrendered."""
+    values = {}
+    for row in rows:
+        _flatten(row, "", values)
+    result = {}
+    for path, seen in values.items():
+        leaf = path.rsplit(".", 1)[-1]
+        present = [v for v in seen if v is not None]  # a field that is always null is fetched for nothing
+        if leaf == "id" or leaf.endswith("_id") or (present and all(_UUID.match(str(v)) for v in present)):
+            result[path] = "structural"
+        elif any(_rendered(v, text) for v in present):
+            result[path] = "rendered"
+        elif present and all(isinstance(v, bool) or len(str(v)) < 3 for v in present):
+            result[path] = "unknown"
+        else:
+            result[path] = "unrendered"
+    return result
+
+
+def _flatten(value, prefix: str, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _flatten(item, f"{prefix}.{key}" if prefix else key, out)
+    elif isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        for item in value:
+            _flatten(item, prefix + "[]", out)
+    else:
+        out.setdefault(prefix, []).append(value)
+
+
+def _rendered(value, text: str) -> bool:
+    if value is None or isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        candidates = {str(value), f"{value:.2f}", f"{value:.2f}".replace(".", ",")}
+        return any(c in text for c in candidates)
+    if isinstance(value, list):
+        return any(_rendered(v, text) for v in value)
+    value = str(value).strip().lower()
+    if len(value) < 3:
+        return False
+    match = _ISO.match(value)
+    if match:
+        return any(c in text for c in _date_forms(*match.groups()))
+    return value in text or (len(value) > 40 and value[:40] in text)
+
+
+def _date_forms(year: str, month: str, day: str) -> set:
+    try:
+        date = datetime(int(year), int(month), int(day))
+    except ValueError:
+        return {f"{year}-{month}-{day}"}
+    return {
+        f"{year}-{month}-{day}",
+        f"{day}/{month}/{year}",
+        f"{date.day}/{date.month}/{year}",
+        f"{date.month}/{date.day}/{year}",
+        f"{date.day} de {MONTHS_ES[date.month - 1]}",
+        f"{date.day} {MONTHS_ES[date.month - 1][:3]}",
+    }
+
+
+def analyse_exchange(exchange, snapshots: DomSnapshots) -> dict:
+    """Over-fetch verdict for one captured REST response."""
+    rows = _rows(exchange.body)
+    text = snapshots.text_after(exchange.ended_at, network.route_of(exchange.page_url))
+    fields = classify_fields(rows, text) if rows and text else {}
+    field_bytes = {path: 0 for path in fields}
+    for row in rows:
+        _field_sizes(row, "", field_bytes)
+    json_bytes = sum(field_bytes.values()) or 1
+    unrendered = sorted((p for p, state in fields.items() if state == "unrendered"), key=lambda p: -field_bytes[p])
+    wasted_share = sum(field_bytes[p] for p in unrendered) / json_bytes
+    return {
+        "endpoint": f"{exchange.method} {network.query_shape(exchange.url)}",
+        "table": network.rest_table(exchange.url),
+        "route": network.route_of(exchange.page_url),
+        "rows": len(rows),
+        "body_bytes": exchange.body_bytes,
+        "flags": query_flags(exchange),
+        "fields": len(fields),
+        "rendered_fields": sum(1 for state in fields.values() if state == "rendered"),
+        "unrendered_fields": unrendered,
+        "wasted_bytes": round(exchange.body_bytes * wasted_share),
+        "observed": bool(text),
+    }
+
+
+def _rows(body: str) -> list:
+    if not body:
+        return []
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return []
+    if isinstance(data, dict):
+        return [data]
+    return [row for row in data if isinstance(row, dict)] if isinstance(data, list) else []
+
+
+def _field_sizes(value, prefix: str, out: dict):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            _field_sizes(item, f"{prefix}.{key}" if prefix else key, out)
+    elif isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+        for item in value:
+            _field_sizes(item, prefix + "[]", out)
+    elif prefix in out:
+        out[prefix] += len(prefix.rsplit(".", 1)[-1]) + len(json.dumps(value, ensure_ascii=False)) + 4
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--top", type=int, default=15)
+
+
+def run(args) -> int:
+    payload = asyncio.run(analyse(args))
+    path = report.write_report("overfetch", payload, render_markdown(payload), args.output_dir)
+    print(f"overfetch report: {path}")
+    return 0
+
+
+async def analyse(args) -> dict:
+    requests, tests = [], []
+    for path in tc_runner.selected(args):
+        recorder = network.NetworkRecorder(capture_bodies=lambda e: network.is_rest(e.url))
+        snapshots = DomSnapshots()
+        run = await tc_runner.run_test_file(path, [recorder, snapshots], args.timeout)
+        captured = [e for e in recorder.exchanges if network.is_rest(e.url) and e.method == "GET" and e.body]
+        print(f"{run.test_id}: {run.status}, {len(captured)} REST reads")
+        tests.append({"test_id": run.test_id, "status": run.status, "rest_reads": len(captured)})
+        requests += [{"test_id": run.test_id, **analyse_exchange(e, snapshots)} for e in captured]
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "top": args.top,
+        "tests": tests,
+        "requests": requests,
+        "endpoints": _rollup(requests, "endpoint"),
+        "routes": _rollup(requests, "route"),
+        "wasted_bytes": sum(r["wasted_bytes"] for r in requests),
+        "body_bytes": sum(r["body_bytes"] for r in requests),
+    }
+
+
+def _rollup(requests, key: str) -> list:
+    groups = {}
+    for r in requests:
+        group = groups.setdefault(r[key], {key: r[key], "requests": 0, "body_bytes": 0, "wasted_bytes": 0,
+                                            "flags": set(), "unrendered_fields": set()})
+        group["requests"] += 1
+        group["body_bytes"] += r["body_bytes"]
+        group["wasted_bytes"] += r["wasted_bytes"]
+        group["flags"].update(r["flags"])
+        group["unrendered_fields"].update(r["unrendered_fields"])
+    rows = sorted(groups.values(), key=lambda g: g["wasted_bytes"], reverse=True)
+    for g in rows:
+        g["flags"], g["unrendered_fields"] = sorted(g["flags"]), sorted(g["unrendered_fields"])
+    return rows
+
+
+def render_markdown(payload: dict) -> str:
+    share = payload["wasted_bytes"] / payload["body_bytes"] if payload["body_bytes"] else 0.0
+    endpoints = [
+        (e["endpoint"][:90], e["requests"], e["body_bytes"], e["wasted_bytes"], ", ".join(e["flags"]))
+        for e in payload["endpoints"][: payload["top"]]
+    ]
+    routes = [(r["route"], r["requests"], r["body_bytes"], r["wasted_bytes"]) for r in payload["routes"]]
+    lines = [
+        "# PostgREST over-fetch",
+        "",
+        f"Generated {payload['generated_at']}: {payload['wasted_bytes']} of {payload['body_bytes']} "
+        f"response bytes ({share:.0%}) carry fields the pages never render.",
+        "",
+        "## Worst endpoints",
+        "",
+        report.markdown_table(("endpoint", "requests", "bytes", "wasted bytes", "flags"), endpoints),
+        "",
+        "## Per route",
+        "",
+        report.markdown_table(("route", "requests", "bytes", "wasted bytes"), routes),
+    ]
+    for e in payload["endpoints"][: payload["top"]]:
+        if e["unrendered_fields"]:
+            lines += ["", f"- `{e['endpoint'][:90]}` unrendered: {', '.join(e['unrendered_fields'][:20])}"]
+    return "\n".join(lines)
@@ -0,0 +1,310 @@
+"""React commit and re-render counts per TC step.
+
+An init script installs a minimal ``__REACT_DEVTOOLS_GLOBAL_HOOK__`` (or
+chains onto one another plugin installed) before any page script runs, so
+React registers with it and reports every commit.
+On each commit the shim walks only the parts of the fiber tree React
+actually reconciled (a subtree whose child list is unchanged bailed out) and
+counts, per component, renders that performed work and why they happened:
+
+``mount``
+    first render of the instance.
+``state`` / ``props``
+    its own state or a prop value changed.
+``context``
+    props and state identical but the component reads a context — almost
+    always a provider value that changed above it.
+``unstable``
+    only function/object props changed identity (inline callbacks, new
+    arrays or ``children`` elements); ``memo`` would not help without
+    stabilising them.
+``wasted``
+    identical props and state and no context: the parent re-rendered and
+    this one did the work for nothing.
+
+Development builds also report ``actualDuration``, from which self render
+time is derived; production builds give counts only. Counters are drained
+before every step, so each click, fill or navigation owns the commits up to
+the next step. With ``--type-delay-ms`` fills are replayed key by key, which
+is what exposes a dashboard re-rendering on every keystroke (TC003's
+prescription form, TC008's support search).
+"""
+
+import asyncio
+import time
+
+from harness import report, tc_runner
+
+_HOOK_SCRIPT = """
+(() => {
+  const COMPONENT_TAGS = new Set([0, 1, 11, 14, 15]);  // function, class, forwardRef, memo, simple memo
+  const PERFORMED_WORK = 1;
+  const fresh = () => ({ commits: 0, render_ms: 0, components: {}, versions: [], errors: 0 });
+  let stats = fresh();
+  const nameOf = (type) => {
+    if (!type) return "Anonymous";
+    if (typeof type === "string") return type;
+    return type.displayName || type.name ||
+      (type.render && (type.render.displayName || type.render.name)) ||
+      (type.type && nameOf(type.type)) || "Anonymous";
+  };
+  const didRender = (f) => (((f.flags !== undefined ? f.flags : f.effectTag) || 0) & PERFORMED_WORK) !== 0;
+  const changedKeys = (a, b) => {
+    if (a === b) return [];
+    if (!a || !b || typeof a !== "object" || typeof b !== "object") return ["*"];
+    return Object.keys(Object.assign({}, a, b)).filter((k) => !Object.is(a[k], b[k]));
+  };
+  const stateChanged = (f, prev) => {
+    if (f.tag !== 0 && f.tag !== 11 && f.tag !== 15) return !Object.is(f.memoizedState, prev.memoizedState);
+    // Hook list: only useState/useReducer hooks (those with a queue) are state
+    for (let a = prev.memoizedState, b = f.memoizedState; a && b; a = a.next, b = b.next) {
+      if (b.queue && !Object.is(a.memoizedState, b.memoizedState)) return true;
+    }
+    return false;
+  };
+  const selfMs = (f) => {
+    if (typeof f.actualDuration !== "number") return 0;
+    let ms = f.actualDuration;
+    for (let c = f.child; c; c = c.sibling) ms -= c.actualDuration || 0;
+    return Math.max(0, ms);
+  };
+  const record = (f, prev) => {
+    const name = nameOf(f.type);
+    const c = stats.components[name] || (stats.components[name] =
+      { renders: 0, mount: 0, state: 0, props: 0, context: 0, unstable: 0, wasted: 0, ms: 0, unstable_props: {} });
+    c.renders++;
+    c.ms += selfMs(f);
+    if (!prev) { c.mount++; return; }
+    if (stateChanged(f, prev)) { c.state++; return; }
+    const keys = changedKeys(prev.memoizedProps, f.memoizedProps);
+    if (keys.length) {
+      const props = f.memoizedProps || {};
+      if (keys.every((k) => k !== "*" && props[k] !== null && (typeof props[k] === "function" || typeof props[k] === "object"))) {
+        c.unstable++;
+        keys.forEach((k) => { c.unstable_props[k] = (c.unstable_props[k] || 0) + 1; });
+      } else {
+        c.props++;
+      }
+    } else if (f.dependencies && f.dependencies.firstContext) {
+      c.context++;
+    } else {
+      c.wasted++;
+    }
+  };
+  const mountTree = (root) => {
+    const stack = [root];
+    while (stack.length) {
+      const f = stack.pop();
+      if (COMPONENT_TAGS.has(f.tag)) record(f, null);
+      for (let c = f.child; c; c = c.sibling) stack.push(c);
+    }
+  };
+  const updateTree = (f, prev) => {
+    if (COMPONENT_TAGS.has(f.tag) && didRender(f)) record(f, prev);
+    if (f.child === prev.child) return;  // bailed out: nothing below was reconciled
+    for (let c = f.child; c; c = c.sibling) {
+      if (c.alternate) updateTree(c, c.alternate); else mountTree(c);
+    }
+  };
+  const onCommit = (root) => {
+    const current = root.current;
+    stats.commits++;
+    if (typeof current.actualDuration === "number") stats.render_ms += current.actualDuration;
+    if (current.alternate) updateTree(current, current.alternate); else mountTree(current);
+  };
+  const hook = window.__REACT_DEVTOOLS_GLOBAL_HOOK__;
+  if (hook) {  // another instrumentation got here first: chain onto it
+    const { inject, onCommitFiberRoot } = hook;
+    hook.inject = function (renderer) { stats.versions.push(renderer.version || "unknown"); return inject.apply(this, arguments); };
+    hook.onCommitFiberRoot = function (id, root) {
+      try { onCommit(root); } catch (e) { stats.errors++; }
+      return onCommitFiberRoot.apply(this, arguments);
+    };
+  } else {
+    let nextId = 1;
+    const noop = () => {};
+    window.__REACT_DEVTOOLS_GLOBAL_HOOK__ = {
+      renderers: new Map(),
+      supportsFiber: true,
+      isDisabled: false,
+      inject(renderer) {
+        const id = nextId++;
+        this.renderers.set(id, renderer);
+        stats.versions.push(renderer.version || "unknown");
+        return id;
+      },
+      onCommitFiberRoot(id, root) {
+        try { onCommit(root); } catch (e) { stats.errors++; }
+      },
+      onCommitFiberUnmount: noop,
+      onPostCommitFiberRoot: noop,
+      onScheduleFiberRoot: noop,
+      checkDCE: noop,
+      on: noop,
+      off: noop,
+      emit: noop,
+      sub: () => noop,
+    };
+  }
+  window.__harnessReactDrain = () => { const out = stats; stats = fresh(); return out; };
+})();
+"""
+_DRAIN = "() => window.__harnessReactDrain ? window.__harnessReactDrain() : null"
+REASONS = ("mount", "state", "props", "context", "unstable", "wasted")
+
+
+def merge(into: dict, sample: dict):
+    """Add one drained page sample to a step's totals."""
+    into["commits"] += sample["commits"]
+    into["render_ms"] += sample["render_ms"]
+    into["errors"] += sample["errors"]
+    for name, counts in sample["components"].items():
+        target = into["components"].setdefault(name, {**{k: 0 for k in REASONS}, "renders": 0, "ms": 0.0,
+                                                      "unstable_props": {}})
+        for key in (*REASONS, "renders", "ms"):
+            target[key] += counts[key]
+        for prop, n in counts["unstable_props"].items():
+            target["unstable_props"][prop] = target["unstable_props"].get(prop, 0) + n
+
+
+def _empty() -> dict:
+    return {"commits": 0, "render_ms": 0.0, "errors": 0, "components": {}}
+
+
+class ReactRenderPlugin(tc_runner.Plugin):
+    """Drains the hook shim's counters into the step that caused them."""
+
+    name = "react-renders"
+
+    def __init__(self):
+        self.current = None
+        self.steps = {}  # step index -> merged counters
+        self.versions = set()
+
+    async def on_context(self, run, context):
+        await context.add_init_script(script=_HOOK_SCRIPT)
+
+    async def on_step_start(self, run, step, page):
+        await self._drain(run)
+        self.current = step.index
+
+    async def before_context_close(self, run, context):
+        await self._drain(run, [context])
+        self.current = None
+
+    async def _drain(self, run, contexts=None):
+        for context in contexts or run.contexts:
+            for page in context.pages:
+                if page.is_closed():
+                    continue
+                try:
+                    sample = await page.evaluate(_DRAIN)
+                except Exception:
+                    continue  # mid-navigation; the old document's counts are gone
+                if not sample:
+                    continue
+                self.versions.update(sample["versions"])
+                if self.current is not None:
+                    merge(self.steps.setdefault(self.current, _empty()), sample)
+
+
+def step_summary(counts: dict) -> dict:
+    components = counts["components"]
+    totals = {k: sum(c[k] for c in components.values()) for k in (*REASONS, "renders")}
+    worst = sorted(components.items(), key=lambda kv: kv[1]["wasted"] + kv[1]["unstable"] + kv[1]["context"],
+                   reverse=True)
+    return {
+        "commits": counts["commits"],
+        "render_ms": counts["render_ms"],
+        **totals,
+        "avoidable": totals["wasted"] + totals["unstable"] + totals["context"],
+        "renders_per_commit": totals["renders"] / counts["commits"] if counts["commits"] else 0.0,
+        "top": [{"component": n, "renders": c["renders"], "avoidable": c["wasted"] + c["unstable"] + c["context"]}
+                for n, c in worst[:5] if c["wasted"] + c["unstable"] + c["context"]],
+    }
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--type-delay-ms", type=int, default=None,
+                        help="replay fills as typing with this delay between keys")
+    parser.add_argument("--top", type=int, default=30)
+
+
+def run(args) -> int:
+    payload = asyncio.run(collect(args))
+    path = report.write_report("react-renders", payload, render_markdown(payload), args.output_dir)
+    print(f"react-renders report: {path}")
+    return 0
+
+
+async def collect(args) -> dict:
+    options = {"type_delay_ms": args.type_delay_ms} if args.type_delay_ms is not None else {}
+    steps, totals, versions = [], _empty(), set()
+    for path in tc_runner.selected(args):
+        plugin = ReactRenderPlugin()
+        run = await tc_runner.run_test_file(path, [plugin], args.timeout, options)
+        print(f"{run.test_id}: {run.status}, {sum(s['commits'] for s in plugin.steps.values())} commits")
+        versions |= plugin.versions
+        for index, counts in sorted(plugin.steps.items()):
+            step = run.steps[index]
+            steps.append({"test_id": run.test_id, "step": index, "kind": step.kind,
+                          "action": f"{step.kind} {step.target}", **step_summary(counts)})
+            merge(totals, counts)
+    ranked = sorted(totals["components"].items(),
+                    key=lambda kv: kv[1]["wasted"] + kv[1]["unstable"] + kv[1]["context"], reverse=True)
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "react_versions": sorted(versions),
+        "typed_fills": args.type_delay_ms is not None,
+        "steps": steps,
+        "components": [
+            {"component": name, **{k: c[k] for k in (*REASONS, "renders", "ms")},
+             "unstable_props": sorted(c["unstable_props"], key=c["unstable_props"].get, reverse=True)[:5]}
+            for name, c in ranked[: args.top]
+        ],
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    steps = sorted(payload["steps"], key=lambda s: s["avoidable"], reverse=True)
+    step_rows = [
+        (s["test_id"], s["step"], s["action"][:50], s["commits"], s["renders"], s["avoidable"],
+         s["renders_per_commit"], s["render_ms"], ", ".join(t["component"] for t in s["top"][:3]))
+        for s in steps[:30]
+    ]
+    inputs = [
+        (s["test_id"], s["step"], s["action"][:50], s["commits"], s["renders_per_commit"], s["avoidable"])
+        for s in sorted((s for s in payload["steps"] if s["kind"] == "fill"),
+                        key=lambda s: s["renders_per_commit"], reverse=True)
+    ]
+    component_rows = [
+        (c["component"], c["renders"], c["wasted"], c["unstable"], c["context"], c["ms"],
+         ", ".join(c["unstable_props"]))
+        for c in payload["components"]
+    ]
+    versions = ", ".join(payload["react_versions"]) or "no React renderer seen"
+    return "\n".join([
+        "# Wasted React renders per interaction",
+        "",
+        f"Generated {payload['generated_at']} (React {versions}"
+        f"{'; fills replayed as typing' if payload['typed_fills'] else ''}). "
+        "Avoidable = wasted + unstable-props + context-only renders.",
+        "",
+        report.markdown_table(
+            ("test", "step", "action", "commits", "renders", "avoidable", "renders / commit", "render ms",
+             "worst components"),
+            step_rows,
+        ),
+        "",
+        "## Input steps (renders per commit ≈ per keystroke when typing)",
+        "",
+        report.markdown_table(("test", "step", "action", "commits", "renders / commit", "avoidable"), inputs),
+        "",
+        "## Components by avoidable renders",
+        "",
+        report.markdown_table(
+            ("component", "renders", "wasted", "unstable props", "context only", "self ms", "props changing identity"),
+            component_rows,
+        ),
+    ])
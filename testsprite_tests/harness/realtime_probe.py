@@ -0,0 +1,192 @@
+"""Realtime propagation-latency probe for prescription status (TC004).
+
+A writer (médico or farmacia, signed in through Supabase Auth) flips one of
+the patient's prescriptions between its original status and ``dispensed``
+(``pending`` if it already is dispensed), while N paciente contexts in a
+single browser watch ``/dashboard/recetas`` on its "Todas" tab. An init
+script inside each watcher records, with the page's own clock, the moment
+the card for that prescription shows the new status label. Latency is
+measured from the write being acknowledged to each watcher seeing it, for
+every subscriber count in ``--subscribers``. The original status is written
+back when the probe ends.
+
+``--mode poll`` (the default) reloads on an interval, which is the upper
+bound the UI offers today: the page loads its data with a single fetch and
+subscribes to nothing. ``--mode live`` waits for the page to update by
+itself, and refuses to run unless the page opens a Supabase Realtime
+channel — without one it would only ever count misses.
+"""
+
+import asyncio
+import time
+
+from harness import browser, config, report, sessions, stats, watch
+from harness.errors import HarnessError
+from harness.supabase_rest import SupabaseRest
+
+RECETAS_PATH = "/dashboard/recetas"
+REALTIME_PATH = "/realtime/v1/websocket"
+
+
+def configure_parser(parser):
+    parser.add_argument("--subscribers", default="1,5,10,25", help="paciente watcher counts")
+    parser.add_argument("--rounds", type=int, default=3, help="status flips per subscriber count")
+    parser.add_argument("--writer", choices=("farmacia", "medico"), default="farmacia")
+    parser.add_argument("--prescription-id", help="defaults to the patient's latest prescription")
+    parser.add_argument("--marker", help="text identifying the card (defaults to its diagnosis)")
+    parser.add_argument("--mode", choices=("poll", "live"), default="poll")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between reloads in poll mode")
+    parser.add_argument("--timeout", type=float, default=30.0, help="seconds a watcher waits per flip")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    payload = asyncio.run(probe(args))
+    path = report.write_report("realtime-probe", payload, render_markdown(payload), args.output_dir)
+    print(f"realtime-probe report: {path}")
+    return 0
+
+
+async def probe(args) -> dict:
+    levels = [int(n) for n in args.subscribers.split(",") if n]
+    async with browser.launch(headless=not args.headed) as (pw, chromium):
+        request = await pw.request.new_context()
+        try:
+            patient = await SupabaseRest.sign_in(request, "paciente")
+            writer = await SupabaseRest.sign_in(request, args.writer)
+            target = await _target_prescription(patient, args.prescription_id)
+            marker = args.marker or target.get("diagnosis")
+            if not marker:
+                raise HarnessError("prescription has no diagnosis to identify its card; pass --marker")
+            original = target["status"]
+            if args.mode == "live" and not await _has_realtime_channel(chromium):
+                raise HarnessError(
+                    f"{RECETAS_PATH} opens no Supabase Realtime channel, so live mode would measure nothing; "
+                    "use --mode poll"
+                )
+            results = []
+            try:
+                for count in levels:
+                    results.append(await _probe_level(chromium, writer, target, marker, count, args))
+            finally:
+                await _set_status(writer, target, original)
+        finally:
+            await request.dispose()
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "mode": args.mode,
+        "writer": args.writer,
+        "prescription_id": target["id"],
+        "levels": results,
+        "scaling": stats.linear_fit(
+            [r["subscribers"] for r in results if r["latency_ms"]["n"]],
+            [r["latency_ms"]["p50"] for r in results if r["latency_ms"]["n"]],
+        ),
+    }
+
+
+async def _target_prescription(patient: SupabaseRest, prescription_id: str = None) -> dict:
+    params = {"select": "id,status,diagnosis", "patient_id": f"eq.{patient.user_id}"}
+    if prescription_id:
+        params["id"] = f"eq.{prescription_id}"
+    else:
+        params.update({"order": "prescribed_at.desc", "limit": "1"})
+    rows = await patient.select("prescriptions", params)
+    if not rows:
+        raise HarnessError("the paciente account has no prescription to watch")
+    return rows[0]
+
+
+async def _set_status(writer: SupabaseRest, target: dict, status: str):
+    rows = await writer.update("prescriptions", {"id": f"eq.{target['id']}"}, {"status": status})
+    if not rows:
+        raise HarnessError(f"update of prescription {target['id']} to {status!r} matched no rows (RLS?)")
+
+
+async def _has_realtime_channel(chromium, settle_s: float = 3.0) -> bool:
+    """Whether the Recetas page opens a Realtime websocket within ``settle_s`` of loading."""
+    context = await sessions.new_context(chromium, "paciente")
+    try:
+        page = await context.new_page()
+        sockets = []
+        page.on("websocket", lambda socket: sockets.append(socket.url))
+        await watch.load_all(page, config.app_url("paciente") + RECETAS_PATH)
+        await asyncio.sleep(settle_s)
+        return any(REALTIME_PATH in url for url in sockets)
+    finally:
+        await context.close()
+
+
+async def _probe_level(chromium, writer, target, marker, count: int, args) -> dict:
+    script = watch.card_status_script(marker)
+    # Every level starts from the original status so watchers load a known state
+    await _set_status(writer, target, target["status"])
+    contexts = []
+    try:
+        pages = []
+        for _ in range(count):
+            context = await sessions.new_context(chromium, "paciente")
+            await context.add_init_script(script=script)
+            contexts.append(context)
+            page = await context.new_page()
+            await watch.load_all(page, config.app_url("paciente") + RECETAS_PATH)
+            pages.append(page)
+
+        latencies, misses = [], 0
+        poll = args.poll_interval if args.mode == "poll" else None
+        original = target["status"]
+        flipped = "dispensed" if original != "dispensed" else "pending"
+        status = original
+        for _ in range(args.rounds):
+            status = flipped if status == original else original
+            shown = watch.shown_status(status)
+            before = time.time() * 1000
+            await _set_status(writer, target, status)
+            acknowledged = time.time() * 1000
+            seen = await asyncio.gather(
+                *(watch.wait_for_status(page, shown, before, args.timeout, poll) for page in pages)
+            )
+            for seen_at in seen:
+                if seen_at is None:
+                    misses += 1
+                else:
+                    latencies.append(max(0.0, seen_at - acknowledged))
+    finally:
+        for context in contexts:
+            await context.close()
+
+    return {
+        "subscribers": count,
+        "rounds": args.rounds,
+        "latency_ms": stats.summarize(latencies),
+        "misses": misses,
+        "miss_rate": misses / (count * args.rounds),
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    rows = [
+        (
+            r["subscribers"],
+            r["latency_ms"].get("p50"),
+            r["latency_ms"].get("p95"),
+            r["latency_ms"].get("max"),
+            f"{r['miss_rate']:.0%}",
+        )
+        for r in payload["levels"]
+    ]
+    slope = payload["scaling"]["slope"]
+    return "\n".join(
+        [
+            "# Prescription status fan-out latency",
+            "",
+            f"Generated {payload['generated_at']}: mode={payload['mode']}, "
+            f"writer={payload['writer']}, prescription {payload['prescription_id']}.",
+            "",
+            report.markdown_table(("subscribers", "p50 ms", "p95 ms", "max ms", "missed"), rows),
+            "",
+            f"p50 grows by {slope:.1f} ms per additional subscriber "
+            f"(r² = {payload['scaling']['r2']:.2f}).",
+        ]
+    )
@@ -0,0 +1,38 @@
+"""Report output: one JSON file for machines, one Markdown file for humans."""
+
+import json
+import time
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from harness import config
+
+
+def markdown_table(headers: Sequence[str], rows: Iterable[Sequence]) -> str:
+    """Render rows as a GitHub-flavoured Markdown table."""
+    lines = [
+        "| " + " | ".join(headers) + " |",
+        "|" + "|".join("---" for _ in headers) + "|",
+    ]
+    for row in rows:
+        lines.append("| " + " | ".join(_cell(value) for value in row) + " |")
+    return "\n".join(lines)
+
+
+def _cell(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    if value is None:
+        return "—"
+    return str(value)
+
+
+def write_report(name: str, payload: dict, markdown: str, output_dir: Path = None) -> Path:
+    """Write ``<name>-<timestamp>.json`` and ``.md`` and return the JSON path."""
+    directory = Path(output_dir or config.OUTPUT_DIR) / name
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    json_path = directory / f"{name}-{stamp}.json"
+    json_path.write_text(json.dumps(payload, indent=2, ensure_ascii=False, default=str))
+    json_path.with_suffix(".md").write_text(markdown + "\n", encoding="utf-8")
+    return json_path
@@ -0,0 +1,213 @@
+"""Duplicate, waterfall and N+1 request detector per UI action.
+
+Runs TC scripts with :class:`harness.network.NetworkRecorder` and groups the
+fetch/XHR traffic by the step that triggered it (a click, fill or
+navigation). Within each step it flags:
+
+- ``duplicate`` — the same method, URL and body requested more than once;
+- ``n+1``       — ``--min-loop`` or more PostgREST requests to one table that
+  differ only in filter values (one request per item instead of ``in.(...)``
+  or an embed);
+- ``waterfall`` — API requests that ran one after another although the later
+  one does not use any id returned by the earlier one, so they could have run
+  in parallel.
+
+Each finding carries the requests, bytes and milliseconds that batching or
+de-duplicating would save, and the JavaScript frame that issued the requests
+(from CDP) so it can be traced to a component. Actions are ranked by
+avoidable time.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass, field
+
+from harness import network, report, tc_runner
+
+
+@dataclass
+class Finding:
+    kind: str
+    shape: str
+    exchanges: list
+    avoidable_requests: int = 0
+    avoidable_bytes: int = 0
+    avoidable_ms: float = 0.0
+    initiators: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "shape": self.shape,
+            "requests": len(self.exchanges),
+            "avoidable_requests": self.avoidable_requests,
+            "avoidable_bytes": self.avoidable_bytes,
+            "avoidable_ms": self.avoidable_ms,
+            "initiators": self.initiators,
+        }
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--min-loop", type=int, default=3, help="same-shape requests that count as N+1")
+    parser.add_argument("--gap-ms", type=float, default=50.0, help="max idle gap between waterfall links")
+    parser.add_argument("--top", type=int, default=15)
+
+
+def run(args) -> int:
+    payload = asyncio.run(audit(args))
+    path = report.write_report("request-audit", payload, render_markdown(payload), args.output_dir)
+    print(f"request-audit report: {path}")
+    return 0
+
+
+async def audit(args) -> dict:
+    recorders, runs = {}, []
+    for path in tc_runner.selected(args):
+        recorder = network.NetworkRecorder(capture_bodies=lambda e: network.is_rest(e.url), initiators=True)
+        run = await tc_runner.run_test_file(path, [recorder], args.timeout)
+        print(f"{run.test_id}: {run.status}, {len(recorder.exchanges)} requests")
+        recorders[run.test_id] = recorder
+        runs.append(run)
+
+    actions = []
+    for run in runs:
+        for index, exchanges in recorders[run.test_id].by_step().items():
+            findings = analyse(exchanges, args.min_loop, args.gap_ms)
+            api = [e for e in exchanges if e.is_api]
+            step = run.steps[index] if index >= 0 else None
+            actions.append({
+                "test_id": run.test_id,
+                "step": index,
+                "action": f"{step.kind} {step.target}" if step else "(before first step)",
+                "route": network.route_of(step.url) if step and step.url else "",
+                "api_requests": len(api),
+                "api_bytes": sum(e.total_bytes for e in api),
+                "avoidable_requests": sum(f.avoidable_requests for f in findings),
+                "avoidable_bytes": sum(f.avoidable_bytes for f in findings),
+                "avoidable_ms": sum(f.avoidable_ms for f in findings),
+                "findings": [f.as_dict() for f in findings],
+            })
+    actions.sort(key=lambda a: (a["avoidable_ms"], a["avoidable_requests"]), reverse=True)
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "tests": [{"test_id": r.test_id, "status": r.status, "error": r.error} for r in runs],
+        "min_loop": args.min_loop,
+        "top": args.top,
+        "actions": actions,
+        "totals": {
+            key: sum(a[key] for a in actions)
+            for key in ("api_requests", "avoidable_requests", "avoidable_bytes", "avoidable_ms")
+        },
+    }
+
+
+def analyse(exchanges, min_loop: int = 3, gap_ms: float = 50.0) -> list:
+    """Findings for the exchanges of one step."""
+    api = sorted((e for e in exchanges if e.is_api and not e.failure), key=lambda e: e.started_at)
+    findings, covered = [], set()
+
+    identical = {}
+    for e in api:
+        identical.setdefault((e.method, e.url, e.post_data), []).append(e)
+    for (method, url, _), group in identical.items():
+        if len(group) > 1:
+            extra = group[1:]
+            findings.append(_finding("duplicate", f"{method} {url}", group,
+                                     len(extra), sum(e.total_bytes for e in extra), _saved_ms(group)))
+            covered.update(id(e) for e in extra)
+
+    loops = {}
+    for e in api:
+        if network.is_rest(e.url) and id(e) not in covered:
+            loops.setdefault((e.method, network.query_shape(e.url)), []).append(e)
+    for (method, shape), group in loops.items():
+        if len(group) >= min_loop and len({e.url for e in group}) > 1:
+            extra = group[1:]
+            overhead = sum(e.request_headers_bytes + e.response_headers_bytes for e in extra)
+            findings.append(_finding("n+1", f"{method} {shape}", group, len(extra), overhead, _saved_ms(group)))
+            covered.update(id(e) for e in extra)
+
+    chain = []
+    for e in (e for e in api if id(e) not in covered):
+        if chain and 0 <= e.started_at - chain[-1].ended_at <= gap_ms and not _depends(e, chain):
+            chain.append(e)
+            continue
+        if len(chain) > 1:
+            findings.append(_waterfall(chain))
+        chain = [e]
+    if len(chain) > 1:
+        findings.append(_waterfall(chain))
+    return findings
+
+
+def _finding(kind, shape, group, requests, size, ms) -> Finding:
+    initiators = sorted({e.initiator for e in group if e.initiator})
+    return Finding(kind, shape, group, requests, size, ms, initiators)
+
+
+def _waterfall(chain) -> Finding:
+    shape = " → ".join(f"{e.method} {network.rest_table(e.url) or network.route_of(e.url)}" for e in chain)
+    return _finding("waterfall", shape, chain, 0, 0, _saved_ms(chain))
+
+
+def _saved_ms(group) -> float:
+    """Wall time of the group minus its slowest request: what running them at once would save."""
+    span = max(e.ended_at for e in group) - min(e.started_at for e in group)
+    return max(0.0, span - max(e.duration_ms for e in group))
+
+
+def _depends(exchange, earlier) -> bool:
+    """Whether ``exchange`` uses an id returned by one of the ``earlier`` responses."""
+    haystack = exchange.url + (exchange.post_data or "")
+    return any(value in haystack for e in earlier for value in _ids(e.body))
+
+
+def _ids(body: str) -> set:
+    if not body:
+        return set()
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return set()
+    values, stack = set(), [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif isinstance(item, str) and len(item) >= 8:
+            values.add(item)
+        elif isinstance(item, int) and not isinstance(item, bool) and item > 999:
+            values.add(str(item))
+    return values
+
+
+def render_markdown(payload: dict) -> str:
+    totals = payload["totals"]
+    ranked = [a for a in payload["actions"] if a["findings"]][: payload["top"]]
+    rows = [
+        (a["test_id"], a["step"], a["action"][:60], a["route"], a["api_requests"],
+         a["avoidable_requests"], a["avoidable_bytes"], a["avoidable_ms"])
+        for a in ranked
+    ]
+    lines = [
+        "# Avoidable requests per UI action",
+        "",
+        f"Generated {payload['generated_at']}: {totals['api_requests']} API requests, of which "
+        f"{totals['avoidable_requests']} avoidable ({totals['avoidable_bytes']} bytes, "
+        f"{totals['avoidable_ms']:.0f} ms of waiting).",
+        "",
+        report.markdown_table(
+            ("test", "step", "action", "route", "api reqs", "avoidable reqs", "avoidable bytes", "avoidable ms"),
+            rows,
+        ),
+    ]
+    for a in ranked:
+        lines += ["", f"## {a['test_id']} step {a['step']}: {a['action'][:80]}", ""]
+        for f in a["findings"]:
+            where = f" — from {', '.join(f['initiators'])}" if f["initiators"] else ""
+            lines.append(f"- **{f['kind']}** ×{f['requests']}: `{f['shape']}`{where}")
+    return "\n".join(lines)
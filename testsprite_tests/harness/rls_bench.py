@@ -0,0 +1,284 @@
+"""RLS policy cost benchmark.
+
+Runs each hot dashboard query under every role's JWT claims twice: once as
+``authenticated`` (policies enforced) and once as ``service_role`` (policies
+bypassed). The difference in latency, planning and execution time is the
+price of RLS for that query. Each ``USING`` expression from ``pg_policies``
+is then timed on its own, so the report shows which policy the cost comes
+from (the chat and multi-role policies have been recursion hot spots before).
+
+Subjects are the first ``profiles`` row for each role, or an explicit
+``--subject role=<uuid>``.
+"""
+
+import asyncio
+import json
+import time
+from dataclasses import dataclass
+
+from harness import config, db, report, stats
+from harness.deps import require
+from harness.errors import HarnessError
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """A query the dashboards issue on every render; ``$1`` is the user id."""
+
+    name: str
+    table: str
+    sql: str
+    roles: tuple = config.ROLES
+
+
+HOT_QUERIES = (
+    HotQuery(
+        "profile_self",
+        "profiles",
+        "SELECT * FROM public.profiles WHERE id = $1::uuid",
+    ),
+    HotQuery(
+        "user_roles_self",
+        "user_roles",
+        "SELECT r.name FROM public.user_roles ur"
+        " JOIN public.roles r ON r.id = ur.role_id"
+        " WHERE ur.user_id = $1::uuid AND ur.active",
+    ),
+    HotQuery(
+        "chat_channels",
+        "chat_participants",
+        "SELECT channel_id FROM public.chat_participants"
+        " WHERE user_id = $1::uuid AND is_banned = false",
+    ),
+    HotQuery(
+        "appointments_doctor",
+        "appointments",
+        "SELECT id, scheduled_at, status FROM public.appointments"
+        " WHERE doctor_id = $1::uuid ORDER BY scheduled_at DESC LIMIT 50",
+        roles=("medico", "secretaria", "clinica"),
+    ),
+    HotQuery(
+        "appointments_patient",
+        "appointments",
+        "SELECT id, scheduled_at, status FROM public.appointments"
+        " WHERE patient_id = $1::uuid ORDER BY scheduled_at DESC LIMIT 50",
+        roles=("paciente",),
+    ),
+    HotQuery(
+        "prescriptions_pending",
+        "prescriptions",
+        "SELECT id, prescription_number, status FROM public.prescriptions"
+        " WHERE status = 'pending' AND $1::uuid IS NOT NULL"
+        " ORDER BY created_at DESC LIMIT 50",
+        roles=("medico", "farmacia"),
+    ),
+    HotQuery(
+        "activity_recent",
+        "user_activity_log",
+        "SELECT id, activity_type, created_at FROM public.user_activity_log"
+        " WHERE user_id = $1::uuid ORDER BY created_at DESC LIMIT 20",
+    ),
+)
+
+_SUBJECT_SQL = (
+    "SELECT id::text FROM public.profiles WHERE role::text = $1"
+    " ORDER BY created_at NULLS LAST LIMIT 1"
+)
+
+_POLICIES_SQL = (
+    "SELECT policyname, cmd, roles::text[] AS roles, qual FROM pg_policies"
+    " WHERE schemaname = 'public' AND tablename = $1"
+    " AND cmd IN ('SELECT', 'ALL') AND qual IS NOT NULL"
+    " ORDER BY policyname"
+)
+
+
+def configure_parser(parser):
+    parser.add_argument("--dsn", default=config.DB_URL, help="superuser connection string")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument(
+        "--explain-samples",
+        type=int,
+        default=5,
+        help="EXPLAIN ANALYZE runs per query/mode for planning vs execution time",
+    )
+    parser.add_argument("--roles", default=",".join(config.ROLES))
+    parser.add_argument("--queries", default="", help="comma-separated subset of hot query names")
+    parser.add_argument(
+        "--subject",
+        action="append",
+        default=[],
+        metavar="ROLE=UUID",
+        help="user id to impersonate for a role (repeatable)",
+    )
+
+
+def run(args) -> int:
+    roles = [r for r in args.roles.split(",") if r]
+    wanted = {q for q in args.queries.split(",") if q}
+    queries = [q for q in HOT_QUERIES if not wanted or q.name in wanted]
+    overrides = dict(item.split("=", 1) for item in args.subject)
+    payload = asyncio.run(benchmark(args.dsn, roles, queries, overrides, args))
+    path = report.write_report("rls-bench", payload, render_markdown(payload), args.output_dir)
+    print(f"rls-bench report: {path}")
+    return 0
+
+
+async def benchmark(dsn, roles, queries, overrides, args) -> dict:
+    asyncpg = require("asyncpg")
+    conn = await db.connect(dsn)
+    try:
+        subjects = await resolve_subjects(conn, roles, overrides)
+        results = []
+        for query in queries:
+            for role in roles:
+                if role not in query.roles or role not in subjects:
+                    continue
+                try:
+                    results.append(await measure_query(conn, query, role, subjects[role], args))
+                except asyncpg.PostgresError as exc:
+                    results.append({"query": query.name, "role": role, "error": str(exc)})
+        policies = []
+        for table in sorted({q.table for q in queries}):
+            policies.extend(await measure_policies(conn, table, roles, subjects, args))
+    finally:
+        await conn.close()
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "iterations": args.iterations,
+        "subjects": subjects,
+        "results": results,
+        "policies": policies,
+    }
+
+
+async def resolve_subjects(conn, roles, overrides) -> dict:
+    subjects = {}
+    for role in roles:
+        subject = overrides.get(role) or await conn.fetchval(_SUBJECT_SQL, role)
+        if subject:
+            subjects[role] = subject
+    if not subjects:
+        raise HarnessError("no seeded profiles found for any role; pass --subject ROLE=UUID")
+    return subjects
+
+
+async def measure_query(conn, query: HotQuery, role: str, subject: str, args) -> dict:
+    row = {"query": query.name, "table": query.table, "role": role}
+    for mode, bypass in (("rls", False), ("bypass", True)):
+        latencies = []
+        for i in range(args.warmup + args.iterations):
+            async with db.as_user(conn, subject, role, bypass_rls=bypass):
+                started = time.perf_counter()
+                rows = await conn.fetch(query.sql, subject)
+                elapsed = (time.perf_counter() - started) * 1000
+            if i >= args.warmup:
+                latencies.append(elapsed)
+        planning, execution = [], []
+        for _ in range(args.explain_samples):
+            async with db.as_user(conn, subject, role, bypass_rls=bypass):
+                plan = await conn.fetchval(
+                    "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query.sql, subject
+                )
+            plan = json.loads(plan)[0] if isinstance(plan, str) else plan[0]
+            planning.append(plan["Planning Time"])
+            execution.append(plan["Execution Time"])
+        row[mode] = {
+            "rows": len(rows),
+            "latency_ms": stats.summarize(latencies),
+            "planning_ms": stats.percentile(planning, 50),
+            "execution_ms": stats.percentile(execution, 50),
+        }
+    rls, bypass = row["rls"], row["bypass"]
+    row["overhead_ms"] = rls["latency_ms"]["p50"] - bypass["latency_ms"]["p50"]
+    row["planning_overhead_ms"] = rls["planning_ms"] - bypass["planning_ms"]
+    row["execution_overhead_ms"] = rls["execution_ms"] - bypass["execution_ms"]
+    return row
+
+
+async def measure_policies(conn, table: str, roles, subjects, args) -> list:
+    """Time each policy's ``USING`` expression against an unfiltered scan."""
+    asyncpg = require("asyncpg")
+    policies = await conn.fetch(_POLICIES_SQL, table)
+    baseline_sql = f"SELECT count(*) FROM public.{table}"
+    results = []
+    for policy in policies:
+        if not {"public", "authenticated"} & set(policy["roles"]):
+            continue
+        filtered_sql = f"SELECT count(*) FROM public.{table} WHERE ({policy['qual']})"
+        for role in roles:
+            if role not in subjects:
+                continue
+            entry = {"table": table, "policy": policy["policyname"], "cmd": policy["cmd"], "role": role}
+            try:
+                baseline = await _time_statement(conn, baseline_sql, subjects[role], role, args)
+                filtered = await _time_statement(conn, filtered_sql, subjects[role], role, args)
+            except asyncpg.PostgresError as exc:
+                entry["error"] = str(exc)
+            else:
+                entry["baseline_ms"] = baseline
+                entry["filtered_ms"] = filtered
+                entry["cost_ms"] = filtered - baseline
+            results.append(entry)
+    return results
+
+
+async def _time_statement(conn, sql: str, subject: str, role: str, args) -> float:
+    timings = []
+    for i in range(args.warmup + args.iterations):
+        # Bypass mode so only the policy expression itself is evaluated, once
+        async with db.as_user(conn, subject, role, bypass_rls=True):
+            started = time.perf_counter()
+            await conn.fetchval(sql)
+            elapsed = (time.perf_counter() - started) * 1000
+        if i >= args.warmup:
+            timings.append(elapsed)
+    return stats.percentile(timings, 50)
+
+
+def render_markdown(payload: dict) -> str:
+    measured = [r for r in payload["results"] if "error" not in r]
+    measured.sort(key=lambda r: r["overhead_ms"], reverse=True)
+    query_rows = [
+        (
+            r["query"],
+            r["role"],
+            r["rls"]["latency_ms"]["p50"],
+            r["bypass"]["latency_ms"]["p50"],
+            r["overhead_ms"],
+            r["planning_overhead_ms"],
+            r["execution_overhead_ms"],
+            f"{r['rls']['rows']}/{r['bypass']['rows']}",
+        )
+        for r in measured
+    ]
+    policy_rows = sorted(
+        (p for p in payload["policies"] if "error" not in p),
+        key=lambda p: p["cost_ms"],
+        reverse=True,
+    )
+    sections = [
+        "# RLS policy cost",
+        "",
+        f"Generated {payload['generated_at']}, {payload['iterations']} iterations per mode.",
+        "",
+        "## Hot queries (p50 ms, RLS on vs bypassed)",
+        "",
+        report.markdown_table(
+            ("query", "role", "rls", "bypass", "overhead", "planning +", "execution +", "rows rls/bypass"),
+            query_rows,
+        ),
+        "",
+        "## Policy expressions (p50 ms added over an unfiltered scan)",
+        "",
+        report.markdown_table(
+            ("table", "policy", "role", "cost"),
+            ((p["table"], p["policy"], p["role"], p["cost_ms"]) for p in policy_rows),
+        ),
+    ]
+    errors = [r for r in payload["results"] + payload["policies"] if "error" in r]
+    if errors:
+        sections += ["", "## Skipped", ""]
+        sections += [f"- {e.get('query') or e.get('policy')} ({e['role']}): {e['error']}" for e in errors]
+    return "\n".join(sections)
@@ -0,0 +1,183 @@
+"""Priority- and deadline-aware selection of TC scripts under a time budget.
+
+Every test in ``testsprite_frontend_test_plan.json`` gets a value from its
+``priority`` and ``category`` (security first, then functional, performance
+and quality), raised by how often it failed recently — a test that has been
+failing is the likeliest to tell us something. Its cost is the 75th
+percentile of its past durations, from the history every scheduled run
+appends to (``harness_output/schedule/history.jsonl``); tests without
+history are assumed to take ``--default-duration``.
+
+Tests are ordered by value per second and started while the expected finish
+still fits in the ``--budget``; one that does not fit is passed over for a
+cheaper one further down. ``--hard-deadline`` also caps each test's timeout
+at the budget left, so the run never overshoots. ``--dry-run`` prints the
+plan without running anything.
+"""
+
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from harness import clock, config, report, stats, tc_runner
+from harness.errors import HarnessError
+
+PLAN_FILE = "testsprite_frontend_test_plan.json"
+PRIORITY_WEIGHTS = {"high": 3.0, "medium": 2.0, "low": 1.0}
+CATEGORY_WEIGHTS = {"security": 1.5, "functional": 1.2, "performance": 1.0, "quality": 0.8}
+# Recent outcomes count more: each older run weighs this much less than the next
+FAILURE_DECAY = 0.7
+UNKNOWN_FAILURE_RATE = 0.5
+
+
+def load_plan(path: Path = None) -> dict:
+    path = path or config.TESTS_DIR / PLAN_FILE
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise HarnessError(f"{path}: {exc}") from None
+    return {e["id"]: e for e in entries}
+
+
+def history_path(output_dir) -> Path:
+    return Path(output_dir or config.OUTPUT_DIR) / "schedule" / "history.jsonl"
+
+
+def load_history(path: Path) -> dict:
+    """``{test_id: [runs, oldest first]}``."""
+    history = {}
+    if path.exists():
+        for line in path.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                history.setdefault(entry["test_id"], []).append(entry)
+    return history
+
+
+def failure_rate(runs: list) -> float:
+    if not runs:
+        return UNKNOWN_FAILURE_RATE
+    weight, total, failed = 1.0, 0.0, 0.0
+    for entry in reversed(runs):
+        total += weight
+        failed += weight * (entry["status"] != "passed")
+        weight *= FAILURE_DECAY
+    return failed / total
+
+
+def estimate(test: str, entry: dict, runs: list, default_s: float) -> dict:
+    base = (PRIORITY_WEIGHTS.get(str(entry.get("priority", "")).lower(), 1.0)
+            * CATEGORY_WEIGHTS.get(str(entry.get("category", "")).lower(), 1.0))
+    rate = failure_rate(runs)
+    durations = [r["duration_s"] for r in runs[-20:]]
+    expected = stats.percentile(durations, 75) if durations else default_s
+    value = base * (1 + rate)
+    return {
+        "test_id": test,
+        "priority": entry.get("priority"),
+        "category": entry.get("category"),
+        "failure_rate": rate,
+        "history": len(runs),
+        "expected_s": expected,
+        "value": value,
+        "value_per_s": value / max(expected, 1.0),
+    }
+
+
+def plan(candidates: list, budget_s: float) -> list:
+    """Greedy by value per second; each entry gets ``planned`` and ``planned_start_s``."""
+    ordered = sorted(candidates, key=lambda c: c["value_per_s"], reverse=True)
+    elapsed = 0.0
+    for c in ordered:
+        c["planned"] = elapsed + c["expected_s"] <= budget_s
+        c["planned_start_s"] = elapsed if c["planned"] else None
+        if c["planned"]:
+            elapsed += c["expected_s"]
+    return ordered
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--budget", required=True, help="wall-clock budget, e.g. 5m or 300")
+    parser.add_argument("--default-duration", type=float, default=120.0, help="seconds assumed without history")
+    parser.add_argument("--hard-deadline", action="store_true", help="cap each test's timeout at the budget left")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan only")
+
+
+def run(args) -> int:
+    budget_s = clock.parse_duration(args.budget)
+    entries = load_plan()
+    hist_path = history_path(args.output_dir)
+    history = load_history(hist_path)
+    paths = {tc_runner.test_id(p): p for p in tc_runner.selected(args)}
+    candidates = [estimate(t, entries.get(t, {}), history.get(t, []), args.default_duration) for t in paths]
+    ordered = plan(candidates, budget_s)
+    for c in ordered:
+        mark = "run " if c["planned"] else "skip"
+        print(f"{mark} {c['test_id']}  value {c['value']:.2f}  ~{c['expected_s']:.0f} s  "
+              f"({c['priority']}, {c['category']}, failure rate {c['failure_rate']:.0%})")
+    results = [] if args.dry_run else asyncio.run(execute(args, ordered, paths, budget_s, hist_path))
+    payload = summarize(ordered, results, budget_s, args.dry_run)
+    path = report.write_report("schedule", payload, render_markdown(payload), args.output_dir)
+    print(f"schedule report: {path}")
+    return 0 if all(r["status"] == "passed" for r in results) else 1
+
+
+async def execute(args, ordered: list, paths: dict, budget_s: float, hist_path: Path) -> list:
+    hist_path.parent.mkdir(parents=True, exist_ok=True)
+    started, results = time.monotonic(), []
+    for c in ordered:
+        remaining = budget_s - (time.monotonic() - started)
+        if c["expected_s"] > remaining:
+            continue  # would overrun; something cheaper further down may still fit
+        timeout = min(args.timeout, remaining) if args.hard_deadline else args.timeout
+        run = await tc_runner.run_test_file(paths[c["test_id"]], [], timeout)
+        print(f"{run.test_id}: {run.status} in {run.duration_s:.1f} s (budget left {remaining - run.duration_s:.0f} s)")
+        entry = {"test_id": run.test_id, "status": run.status, "duration_s": run.duration_s,
+                 "at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with hist_path.open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps(entry) + "\n")
+        results.append({**entry, "error_type": run.error_type})
+    return results
+
+
+def summarize(ordered: list, results: list, budget_s: float, dry_run: bool) -> dict:
+    ran = {r["test_id"] for r in results}
+    total_value = sum(c["value"] for c in ordered) or 1.0
+    covered = [c for c in ordered if (c["test_id"] in ran if not dry_run else c["planned"])]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "budget_s": budget_s,
+        "dry_run": dry_run,
+        "used_s": sum(r["duration_s"] for r in results),
+        "value_covered": sum(c["value"] for c in covered) / total_value,
+        "categories_covered": sorted({c["category"] for c in covered if c["category"]}),
+        "plan": ordered,
+        "results": results,
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    results = {r["test_id"]: r for r in payload["results"]}
+    rows = []
+    for order, c in enumerate(payload["plan"], 1):
+        r = results.get(c["test_id"])
+        if r:
+            outcome = f"{r['status']} ({r['duration_s']:.0f} s)"
+        else:
+            outcome = "planned" if payload["dry_run"] and c["planned"] else "not run"
+        rows.append((order, c["test_id"], c["priority"], c["category"], c["value"], c["failure_rate"],
+                     c["expected_s"], outcome))
+    mode = "plan only" if payload["dry_run"] else f"{payload['used_s']:.0f} s used"
+    return "\n".join([
+        "# Scheduled run",
+        "",
+        f"Generated {payload['generated_at']}: budget {payload['budget_s']:.0f} s, {mode}; "
+        f"{payload['value_covered']:.0%} of plan value covered "
+        f"({', '.join(payload['categories_covered']) or 'no categories'}).",
+        "",
+        report.markdown_table(
+            ("#", "test", "priority", "category", "value", "failure rate", "expected s", "outcome"), rows
+        ),
+    ])
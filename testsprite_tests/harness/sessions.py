@@ -0,0 +1,59 @@
+"""Cached per-role logins.
+
+Logging in through the UI is the slowest and flakiest step of every flow
+(the "Iniciando sesión..." stall), so commands log each role in once, save
+Playwright's storage state under ``harness_output/.sessions/`` and start new
+contexts from it until it ages out.
+"""
+
+import time
+from pathlib import Path
+
+from harness import browser as browser_mod
+from harness import config
+from harness.errors import HarnessError
+
+LOGIN_PATH = "/auth/login"
+
+
+def state_path(role: str) -> Path:
+    return config.SESSIONS_DIR / f"{role}.json"
+
+
+def is_fresh(path: Path) -> bool:
+    return path.exists() and time.time() - path.stat().st_mtime < config.SESSION_MAX_AGE_S
+
+
+async def login(page, role: str):
+    """Log ``role`` in through the app's own login form."""
+    email, password = config.credentials(role)
+    if not email or not password:
+        raise HarnessError(f"set HARNESS_{role.upper()}_EMAIL and HARNESS_{role.upper()}_PASSWORD")
+    await page.goto(config.app_url(role) + LOGIN_PATH, wait_until="domcontentloaded")
+    await page.locator('input[type="email"]').first.fill(email)
+    await page.locator('input[type="password"], input[name="password"]').first.fill(password)
+    await page.locator('button[type="submit"]').first.click()
+    await page.wait_for_url("**/dashboard**", timeout=30000)
+
+
+async def storage_state(browser, role: str, refresh: bool = False) -> Path:
+    """Path to a fresh storage-state file for ``role``, logging in if needed."""
+    path = state_path(role)
+    if refresh or not is_fresh(path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        context = await browser.new_context()
+        try:
+            page = await context.new_page()
+            await login(page, role)
+            await context.storage_state(path=str(path))
+        finally:
+            await context.close()
+    return path
+
+
+async def new_context(browser, role: str, **options):
+    """A browser context already authenticated as ``role``."""
+    path = await storage_state(browser, role)
+    context = await browser.new_context(storage_state=str(path), **options)
+    context.set_default_timeout(browser_mod.DEFAULT_TIMEOUT_MS)
+    return context
@@ -0,0 +1,231 @@
+"""Heap-growth soak: repeat a dashboard loop and look for leaks.
+
+Signs in (cached session), opens the dashboard and repeats a loop of
+client-side navigations ``--iterations`` times. The default loop is the
+médico's day: Inicio → Recetas (sidebar link) → back → Mensajes → back.
+Pass ``--chat-open``/``--chat-close`` selectors to also open and close a chat
+widget every iteration, or ``--loop`` to replace the loop altogether with
+actions of the form ``click:SELECTOR``, ``push:/path`` (Next.js router),
+``back`` and ``wait:MS``.
+
+After every iteration the harness forces a garbage collection and samples,
+over CDP, the used JS heap plus DOM node, event-listener and document
+counts; a linear fit over the samples after ``--warmup`` gives growth per
+iteration and per hour of use. Heap snapshots at the end of the warm-up and
+of the run (and every ``--snapshot-every`` iterations) are summarised by
+constructor, and classes whose retained instance count keeps growing are
+listed — those are the leak suspects.
+"""
+
+import asyncio
+import json
+import time
+
+from harness import browser, config, report, sessions, stats
+from harness.errors import HarnessError
+
+DEFAULT_LOOP = (
+    "click:a[href='/dashboard/recetas']",
+    "back",
+    "push:/dashboard/mensajes",
+    "back",
+)
+
+
+def configure_parser(parser):
+    parser.add_argument("--app", default="medico")
+    parser.add_argument("--role", default="medico")
+    parser.add_argument("--start", default="/dashboard")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=5, help="iterations excluded from the trend")
+    parser.add_argument("--loop", action="append", help="loop action; repeatable (default: Recetas and Mensajes)")
+    parser.add_argument("--chat-open", help="selector that opens the chat widget")
+    parser.add_argument("--chat-close", help="selector that closes it (default: press Escape)")
+    parser.add_argument("--settle-ms", type=int, default=500, help="pause after each action")
+    parser.add_argument("--snapshot-every", type=int, default=0, help="extra heap snapshots every N iterations")
+    parser.add_argument("--leak-threshold", type=float, default=0.05, help="MB per iteration counted as a leak")
+    parser.add_argument("--headed", action="store_true")
+
+
+def run(args) -> int:
+    if args.iterations <= args.warmup + 2:
+        raise HarnessError("--iterations must exceed --warmup by at least 3")
+    payload = asyncio.run(soak(args))
+    path = report.write_report("soak", payload, render_markdown(payload), args.output_dir)
+    print(f"soak report: {path}")
+    return 1 if payload["suspected_leak"] else 0
+
+
+def loop_actions(args) -> list:
+    actions = list(args.loop or DEFAULT_LOOP)
+    if args.chat_open:
+        actions += [f"click:{args.chat_open}", f"click:{args.chat_close}" if args.chat_close else "key:Escape"]
+    return actions
+
+
+async def soak(args) -> dict:
+    actions = loop_actions(args)
+    samples, snapshots = [], []
+    async with browser.launch(headless=not args.headed) as (_, chromium):
+        context = await sessions.new_context(chromium, args.role)
+        try:
+            page = await context.new_page()
+            cdp = await context.new_cdp_session(page)
+            await cdp.send("Performance.enable")
+            await page.goto(config.app_url(args.app) + args.start, wait_until="load")
+            started = time.monotonic()
+            for iteration in range(1, args.iterations + 1):
+                for action in actions:
+                    await _perform(page, action)
+                    await page.wait_for_timeout(args.settle_ms)
+                samples.append({"iteration": iteration, "elapsed_s": time.monotonic() - started,
+                                **await _sample(cdp)})
+                if iteration in (args.warmup, args.iterations) or (
+                    args.snapshot_every and iteration % args.snapshot_every == 0
+                ):
+                    snapshots.append({"iteration": iteration, "classes": await heap_classes(cdp)})
+                    print(f"iteration {iteration}: {samples[-1]['heap_mb']:.1f} MB, snapshot taken")
+        finally:
+            await context.close()
+
+    trend = [s for s in samples if s["iteration"] > args.warmup]
+    seconds_per_iteration = (trend[-1]["elapsed_s"] - trend[0]["elapsed_s"]) / max(1, len(trend) - 1)
+    fits = {
+        key: stats.linear_fit([s["iteration"] for s in trend], [s[key] for s in trend])
+        for key in ("heap_mb", "nodes", "listeners", "documents")
+    }
+    heap = fits["heap_mb"]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "app": args.app,
+        "start": args.start,
+        "loop": actions,
+        "iterations": args.iterations,
+        "warmup": args.warmup,
+        "seconds_per_iteration": seconds_per_iteration,
+        "trend": fits,
+        "heap_mb_per_hour": heap["slope"] * 3600 / seconds_per_iteration if seconds_per_iteration else None,
+        "suspected_leak": heap["slope"] > args.leak_threshold and heap["r2"] > 0.5,
+        "growing_classes": growing_classes(snapshots),
+        "samples": samples,
+    }
+
+
+async def _perform(page, action: str):
+    kind, _, value = action.partition(":")
+    if kind == "click":
+        await page.locator(value).first.click(timeout=10000)
+    elif kind == "push":
+        pushed = await page.evaluate(
+            "(href) => { const r = window.next && window.next.router; if (!r) return false; r.push(href); return true; }",
+            value,
+        )
+        if not pushed:  # no router handle exposed: fall back to a full navigation
+            await page.goto("/".join(page.url.split("/", 3)[:3]) + value)
+    elif kind == "back":
+        await page.go_back(wait_until="commit")
+    elif kind == "key":
+        await page.keyboard.press(value)
+    elif kind == "wait":
+        await page.wait_for_timeout(int(value))
+    else:
+        raise HarnessError(f"unknown loop action {action!r}")
+
+
+async def _sample(cdp) -> dict:
+    await cdp.send("HeapProfiler.collectGarbage")
+    metrics = {m["name"]: m["value"] for m in (await cdp.send("Performance.getMetrics"))["metrics"]}
+    return {
+        "heap_mb": metrics.get("JSHeapUsedSize", 0) / 2**20,
+        "nodes": metrics.get("Nodes", 0),
+        "listeners": metrics.get("JSEventListeners", 0),
+        "documents": metrics.get("Documents", 0),
+    }
+
+
+async def heap_classes(cdp) -> dict:
+    """``{class: [count, self_size]}`` from a full heap snapshot."""
+    chunks = []
+
+    def on_chunk(params):
+        chunks.append(params["chunk"])
+
+    cdp.on("HeapProfiler.addHeapSnapshotChunk", on_chunk)
+    try:
+        await cdp.send("HeapProfiler.takeHeapSnapshot", {"reportProgress": False})
+    finally:
+        cdp.remove_listener("HeapProfiler.addHeapSnapshotChunk", on_chunk)
+    snapshot = json.loads("".join(chunks))
+    meta = snapshot["snapshot"]["meta"]
+    fields = meta["node_fields"]
+    types = meta["node_types"][0]
+    width, type_at, name_at, size_at = len(fields), fields.index("type"), fields.index("name"), fields.index("self_size")
+    nodes, strings = snapshot["nodes"], snapshot["strings"]
+    classes = {}
+    for offset in range(0, len(nodes), width):
+        node_type = types[nodes[offset + type_at]]
+        if node_type in ("object", "closure", "native"):
+            name = strings[nodes[offset + name_at]]
+        else:
+            name = f"({node_type})"
+        entry = classes.setdefault(name, [0, 0])
+        entry[0] += 1
+        entry[1] += nodes[offset + size_at]
+    return classes
+
+
+def growing_classes(snapshots: list, limit: int = 25) -> list:
+    """Classes whose count grew at every snapshot, ranked by growth per iteration."""
+    if len(snapshots) < 2:
+        return []
+    first, last = snapshots[0], snapshots[-1]
+    span = last["iteration"] - first["iteration"] or 1
+    result = []
+    for name, (count, size) in last["classes"].items():
+        history = [s["classes"].get(name, [0, 0])[0] for s in snapshots]
+        if history[-1] > history[0] and all(b >= a for a, b in zip(history, history[1:])):
+            result.append({
+                "class": name,
+                "count": count,
+                "per_iteration": (history[-1] - history[0]) / span,
+                "bytes_per_iteration": (size - first["classes"].get(name, [0, 0])[1]) / span,
+            })
+    result.sort(key=lambda c: c["bytes_per_iteration"], reverse=True)
+    return result[:limit]
+
+
+def render_markdown(payload: dict) -> str:
+    trend = payload["trend"]
+    verdict = "suspected leak" if payload["suspected_leak"] else "no sustained growth"
+    per_hour = payload["heap_mb_per_hour"]
+    lines = [
+        "# Dashboard soak",
+        "",
+        f"Generated {payload['generated_at']}: {payload['iterations']} iterations of "
+        f"`{' → '.join(payload['loop'])}` on {payload['app']}{payload['start']} "
+        f"({payload['seconds_per_iteration']:.1f} s each) — **{verdict}**.",
+        "",
+        report.markdown_table(
+            ("metric", "growth / iteration", "r²"),
+            [
+                ("JS heap (MB)", trend["heap_mb"]["slope"], trend["heap_mb"]["r2"]),
+                ("DOM nodes", trend["nodes"]["slope"], trend["nodes"]["r2"]),
+                ("event listeners", trend["listeners"]["slope"], trend["listeners"]["r2"]),
+                ("documents", trend["documents"]["slope"], trend["documents"]["r2"]),
+            ],
+        ),
+        "",
+        f"At this rate the tab gains {per_hour:.0f} MB per hour of use." if per_hour is not None else "",
+    ]
+    if payload["growing_classes"]:
+        lines += [
+            "",
+            "## Retained classes growing every snapshot",
+            "",
+            report.markdown_table(
+                ("class", "instances", "instances / iteration", "bytes / iteration"),
+                [(c["class"][:60], c["count"], c["per_iteration"], c["bytes_per_iteration"])
+                 for c in payload["growing_classes"]],
+            ),
+        ]
+    return "\n".join(lines)
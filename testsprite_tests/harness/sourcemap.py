@@ -0,0 +1,93 @@
+"""Minimal source-map (v3) reader for attributing chunk bytes to modules.
+
+Only what the harness needs: decode the VLQ ``mappings`` of a chunk's map
+into generated byte spans tagged with their original source, and fold
+covered/uncovered byte intervals onto those sources. Sections (index maps)
+are not supported; ``webpack-internal:///`` scripts from ``next dev`` are
+already one module per script and need no map at all.
+"""
+
+import base64
+import json
+import urllib.request
+from urllib.parse import urljoin
+
+_B64 = {c: i for i, c in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/")}
+WEBPACK_PREFIXES = ("webpack-internal:///", "webpack://_N_E/", "webpack://")
+
+
+def decode_vlq(segment: str) -> list:
+    values, shift, value = [], 0, 0
+    for char in segment:
+        digit = _B64[char]
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+            continue
+        values.append(-(value >> 1) if value & 1 else value >> 1)
+        shift = value = 0
+    return values
+
+
+def clean_source(source: str) -> str:
+    """``webpack://_N_E/./src/app/page.tsx`` -> ``src/app/page.tsx``."""
+    for prefix in WEBPACK_PREFIXES:
+        if source.startswith(prefix):
+            source = source[len(prefix):]
+            break
+    while source.startswith("./"):
+        source = source[2:]
+    return source.split("?", 1)[0]
+
+
+def spans(source_map: dict, generated: str) -> list:
+    """``(start, end, source)`` byte spans of ``generated`` per the map, in order."""
+    sources = [clean_source(s) for s in source_map.get("sources", [])]
+    line_starts = [0]
+    for index, char in enumerate(generated):
+        if char == "\n":
+            line_starts.append(index + 1)
+    result, source = [], 0
+    points = []
+    for line, text in enumerate(source_map.get("mappings", "").split(";")):
+        if line >= len(line_starts):
+            break
+        column = 0
+        for segment in filter(None, text.split(",")):
+            fields = decode_vlq(segment)
+            column += fields[0]
+            if len(fields) >= 4:
+                source += fields[1]
+                points.append((line_starts[line] + column, sources[source] if source < len(sources) else None))
+            else:
+                points.append((line_starts[line] + column, None))
+    points.sort(key=lambda p: p[0])
+    for (start, name), following in zip(points, points[1:] + [(len(generated), None)]):
+        if name and following[0] > start:
+            result.append((start, following[0], name))
+    return result
+
+
+def attribute(span_list: list, used: list) -> dict:
+    """Fold sorted ``used`` intervals onto spans: ``{source: [total, used]}``."""
+    totals, i = {}, 0
+    for start, end, name in span_list:
+        entry = totals.setdefault(name, [0, 0])
+        entry[0] += end - start
+        while i < len(used) and used[i][1] <= start:
+            i += 1
+        j = i
+        while j < len(used) and used[j][0] < end:
+            entry[1] += min(end, used[j][1]) - max(start, used[j][0])
+            j += 1
+    return totals
+
+
+def load(script_url: str, map_url: str) -> dict:
+    """Fetch a map referenced by ``sourceMappingURL`` (inline data URLs included)."""
+    if map_url.startswith("data:"):
+        header, _, data = map_url.partition(",")
+        raw = base64.b64decode(data) if header.endswith(";base64") else data.encode()
+        return json.loads(raw)
+    with urllib.request.urlopen(urljoin(script_url, map_url), timeout=10) as response:
+        return json.loads(response.read())
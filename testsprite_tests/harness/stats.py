@@ -0,0 +1,144 @@
+"""Small descriptive-statistics helpers (stdlib only)."""
+
+import math
+import random
+from typing import Iterable, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Linear-interpolated percentile, ``pct`` in [0, 100]."""
+    if not values:
+        return math.nan
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return float(ordered[lower])
+    weight = rank - lower
+    return ordered[lower] * (1 - weight) + ordered[upper] * weight
+
+
+def summarize(values: Iterable[float]) -> dict:
+    """Count, mean and the percentiles every report prints."""
+    data = [float(v) for v in values]
+    if not data:
+        return {"n": 0}
+    return {
+        "n": len(data),
+        "mean": sum(data) / len(data),
+        "min": min(data),
+        "p50": percentile(data, 50),
+        "p95": percentile(data, 95),
+        "p99": percentile(data, 99),
+        "max": max(data),
+    }
+
+
+def linear_fit(xs: Sequence[float], ys: Sequence[float]) -> dict:
+    """Least-squares line through ``(xs, ys)``: slope, intercept and r²."""
+    n = len(xs)
+    if n < 2:
+        return {"slope": math.nan, "intercept": math.nan, "r2": math.nan}
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    sxx = sum((x - mean_x) ** 2 for x in xs)
+    sxy = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    syy = sum((y - mean_y) ** 2 for y in ys)
+    slope = sxy / sxx if sxx else math.nan
+    intercept = mean_y - slope * mean_x if sxx else math.nan
+    r2 = (sxy * sxy) / (sxx * syy) if sxx and syy else math.nan
+    return {"slope": slope, "intercept": intercept, "r2": r2}
+
+
+def median(values: Sequence[float]) -> float:
+    return percentile(values, 50)
+
+
+def _ranks(values: Sequence[float]) -> tuple:
+    """Average ranks (1-based) of ``values`` and the sizes of the tie groups."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks, ties, i = [0.0] * len(values), [], 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        if j > i:
+            ties.append(j - i + 1)
+        i = j + 1
+    return ranks, ties
+
+
+def _u_distribution(n1: int, n2: int) -> list:
+    """Number of orderings giving each Mann-Whitney U, for samples without ties."""
+    # counts[m][n] -> list indexed by U, built up one observation at a time
+    counts = [[None] * (n2 + 1) for _ in range(n1 + 1)]
+    for m in range(n1 + 1):
+        for n in range(n2 + 1):
+            if m == 0 or n == 0:
+                counts[m][n] = [1]
+                continue
+            size = m * n + 1
+            dist = [0] * size
+            for u, c in enumerate(counts[m - 1][n]):  # largest value from the first sample: beats all n
+                dist[u + n] += c
+            for u, c in enumerate(counts[m][n - 1]):
+                dist[u] += c
+            counts[m][n] = dist
+    return counts[n1][n2]
+
+
+def mann_whitney(a: Sequence[float], b: Sequence[float]) -> float:
+    """Two-sided p-value of the Mann-Whitney U test.
+
+    Exact for small samples without ties; otherwise the normal approximation
+    with tie and continuity corrections.
+    """
+    n1, n2 = len(a), len(b)
+    if not n1 or not n2:
+        return math.nan
+    ranks, ties = _ranks(list(a) + list(b))
+    u = sum(ranks[:n1]) - n1 * (n1 + 1) / 2
+    if not ties and n1 + n2 <= 30:
+        dist = _u_distribution(n1, n2)
+        total = sum(dist)
+        lower = sum(dist[: int(u) + 1]) / total
+        upper = sum(dist[int(u):]) / total
+        return min(1.0, 2 * min(lower, upper))
+    n = n1 + n2
+    mean = n1 * n2 / 2
+    tie_term = sum(t ** 3 - t for t in ties) / (n * (n - 1))
+    sigma = math.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term))
+    if sigma == 0:
+        return 1.0
+    z = (abs(u - mean) - 0.5) / sigma
+    return min(1.0, math.erfc(max(z, 0.0) / math.sqrt(2)))
+
+
+def bootstrap_ratio_ci(a: Sequence[float], b: Sequence[float], confidence: float = 0.95,
+                       resamples: int = 2000, seed: int = 0) -> tuple:
+    """Confidence interval of ``median(b) / median(a) - 1`` by percentile bootstrap."""
+    if not a or not b:
+        return math.nan, math.nan
+    rng = random.Random(seed)
+    changes = []
+    for _ in range(resamples):
+        base = median([rng.choice(a) for _ in a])
+        if base:
+            changes.append(median([rng.choice(b) for _ in b]) / base - 1)
+    if not changes:
+        return math.nan, math.nan
+    tail = (1 - confidence) / 2 * 100
+    return percentile(changes, tail), percentile(changes, 100 - tail)
+
+
+def holm(pvalues: Sequence[float]) -> list:
+    """Holm-Bonferroni adjusted p-values, in the input order (NaN stays NaN)."""
+    indexed = sorted((p, i) for i, p in enumerate(pvalues) if not math.isnan(p))
+    adjusted, running = [math.nan] * len(pvalues), 0.0
+    for rank, (p, i) in enumerate(indexed):
+        running = max(running, min(1.0, p * (len(indexed) - rank)))
+        adjusted[i] = running
+    return adjusted
@@ -0,0 +1,366 @@
+"""Local stand-in for the external services (BCV rate, SMS, SACS, RIF).
+
+One asyncio process serves every stub, each on its own port so the apps can
+be pointed at it by URL alone (``BCV_SERVICE_URL=http://127.0.0.1:4101``).
+Responses follow the shapes of ``services/bcv-rate``,
+``services/sacs-verification``, ``services/rif-verification`` and Twilio's
+Messages API, from canned data.
+
+Each service has a :class:`ServiceProfile` — latency, jitter, error rate and
+hang rate — adjustable at start-up or live through the admin endpoints every
+port exposes:
+
+- ``GET  /__harness/calls``   call log for that service
+- ``GET  /__harness/profile`` current profile
+- ``POST /__harness/profile`` merge a JSON object into the profile
+- ``GET  /__harness/clock``   the stubs' current time
+- ``POST /__harness/clock``   ``{"advance_s": N}`` moves it forward (``--virtual-clock`` only)
+
+Every call is also appended to ``harness_output/stubs/calls-<timestamp>.jsonl``.
+"""
+
+import asyncio
+import base64
+import json
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from harness import clock, config
+from harness.errors import HarnessError
+
+DEFAULT_PORT_BASE = 4100
+SERVICES = ("bcv", "sms", "sacs", "rif")
+
+# 1x1 transparent PNG standing in for the SENIAT captcha
+_CAPTCHA_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+
+CANNED_RATES = {"USD": 36.52, "EUR": 39.87}
+
+# Cédulas SACS answers for; anything else is "not registered"
+CANNED_DOCTORS = {
+    "12345678": ("María Fernanda Rodríguez", "MÉDICO CIRUJANO", "MEDICINA INTERNA"),
+    "23456789": ("José Gregorio Pérez", "MÉDICO CIRUJANO", "PEDIATRÍA"),
+    "34567890": ("Luisa Hernández", "MÉDICO VETERINARIO", None),
+}
+
+CANNED_RIFS = {
+    "J123456789": "FARMACIA PRINCIPAL C.A.",
+    "J234567890": "DROGUERÍA NACIONAL S.A.",
+}
+
+
+@dataclass
+class ServiceProfile:
+    """How a stub misbehaves. Latencies in ms, rates in [0, 1]."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 503
+    hang_rate: float = 0.0
+    hang_ms: float = 60000.0
+
+    def update(self, values: dict):
+        known = {f.name for f in fields(self)}
+        for key, value in values.items():
+            if key not in known:
+                raise HarnessError(f"unknown profile setting '{key}'")
+            setattr(self, key, int(value) if key == "error_status" else float(value))
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    query: dict
+    headers: dict
+    body: bytes
+
+    def json(self) -> dict:
+        if self.headers.get("content-type", "").startswith("application/x-www-form-urlencoded"):
+            return {k: v[0] for k, v in parse_qs(self.body.decode()).items()}
+        try:
+            return json.loads(self.body or b"{}")
+        except ValueError:
+            return {}
+
+
+class StubServer:
+    """All stubs in one event loop; use as an async context manager."""
+
+    def __init__(self, profiles: dict = None, port_base: int = DEFAULT_PORT_BASE,
+                 host: str = "127.0.0.1", log_path: Path = None, seed: int = None, clock=time.time):
+        self.profiles = {name: ServiceProfile() for name in SERVICES}
+        for name, values in (profiles or {}).items():
+            self.profiles[name].update(values)
+        self.host = host
+        self.ports = {name: port_base + i + 1 for i, name in enumerate(SERVICES)}
+        self.calls = []
+        self.log_path = log_path
+        self.random = random.Random(seed)
+        # Wall-clock source for response timestamps; replaceable for virtual time
+        self.clock = clock
+        self._servers = []
+        self._rif_sessions = {}
+
+    def url(self, service: str) -> str:
+        return f"http://{self.host}:{self.ports[service]}"
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    async def start(self):
+        for name, port in self.ports.items():
+            server = await asyncio.start_server(
+                lambda r, w, name=name: self._handle(name, r, w), self.host, port
+            )
+            self._servers.append(server)
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        self._servers = []
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await asyncio.gather(*(s.serve_forever() for s in self._servers))
+        finally:
+            await self.stop()
+
+    async def _handle(self, service: str, reader, writer):
+        started = time.perf_counter()
+        try:
+            request = await _read_request(reader)
+        except (asyncio.IncompleteReadError, ValueError):
+            writer.close()
+            return
+        if request.path.startswith("/__harness/"):
+            status, body = self._admin(service, request)
+        else:
+            status, body = await self._respond(service, request)
+        if status is not None:
+            await _write_response(writer, status, body)
+        writer.close()
+        self._record(service, request, status, (time.perf_counter() - started) * 1000)
+
+    async def _respond(self, service: str, request: Request):
+        profile = self.profiles[service]
+        roll = self.random.random()
+        if roll < profile.hang_rate:
+            await asyncio.sleep(profile.hang_ms / 1000)
+            return None, None  # drop the connection without answering
+        delay = profile.latency_ms + self.random.uniform(-profile.jitter_ms, profile.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        if roll < profile.hang_rate + profile.error_rate:
+            return profile.error_status, {"success": False, "error": "stub: injected failure"}
+        handler = getattr(self, f"_{service}")
+        return handler(request)
+
+    def _admin(self, service: str, request: Request):
+        if request.path == "/__harness/calls":
+            return 200, [c for c in self.calls if c["service"] == service]
+        if request.path == "/__harness/profile":
+            if request.method == "POST":
+                try:
+                    self.profiles[service].update(request.json())
+                except (HarnessError, ValueError) as exc:
+                    return 400, {"error": str(exc)}
+            return 200, asdict(self.profiles[service])
+        if request.path == "/__harness/clock":
+            virtual = isinstance(self.clock, clock.VirtualClock)
+            if request.method == "POST":
+                if not virtual:
+                    return 409, {"error": "started without --virtual-clock"}
+                try:
+                    self.clock.advance(float(request.json().get("advance_s", 0)))
+                except (HarnessError, TypeError, ValueError) as exc:
+                    return 400, {"error": str(exc)}
+            return 200, {"now": _iso(self.clock()), "virtual": virtual}
+        return 404, {"error": "unknown admin endpoint"}
+
+    def _record(self, service: str, request: Request, status, elapsed_ms: float):
+        entry = {
+            "service": service,
+            "method": request.method,
+            "path": request.path,
+            "status": status,
+            "latency_ms": round(elapsed_ms, 2),
+            "at": self.clock(),
+        }
+        self.calls.append(entry)
+        if self.log_path:
+            with self.log_path.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    # -- services ----------------------------------------------------------
+
+    def _bcv(self, request: Request):
+        now = _iso(self.clock())
+        if request.path == "/health":
+            return 200, {"status": "ok", "service": "BCV Rate Service (stub)", "timestamp": now}
+        if request.path == "/rates":
+            rates = [{"currency": c, "rate": r, "date": now} for c, r in CANNED_RATES.items()]
+            return 200, {"success": True, "rates": rates}
+        return 404, {"success": False, "error": "Not found"}
+
+    def _sms(self, request: Request):
+        # Twilio: POST /2010-04-01/Accounts/{sid}/Messages.json (form encoded)
+        if request.method == "POST" and request.path.endswith("/Messages.json"):
+            form = request.json()
+            return 201, {
+                "sid": "SM" + uuid.uuid4().hex,
+                "status": "queued",
+                "to": form.get("To"),
+                "from": form.get("From"),
+                "body": form.get("Body"),
+                "date_created": _iso(self.clock()),
+            }
+        return 404, {"message": "The requested resource was not found", "status": 404}
+
+    def _sacs(self, request: Request):
+        if request.path == "/health":
+            return 200, {"status": "ok", "service": "SACS Verification Service (stub)"}
+        if request.method != "POST" or request.path != "/verify":
+            return 404, {"success": False, "error": "Not found"}
+        body = request.json()
+        cedula = str(body.get("cedula", ""))
+        if not cedula.isdigit() or not 6 <= len(cedula) <= 10:
+            return 400, {"success": False, "verified": False,
+                         "error": "Formato de cédula inválido (solo números, 6-10 dígitos)"}
+        doctor = CANNED_DOCTORS.get(cedula)
+        if doctor is None:
+            return 200, {"success": True, "verified": False,
+                         "message": "Esta cédula no está registrada en el SACS como profesional de la salud"}
+        name, profession, specialty = doctor
+        is_vet = "VETERINARIO" in profession
+        return 200, {
+            "success": True,
+            "verified": not is_vet,
+            "data": {
+                "cedula": cedula,
+                "tipo_documento": body.get("tipo_documento", "V"),
+                "nombre_completo": name,
+                "profesion_principal": profession,
+                "matricula_principal": f"MPPS-{cedula[-5:]}",
+                "especialidad_display": specialty or profession,
+                "es_medico_humano": not is_vet,
+                "es_veterinario": is_vet,
+                "tiene_postgrados": specialty is not None,
+                "apto_red_salud": not is_vet,
+            },
+            "message": "Verificación exitosa (stub)" if not is_vet else "Médico veterinario (stub)",
+            "razon_rechazo": "MEDICO_VETERINARIO" if is_vet else None,
+            "meta": {"cached": False},
+        }
+
+    def _rif(self, request: Request):
+        if request.path == "/health":
+            return 200, {"status": "ok", "service": "rif-verification"}
+        if request.path == "/get-captcha":
+            session_id = uuid.uuid4().hex[:7]
+            self._rif_sessions[session_id] = self.clock()
+            return 200, {
+                "sessionId": session_id,
+                "captchaBase64": "data:image/png;base64," + base64.b64encode(_CAPTCHA_PNG).decode(),
+            }
+        if request.method == "POST" and request.path == "/validate":
+            body = request.json()
+            if body.get("sessionId") not in self._rif_sessions:
+                return 400, {"error": "Sesión expirada o inválida"}
+            name = CANNED_RIFS.get(str(body.get("rif", "")).replace("-", "").upper())
+            if name is None:
+                return 200, {"success": False, "error": "Contribuyente no encontrado o error en el portal"}
+            return 200, {"success": True, "businessName": name}
+        return 404, {"error": "Not found"}
+
+
+async def _read_request(reader) -> Request:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, _ = lines[0].split(" ", 2)
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    url = urlsplit(target)
+    return Request(method.upper(), url.path, parse_qs(url.query), headers, body)
+
+
+async def _write_response(writer, status: int, payload):
+    body = json.dumps(payload, ensure_ascii=False).encode()
+    head = (
+        f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode() + body)
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+def _iso(epoch: float) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(epoch)) + f".{int(epoch % 1 * 1000):03d}Z"
+
+
+def parse_settings(items) -> dict:
+    """``["bcv.latency_ms=1500", "all.error_rate=0.1"]`` -> per-service dicts."""
+    profiles = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        service, _, setting = key.partition(".")
+        targets = SERVICES if service == "all" else (service,)
+        for target in targets:
+            if target not in SERVICES:
+                raise HarnessError(f"unknown service '{target}' (expected one of {', '.join(SERVICES)})")
+            profiles.setdefault(target, {})[setting] = value
+    return profiles
+
+
+def configure_parser(parser):
+    parser.add_argument("--port-base", type=int, default=DEFAULT_PORT_BASE,
+                        help="services listen on base+1 (bcv), +2 (sms), +3 (sacs), +4 (rif)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--config", help="JSON file: {service: {setting: value}}")
+    parser.add_argument("--set", action="append", default=[], metavar="SERVICE.SETTING=VALUE",
+                        help="e.g. bcv.latency_ms=3000, sacs.error_rate=0.2, all.jitter_ms=50")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--virtual-clock", action="store_true",
+                        help="serve virtual time that POST /__harness/clock can move forward")
+
+
+def run(args) -> int:
+    profiles = json.loads(Path(args.config).read_text()) if args.config else {}
+    for service, values in parse_settings(args.set).items():
+        profiles.setdefault(service, {}).update(values)
+    log_dir = Path(args.output_dir or config.OUTPUT_DIR) / "stubs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_path = log_dir / f"calls-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+    source = clock.VirtualClock() if args.virtual_clock else time.time
+    server = StubServer(profiles, args.port_base, args.host, log_path, args.seed, source)
+    for service in SERVICES:
+        print(f"{service:>4}: {server.url(service)}  {asdict(server.profiles[service])}")
+    print(f"call log: {log_path}")
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,88 @@
+"""Minimal Supabase Auth + PostgREST client over Playwright's request API.
+
+Used where a flow needs to act as a role without driving its UI (writers,
+seeders), so the measured latency belongs to the watcher, not the writer.
+"""
+
+from harness import config
+from harness.errors import HarnessError
+
+
+class SupabaseRest:
+    """Authenticated REST access as one user (or the service role)."""
+
+    def __init__(self, request, token: str = None):
+        if not config.SUPABASE_ANON_KEY:
+            raise HarnessError("set NEXT_PUBLIC_SUPABASE_ANON_KEY")
+        self.request = request
+        self.token = token or config.SUPABASE_ANON_KEY
+        self.user_id = None
+
+    @classmethod
+    async def sign_in(cls, request, role: str) -> "SupabaseRest":
+        email, password = config.credentials(role)
+        if not email or not password:
+            raise HarnessError(f"set HARNESS_{role.upper()}_EMAIL and HARNESS_{role.upper()}_PASSWORD")
+        response = await request.post(
+            f"{config.SUPABASE_URL}/auth/v1/token?grant_type=password",
+            headers={"apikey": config.SUPABASE_ANON_KEY},
+            data={"email": email, "password": password},
+        )
+        if not response.ok:
+            raise HarnessError(f"{role} sign-in failed: HTTP {response.status}")
+        body = await response.json()
+        client = cls(request, body["access_token"])
+        client.user_id = body["user"]["id"]
+        return client
+
+    @classmethod
+    def service(cls, request) -> "SupabaseRest":
+        if not config.SUPABASE_SERVICE_ROLE_KEY:
+            raise HarnessError("set SUPABASE_SERVICE_ROLE_KEY")
+        return cls(request, config.SUPABASE_SERVICE_ROLE_KEY)
+
+    def _headers(self, extra=None) -> dict:
+        headers = {
+            "apikey": config.SUPABASE_ANON_KEY,
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json",
+        }
+        headers.update(extra or {})
+        return headers
+
+    async def select(self, table: str, params: dict) -> list:
+        response = await self.request.get(
+            f"{config.SUPABASE_URL}/rest/v1/{table}", headers=self._headers(), params=params
+        )
+        return await self._json(response, table)
+
+    async def insert(self, table: str, row: dict) -> dict:
+        response = await self.request.post(
+            f"{config.SUPABASE_URL}/rest/v1/{table}",
+            headers=self._headers({"Prefer": "return=representation"}),
+            data=row,
+        )
+        rows = await self._json(response, table)
+        return rows[0]
+
+    async def update(self, table: str, filters: dict, values: dict) -> list:
+        response = await self.request.patch(
+            f"{config.SUPABASE_URL}/rest/v1/{table}",
+            headers=self._headers({"Prefer": "return=representation"}),
+            params=filters,
+            data=values,
+        )
+        return await self._json(response, table)
+
+    async def delete(self, table: str, filters: dict):
+        response = await self.request.delete(
+            f"{config.SUPABASE_URL}/rest/v1/{table}", headers=self._headers(), params=filters
+        )
+        await self._json(response, table)
+
+    @staticmethod
+    async def _json(response, table: str):
+        if not response.ok:
+            raise HarnessError(f"{table}: HTTP {response.status} {await response.text()}")
+        text = await response.text()
+        return await response.json() if text else []
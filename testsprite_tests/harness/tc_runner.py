@@ -0,0 +1,396 @@
+"""Run the generated ``TC*.py`` scripts in-process with instrumentation.
+
+The scripts are left untouched. Each one is loaded without its module-level
+``asyncio.run(run_test())`` (and without the stray Markdown fences some
+generated files contain), then its ``run_test`` coroutine is awaited while
+Playwright's ``launch``, ``new_context``, ``BrowserContext.close``,
+``Page.goto``, ``Locator.click`` and ``Locator.fill`` are wrapped. Every
+``goto``/``click``/``fill`` is a :class:`Step`; :class:`Plugin` subclasses
+hook into launches, contexts and steps to measure whatever they need.
+
+Run options change how steps execute: ``type_delay_ms`` replays every
+``fill`` as key-by-key typing with that delay, which is how real users
+trigger per-keystroke work that a single ``fill`` hides. ``resume`` (a
+checkpoint from :mod:`harness.checkpoint`) starts contexts from its storage
+state, skips the steps before it and their pauses, and opens its URL before
+the first step that runs. ``origins`` (``{"http://localhost:3000":
+"http://localhost:4000"}``) sends every ``goto`` under one origin to
+another, so the same script can drive a second deployment.
+
+The wrappers find the active :class:`TestRun` through a context variable, so
+several tests can run concurrently in one event loop.
+"""
+
+import ast
+import asyncio
+import contextvars
+import time
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from harness import config
+from harness.deps import require
+from harness.errors import HarnessError
+
+_current_run = contextvars.ContextVar("harness_test_run", default=None)
+_patched = False
+
+
+@dataclass
+class Step:
+    """One user-visible action of a TC script."""
+
+    index: int
+    kind: str
+    target: str
+    url: str = ""
+    started_at: float = 0.0
+    ended_at: float = 0.0
+    error: str = None
+    skipped: bool = False
+
+    @property
+    def duration_ms(self) -> float:
+        return self.ended_at - self.started_at
+
+    @property
+    def signature(self) -> str:
+        return f"{self.kind} {self.target}"
+
+    def as_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "kind": self.kind,
+            "target": self.target,
+            "url": self.url,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "skipped": self.skipped,
+        }
+
+
+@dataclass
+class TestRun:
+    """State and outcome of one TC script execution."""
+
+    test_id: str
+    path: Path
+    plugins: list
+    steps: list = field(default_factory=list)
+    contexts: list = field(default_factory=list)
+    status: str = "pending"
+    error: str = None
+    error_type: str = None
+    started_at: float = 0.0
+    ended_at: float = 0.0
+    data: dict = field(default_factory=dict)
+    options: dict = field(default_factory=dict)
+
+    @property
+    def duration_s(self) -> float:
+        return (self.ended_at - self.started_at) / 1000
+
+    @property
+    def current_step(self):
+        return self.steps[-1] if self.steps else None
+
+    @property
+    def replaying(self) -> bool:
+        """True while a resumed run is still skipping steps before its checkpoint."""
+        resume = self.options.get("resume")
+        return bool(resume) and len(self.steps) < resume["step"]
+
+    def as_dict(self) -> dict:
+        return {
+            "test_id": self.test_id,
+            "path": self.path.name,
+            "status": self.status,
+            "error_type": self.error_type,
+            "error": self.error,
+            "duration_s": self.duration_s,
+            "steps": [s.as_dict() for s in self.steps],
+            "data": self.data,
+        }
+
+
+class Plugin:
+    """Instrumentation hooks; override the ones you need.
+
+    ``on_launch`` and ``on_context_options`` receive the keyword arguments of
+    ``launch``/``new_context`` and may change them in place.
+    """
+
+    name = "plugin"
+
+    def on_launch(self, run: TestRun, options: dict):
+        pass
+
+    def on_context_options(self, run: TestRun, options: dict):
+        pass
+
+    async def on_test_start(self, run: TestRun):
+        pass
+
+    async def on_context(self, run: TestRun, context):
+        pass
+
+    async def on_step_start(self, run: TestRun, step: Step, page):
+        pass
+
+    async def on_step_end(self, run: TestRun, step: Step, page):
+        pass
+
+    async def before_context_close(self, run: TestRun, context):
+        pass
+
+    async def on_test_end(self, run: TestRun):
+        pass
+
+
+def test_id(path: Path) -> str:
+    return path.name.split("_", 1)[0]
+
+
+def discover(ids=None) -> list:
+    """TC script paths, optionally restricted to ``ids`` (e.g. ``["TC001"]``)."""
+    paths = sorted(config.TESTS_DIR.glob("TC*.py"))
+    if ids:
+        wanted = set(ids)
+        paths = [p for p in paths if test_id(p) in wanted]
+        missing = wanted - {test_id(p) for p in paths}
+        if missing:
+            raise HarnessError(f"unknown test ids: {', '.join(sorted(missing))}")
+    return paths
+
+
+def add_selection_arguments(parser):
+    """``--tests`` / ``--timeout`` shared by every command that runs TC scripts."""
+    parser.add_argument("--tests", default="", help="comma-separated TC ids (default: all)")
+    parser.add_argument("--timeout", type=float, default=600.0, help="seconds per test")
+
+
+def selected(args) -> list:
+    return discover([t for t in args.tests.split(",") if t])
+
+
+def load_run_test(path: Path):
+    """Compile a TC script and return its ``run_test`` coroutine function."""
+    lines = [line for line in path.read_text(encoding="utf-8").splitlines() if line.strip() != "```"]
+    tree = ast.parse("\n".join(lines), filename=str(path))
+    tree.body = [node for node in tree.body if not _is_asyncio_run(node)]
+    namespace = {"__name__": f"harness_tc_{test_id(path)}", "__file__": str(path)}
+    exec(compile(tree, str(path), "exec"), namespace)
+    if "run_test" not in namespace:
+        raise HarnessError(f"{path.name} defines no run_test()")
+    return namespace["run_test"]
+
+
+def _is_asyncio_run(node) -> bool:
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute)
+        and node.value.func.attr == "run"
+    )
+
+
+async def run_test_file(path: Path, plugins=(), timeout_s: float = None, options: dict = None) -> TestRun:
+    """Execute one TC script with ``plugins`` attached and return its run."""
+    install_patches()
+    run = TestRun(test_id(path), path, list(plugins), options=dict(options or {}))
+    token = _current_run.set(run)
+    run.started_at = _now()
+    try:
+        for plugin in run.plugins:
+            await plugin.on_test_start(run)
+        run_test = load_run_test(path)
+        await asyncio.wait_for(run_test(), timeout_s)
+        run.status = "passed"
+    except asyncio.TimeoutError:
+        run.status, run.error_type, run.error = "failed", "TestTimeout", f"exceeded {timeout_s:.0f} s"
+    except SyntaxError as exc:
+        run.status, run.error_type, run.error = "error", "SyntaxError", str(exc)
+    except Exception as exc:  # the script's own failure is the result, not a crash
+        run.status, run.error_type = "failed", type(exc).__name__
+        run.error = str(exc).strip().splitlines()[0] if str(exc).strip() else traceback.format_exc(limit=1)
+    finally:
+        run.ended_at = _now()
+        for plugin in run.plugins:
+            await plugin.on_test_end(run)
+        _current_run.reset(token)
+    return run
+
+
+def install_patches():
+    """Wrap the Playwright methods the TC scripts call (idempotent)."""
+    global _patched
+    if _patched:
+        return
+    async_api = require("playwright.async_api")
+
+    launch = async_api.BrowserType.launch
+
+    async def patched_launch(self, **options):
+        run = _current_run.get()
+        if run:
+            for plugin in run.plugins:
+                plugin.on_launch(run, options)
+        return await launch(self, **options)
+
+    new_context = async_api.Browser.new_context
+
+    async def patched_new_context(self, **options):
+        run = _current_run.get()
+        if not run:
+            return await new_context(self, **options)
+        if run.options.get("resume"):
+            options.setdefault("storage_state", run.options["resume"]["storage_state"])
+        for plugin in run.plugins:
+            plugin.on_context_options(run, options)
+        context = await new_context(self, **options)
+        run.contexts.append(context)
+        for plugin in run.plugins:
+            await plugin.on_context(run, context)
+        return context
+
+    close_context = async_api.BrowserContext.close
+
+    async def patched_close(self, **options):
+        run = _current_run.get()
+        if run and self in run.contexts:
+            for plugin in run.plugins:
+                try:
+                    await plugin.before_context_close(run, self)
+                except Exception as exc:  # never let a plugin mask the test outcome
+                    run.data.setdefault("plugin_errors", []).append(f"{plugin.name}: {exc}")
+        return await close_context(self, **options)
+
+    wait_for_timeout = async_api.Page.wait_for_timeout
+
+    async def patched_wait_for_timeout(self, timeout):
+        run = _current_run.get()
+        if run and run.replaying:
+            return None
+        return await wait_for_timeout(self, timeout)
+
+    async_api.BrowserType.launch = patched_launch
+    async_api.Browser.new_context = patched_new_context
+    async_api.BrowserContext.close = patched_close
+    async_api.Page.wait_for_timeout = patched_wait_for_timeout
+    async_api.Page.goto = _step_wrapper(
+        _rebased_goto(async_api.Page.goto), "goto", lambda page, url, *a, **k: (page, url)
+    )
+    async_api.Locator.click = _step_wrapper(async_api.Locator.click, "click", _locator_target)
+    async_api.Locator.fill = _step_wrapper(_typed_fill(async_api.Locator.fill), "fill", _locator_target)
+    _patched = True
+
+
+def _locator_target(locator, *args, **kwargs):
+    return locator.page, _selector(locator)
+
+
+def _selector(locator) -> str:
+    # Locator.__repr__ is "<Locator frame=... selector='...'>"
+    text = repr(locator)
+    marker = "selector='"
+    if marker in text:
+        return text.split(marker, 1)[1].rsplit("'", 1)[0]
+    return text
+
+
+def _typed_fill(fill):
+    async def wrapper(self, value, **kwargs):
+        run = _current_run.get()
+        delay = run.options.get("type_delay_ms") if run else None
+        if delay is None:
+            return await fill(self, value, **kwargs)
+        await fill(self, "", **kwargs)
+        await self.press_sequentially(value, delay=delay, timeout=kwargs.get("timeout"))
+
+    wrapper.__name__ = fill.__name__
+    return wrapper
+
+
+def _rebased_goto(goto):
+    async def wrapper(self, url, *args, **kwargs):
+        run = _current_run.get()
+        for source, target in (run.options.get("origins") or {}).items() if run else ():
+            if url == source or url.startswith(source.rstrip("/") + "/"):
+                url = target.rstrip("/") + url[len(source.rstrip("/")):]
+                break
+        return await goto(self, url, *args, **kwargs)
+
+    wrapper.__name__ = goto.__name__
+    return wrapper
+
+
+def _step_wrapper(original, kind: str, describe):
+    async def wrapper(self, *args, **kwargs):
+        run = _current_run.get()
+        if not run:
+            return await original(self, *args, **kwargs)
+        page, target = describe(self, *args, **kwargs)
+        step = Step(len(run.steps), kind, str(target), url=page.url)
+        resume = run.options.get("resume")
+        if run.replaying:
+            _check_replay(resume, step)
+            step.skipped = True
+            run.steps.append(step)
+            return None
+        run.steps.append(step)
+        if resume and step.index == resume["step"]:
+            await _goto(page, resume["url"], wait_until="load")
+            step.url = page.url
+        for plugin in run.plugins:
+            try:
+                await plugin.on_step_start(run, step, page)
+            except Exception as exc:  # a broken plugin must not change the test's verdict
+                run.data.setdefault("plugin_errors", []).append(f"{plugin.name}: {exc}")
+        step.started_at = _now()
+        try:
+            return await original(self, *args, **kwargs)
+        except Exception as exc:
+            step.error = f"{type(exc).__name__}: {str(exc).strip().splitlines()[0] if str(exc).strip() else ''}"
+            raise
+        finally:
+            step.ended_at = _now()
+            for plugin in run.plugins:
+                try:
+                    await plugin.on_step_end(run, step, page)
+                except Exception as exc:
+                    run.data.setdefault("plugin_errors", []).append(f"{plugin.name}: {exc}")
+
+    wrapper.__name__ = original.__name__
+    wrapper.__wrapped__ = original
+    return wrapper
+
+
+def _check_replay(resume: dict, step: Step):
+    recorded = resume["signatures"]
+    if step.index < len(recorded) and recorded[step.index] != step.signature:
+        raise HarnessError(
+            f"script changed before the checkpoint: step {step.index} was {recorded[step.index]!r}, "
+            f"now {step.signature!r}"
+        )
+
+
+async def _goto(page, url: str, **kwargs):
+    """Navigate without recording a step."""
+    goto = type(page).goto
+    return await getattr(goto, "__wrapped__", goto)(page, url, **kwargs)
+
+
+def _now() -> float:
+    return time.time() * 1000
+
+
+async def run_suite(paths, make_plugins, timeout_s: float = None) -> list:
+    """Run ``paths`` one after another; ``make_plugins()`` gives fresh plugins per test."""
+    runs = []
+    for path in paths:
+        run = await run_test_file(path, make_plugins(), timeout_s)
+        print(f"{run.test_id}: {run.status} in {run.duration_s:.1f} s" + (f" ({run.error_type})" if run.error else ""))
+        runs.append(run)
+    return runs
@@ -0,0 +1,82 @@
+"""Fault rule parsing and scheduling of ``chaos``."""
+
+import math
+import random
+
+import pytest
+
+from harness import chaos
+from harness.errors import HarnessError
+
+
+def test_parse_rule_defaults():
+    rule = chaos.parse_rule("timeout@/auth/v1/token")
+    assert (rule.kind, rule.pattern, rule.probability, rule.status) == ("timeout", "/auth/v1/token", 1.0, 503)
+    assert rule.window == (0.0, math.inf)
+    assert rule.burst is None
+    assert rule.label == "timeout@/auth/v1/token"
+
+
+def test_parse_rule_options():
+    rule = chaos.parse_rule("error@/rest/v1/ p=0.25 status=502 hang_s=5 ratio=0.1 window=10-40 burst=20:5")
+    assert rule.probability == 0.25
+    assert rule.status == 502
+    assert rule.hang_s == 5.0
+    assert rule.truncate_ratio == 0.1
+    assert rule.window == (10.0, 40.0)
+    assert rule.burst == (20.0, 5.0)
+
+
+@pytest.mark.parametrize("value, window", [("10-", (10.0, math.inf)), ("-40", (0.0, 40.0))])
+def test_parse_rule_open_ended_window(value, window):
+    assert chaos.parse_rule(f"latency@/api/ window={value}").window == window
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        "explode@/api/",  # unknown kind
+        "latency/api/",  # no @
+        "latency@",  # no pattern
+        "error@/api/ status=abc",
+        "error@/api/ burst=x:y",
+        "error@/api/ colour=red",
+    ],
+)
+def test_parse_rule_rejects(spec):
+    with pytest.raises(HarnessError):
+        chaos.parse_rule(spec)
+
+
+def test_presets_parse():
+    for specs in chaos.PRESETS.values():
+        for spec in specs:
+            chaos.parse_rule(spec)
+
+
+def test_active_respects_window_bounds():
+    rule = chaos.parse_rule("error@/api/ window=10-40")
+    assert not rule.active(9.99)
+    assert rule.active(10.0)
+    assert rule.active(39.99)
+    assert not rule.active(40.0)  # end is exclusive
+
+
+def test_active_bursts_are_relative_to_window_start():
+    rule = chaos.parse_rule("error@/api/ window=10-100 burst=20:5")
+    assert [rule.active(t) for t in (10, 14.9, 15, 29.9, 30, 34.9, 35)] == [True, True, False, False, True, True, False]
+
+
+def test_matches_is_a_regex_search():
+    rule = chaos.parse_rule("latency@/(rest|auth)/v1/")
+    assert rule.matches("http://localhost:54321/rest/v1/prescriptions?select=*")
+    assert not rule.matches("http://localhost:54321/storage/v1/object")
+
+
+def test_sample_ms():
+    rng = random.Random(0)
+    assert chaos.sample_ms("fixed:250", rng) == 250
+    assert all(100 <= chaos.sample_ms("uniform:100:200", rng) <= 200 for _ in range(50))
+    for bad in ("fixed", "uniform:1", "gamma:1:2", "exp:0"):
+        with pytest.raises(HarnessError):
+            chaos.sample_ms(bad, rng)
@@ -0,0 +1,107 @@
+"""Verdict logic of ``compare``: per-family Holm correction and power checks."""
+
+import math
+
+import pytest
+
+from harness import compare
+from harness.errors import HarnessError
+
+
+def trials(a_values: dict, b_values: dict, test_id="TC001", status="passed", warmup=False) -> list:
+    """One trial per run; ``*_values`` map (kind, label) -> list of per-run values."""
+    runs = len(next(iter(a_values.values())))
+    out = []
+    for arm, values in (("a", a_values), ("b", b_values)):
+        for index in range(runs):
+            out.append({"warmup": warmup, "status": status, "arm": arm, "test_id": test_id,
+                        "metrics": [(key, series[index]) for key, series in values.items()]})
+    return out
+
+
+def row(**overrides) -> dict:
+    base = {"n_a": 7, "n_b": 7, "p_adjusted": 0.001, "ci_low": 0.1, "ci_high": 0.3, "change": 0.2}
+    return {**base, **overrides}
+
+
+def test_parse_target():
+    assert compare.parse_target("main=http://localhost:3000/", "A") == ("main", "http://localhost:3000")
+    assert compare.parse_target("http://localhost:4000", "B") == ("B", "http://localhost:4000")
+    with pytest.raises(HarnessError):
+        compare.parse_target("main=localhost:3000", "A")
+
+
+def test_rounds_alternate_and_flag_warmup():
+    assert compare.rounds(3, 1) == [(True, ("a", "b")), (False, ("b", "a")), (False, ("a", "b")),
+                                    (False, ("b", "a"))]
+
+
+@pytest.mark.parametrize(
+    "overrides, expected",
+    [
+        ({}, "slower"),
+        ({"change": -0.2, "ci_low": -0.3, "ci_high": -0.1}, "faster"),
+        ({"p_adjusted": 0.2}, "no change"),
+        ({"ci_low": -0.01}, "no change"),  # interval includes zero
+        ({"change": 0.02, "ci_low": 0.01, "ci_high": 0.03}, "no change"),  # below --min-effect
+        ({"n_b": 2}, "insufficient data"),
+    ],
+)
+def test_verdict(overrides, expected):
+    assert compare.verdict(row(**overrides), alpha=0.05, min_effect=0.03) == expected
+
+
+def test_combine():
+    assert compare.combine(["no change", "slower"]) == "slower"
+    assert compare.combine(["faster", "slower"]) == "mixed"
+    assert compare.combine(["faster", "insufficient data"]) == "faster"
+    assert compare.combine([]) == "no change"
+
+
+def test_min_p_is_the_exact_separated_sample_p():
+    assert compare.min_p(3, 3) == pytest.approx(2 / math.comb(6, 3))
+    assert compare.min_p(7, 7) == pytest.approx(2 / math.comb(14, 7))
+
+
+def test_headline_regression_survives_many_step_metrics():
+    runs = 7
+    a = {("duration", "test duration (s)"): [10.0 + i / 10 for i in range(runs)]}
+    b = {("duration", "test duration (s)"): [13.0 + i / 10 for i in range(runs)]}
+    # 100 step metrics would lift the best headline p above alpha if they shared its Holm family
+    for step in range(100):
+        a[("step", f"step {step:03d}")] = [100.0 + (i * 7 + step) % 5 for i in range(runs)]
+        b[("step", f"step {step:03d}")] = [100.0 + (i * 3 + step) % 5 for i in range(runs)]
+    rows = compare.analyze(trials(a, b), alpha=0.05, min_effect=0.03, confidence=0.95)
+    duration = next(r for r in rows if r["kind"] == "duration")
+    assert duration["family"] == "TC001 headline"
+    assert duration["p_adjusted"] == pytest.approx(compare.min_p(runs, runs))
+    assert duration["verdict"] == "slower"
+    assert {r["family"] for r in rows if r["kind"] == "step"} == {"TC001 steps"}
+
+
+def test_analyze_skips_warmup_and_failed_runs():
+    a = {("duration", "d"): [10.0, 11.0, 12.0]}
+    b = {("duration", "d"): [20.0, 21.0, 22.0]}
+    measured = trials(a, b)
+    noise = trials({("duration", "d"): [1.0] * 3}, {("duration", "d"): [99.0] * 3}, warmup=True)
+    noise += trials({("duration", "d"): [1.0] * 3}, {("duration", "d"): [99.0] * 3}, status="failed")
+    rows = compare.analyze(measured + noise, alpha=0.05, min_effect=0.03, confidence=0.95)
+    assert (rows[0]["n_a"], rows[0]["median_a"], rows[0]["median_b"]) == (3, 11.0, 21.0)
+
+
+def test_holm_is_applied_per_family():
+    runs = 7
+    a = {("duration", "d"): [10.0 + i for i in range(runs)], ("bytes", "b"): [1000.0 + i for i in range(runs)]}
+    b = {("duration", "d"): [20.0 + i for i in range(runs)], ("bytes", "b"): [1000.5 + i for i in range(runs)]}
+    rows = compare.analyze(trials(a, b) + trials(a, b, test_id="TC002"), 0.05, 0.03, 0.95)
+    duration = [r for r in rows if r["kind"] == "duration"]
+    # Two headline metrics per test: the smallest p is doubled, not quadrupled across both tests
+    assert [r["p_adjusted"] for r in duration] == pytest.approx([2 * compare.min_p(runs, runs)] * 2)
+
+
+def test_underpowered_flags_families_whose_floor_exceeds_alpha():
+    rows = [{"family": "TC001 headline", "n_a": 4, "n_b": 4}] * 3
+    rows += [{"family": "TC001 steps", "n_a": 7, "n_b": 7}] * 20
+    flagged = compare.underpowered(rows, alpha=0.05)
+    assert list(flagged) == ["TC001 headline"]
+    assert flagged["TC001 headline"] == pytest.approx(3 * compare.min_p(4, 4))
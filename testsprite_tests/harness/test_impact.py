@@ -0,0 +1,86 @@
+"""Migration parsing and per-file selection rules of ``impact``."""
+
+from harness import config, impact
+
+POLICY_ONLY = """
+-- Fix recursive RLS on chat
+DROP POLICY IF EXISTS "Users can view participants of their chats" ON public.chat_participants;
+CREATE POLICY "Users can view participants of their chats"
+  ON public.chat_participants FOR SELECT
+  USING (user_id = auth.uid());
+"""
+
+
+def test_quoted_policy_name_keeps_its_table():
+    assert impact.sql_objects(POLICY_ONLY) == {"chat_participants"}
+
+
+def test_policy_name_that_reads_like_dml_is_not_a_table():
+    sql = """
+    CREATE POLICY "Allow authenticated update to private_assets" ON storage.objects FOR UPDATE TO authenticated
+      USING (bucket_id = 'private_assets');
+    CREATE POLICY "Users can update deliveries from their pharmacy" ON customer_deliveries
+      FOR UPDATE USING (true);
+    """
+    assert impact.sql_objects(sql) == {"customer_deliveries"}
+
+
+def test_for_update_clauses_and_row_locks_are_not_tables():
+    sql = """
+    CREATE POLICY owner_update ON public.payments FOR UPDATE
+      USING (auth.uid() = user_id);
+    SELECT * FROM public.jobs FOR UPDATE SKIP LOCKED;
+    """
+    assert impact.sql_objects(sql) == {"payments"}
+
+
+def test_schema_qualified_and_quoted_names():
+    sql = """
+    CREATE TABLE IF NOT EXISTS public."Orders" (id uuid);
+    ALTER TABLE ONLY public.profiles ADD COLUMN x int;
+    CREATE INDEX idx_rx ON public.prescriptions (patient_id);
+    INSERT INTO auth.users (id) VALUES (gen_random_uuid());
+    UPDATE storage.buckets SET public = false;
+    CREATE OR REPLACE FUNCTION public.get_stats() RETURNS int AS $$ SELECT 1 $$ LANGUAGE sql;
+    """
+    assert impact.sql_objects(sql) == {"orders", "profiles", "prescriptions", "rpc/get_stats"}
+
+
+def test_dynamic_schema_prefix_is_not_a_table():
+    sql = "EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_table);"
+    assert impact.sql_objects(sql) == set()
+
+
+def test_trigger_event_is_not_a_table():
+    sql = "CREATE TRIGGER t BEFORE UPDATE ON public.prescriptions FOR EACH ROW EXECUTE FUNCTION touch();"
+    assert impact.sql_objects(sql) == {"prescriptions"}
+
+
+def _footprint(tables=(), sources=(), apps=(), routes=(), api=()):
+    return {"tables": list(tables), "sources": list(sources), "apps": list(apps), "routes": list(routes),
+            "api": list(api)}
+
+
+def test_affected_migration_selects_tests_touching_its_tables(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "REPO_DIR", tmp_path)
+    migration = tmp_path / "supabase" / "migrations" / "20260213000002_fix_chat_rls_recursion.sql"
+    migration.parent.mkdir(parents=True)
+    migration.write_text(POLICY_ONLY)
+    tests = {"TC001": _footprint(tables=["chat_participants"]), "TC002": _footprint(tables=["prescriptions"])}
+    hit, reason = impact.affected("supabase/migrations/" + migration.name, tests, {"TC001", "TC002"}, {})
+    assert hit == {"TC001"}
+    assert reason == "migration: chat_participants"
+
+
+def test_affected_unparsed_migration_selects_everything(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "REPO_DIR", tmp_path)
+    hit, reason = impact.affected("supabase/migrations/missing.sql", {}, {"TC001", "TC002"}, {})
+    assert hit == {"TC001", "TC002"}
+    assert reason == "migration (no tables parsed)"
+
+
+def test_affected_tc_script_docs_and_harness():
+    everything = {"TC001", "TC004"}
+    assert impact.affected("testsprite_tests/TC004_Patient.py", {}, everything, {})[0] == {"TC004"}
+    assert impact.affected("docs/architecture.md", {}, everything, {})[0] == set()
+    assert impact.affected("testsprite_tests/harness/stats.py", {}, everything, {})[0] == everything
@@ -0,0 +1,47 @@
+"""Field classification of ``overfetch``: what a page rendered of what it fetched."""
+
+from harness import overfetch
+
+UUID = "123e4567-e89b-12d3-a456-426614174000"
+# DomSnapshots hands classify_fields lowercased text with whitespace collapsed
+TEXT = "receta de maría pérez hipertensión arterial 15 de marzo 12,50 bs activa"
+
+
+def test_ids_and_uuid_valued_fields_are_structural():
+    rows = [{"id": 1, "doctor_id": 7, "ref": UUID}, {"id": 2, "doctor_id": 8, "ref": None}]
+    assert overfetch.classify_fields(rows, TEXT) == {"id": "structural", "doctor_id": "structural",
+                                                     "ref": "structural"}
+
+
+def test_always_null_field_is_unrendered_not_structural():
+    rows = [{"notes": None}, {"notes": None}]
+    assert overfetch.classify_fields(rows, TEXT) == {"notes": "unrendered"}
+
+
+def test_rendered_strings_numbers_and_dates():
+    rows = [{"diagnosis": "Hipertensión arterial", "price": 12.5, "prescribed_at": "2026-03-15T10:00:00Z"}]
+    assert overfetch.classify_fields(rows, TEXT) == {
+        "diagnosis": "rendered",
+        "price": "rendered",
+        "prescribed_at": "rendered",
+    }
+
+
+def test_short_and_boolean_values_are_unknown():
+    rows = [{"is_generic": True, "unit": "mg"}, {"is_generic": False, "unit": None}]
+    assert overfetch.classify_fields(rows, TEXT) == {"is_generic": "unknown", "unit": "unknown"}
+
+
+def test_long_text_not_on_the_page_is_unrendered():
+    rows = [{"general_instructions": "Tomar con abundante agua después de cada comida"}]
+    assert overfetch.classify_fields(rows, TEXT) == {"general_instructions": "unrendered"}
+
+
+def test_embedded_rows_are_flattened_by_path():
+    rows = [{"doctor": {"full_name": "María Pérez", "avatar_url": "https://cdn.example/a.png"},
+             "medications": [{"medication_name": "Losartán 50 mg"}]}]
+    assert overfetch.classify_fields(rows, TEXT) == {
+        "doctor.full_name": "rendered",
+        "doctor.avatar_url": "unrendered",
+        "medications[].medication_name": "unrendered",
+    }
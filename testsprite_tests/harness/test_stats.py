@@ -0,0 +1,72 @@
+"""Known values for the inferential statistics behind ``compare``'s merge gate."""
+
+import math
+
+import pytest
+
+from harness import stats
+
+
+def test_u_distribution_counts_every_ordering():
+    dist = stats._u_distribution(3, 3)
+    assert sum(dist) == math.comb(6, 3)
+    assert dist == [1, 1, 2, 3, 3, 3, 3, 2, 1, 1]
+
+
+@pytest.mark.parametrize(
+    "a, b, expected",
+    [
+        ([1, 2, 3], [4, 5, 6], 2 / 20),  # U = 0: one ordering in C(6, 3) per tail
+        ([1, 2, 4], [3, 5, 6], 4 / 20),  # U = 1: two orderings per tail
+        ([4, 5, 6], [1, 2, 3], 2 / 20),
+        ([1, 3, 5], [2, 4, 6], 14 / 20),  # U = 3: seven orderings at or below it
+    ],
+)
+def test_mann_whitney_exact(a, b, expected):
+    assert stats.mann_whitney(a, b) == pytest.approx(expected)
+
+
+def test_mann_whitney_normal_with_ties():
+    # Ranks 1, 3, 3, 5.5 -> U = 2.5; tie groups of 3 and 2; continuity-corrected z = 1.4884
+    assert stats.mann_whitney([1, 2, 2, 3], [2, 3, 4, 5]) == pytest.approx(0.136658, abs=1e-6)
+
+
+def test_mann_whitney_identical_constant_samples():
+    assert stats.mann_whitney([7, 7, 7], [7, 7, 7]) == 1.0
+
+
+def test_mann_whitney_empty_sample_is_nan():
+    assert math.isnan(stats.mann_whitney([], [1, 2]))
+
+
+def test_holm_adjusts_in_input_order_and_keeps_nan():
+    adjusted = stats.holm([0.01, 0.04, math.nan, 0.03, 0.5])
+    assert adjusted[:2] == pytest.approx([0.04, 0.09])
+    assert math.isnan(adjusted[2])
+    assert adjusted[3:] == pytest.approx([0.09, 0.5])
+
+
+def test_holm_is_monotone_and_capped():
+    pvalues = [0.001, 0.2, 0.01, 0.02, 0.9, 0.015]
+    adjusted = stats.holm(pvalues)
+    by_raw = [adjusted[i] for i in sorted(range(len(pvalues)), key=pvalues.__getitem__)]
+    assert by_raw == sorted(by_raw)
+    assert all(a >= p for a, p in zip(adjusted, pvalues))
+    assert max(adjusted) <= 1.0
+
+
+def test_bootstrap_ci_contains_zero_for_identical_samples():
+    sample = [10.0, 11.0, 12.0, 10.5, 11.5, 12.5, 9.5]
+    low, high = stats.bootstrap_ratio_ci(sample, list(sample))
+    assert low <= 0 <= high
+
+
+def test_bootstrap_ci_excludes_zero_for_a_clear_shift():
+    a = [10.0, 10.2, 9.9, 10.1, 10.3, 9.8, 10.0]
+    low, high = stats.bootstrap_ratio_ci(a, [v * 1.5 for v in a])
+    assert 0.4 < low <= 0.5 <= high < 0.6
+
+
+def test_bootstrap_ci_is_reproducible():
+    a, b = [1.0, 2.0, 3.0, 4.0], [2.0, 3.0, 4.0, 5.0]
+    assert stats.bootstrap_ratio_ci(a, b, seed=3) == stats.bootstrap_ratio_ci(a, b, seed=3)
@@ -0,0 +1,114 @@
+"""Failure signatures, stages and the prerequisite breaker of ``triage``."""
+
+from pathlib import Path
+
+from harness import network, tc_runner, triage
+
+HOME = "http://localhost:3000/"
+OPEN_LOGIN = "xpath=html/body/header/nav/div/div[3]/a[1]"
+EMAIL = "xpath=html/body/div[2]/div[3]/div/div/div[2]/div/form/div[1]/div/input"
+SUBMIT = "xpath=html/body/div[2]/div[3]/div/div/div[2]/div/form/button"
+DASHBOARD_LINK = "xpath=html/body/div[2]/main/div/div[2]/div[2]/a"
+
+
+def make_run(*steps, error_type="TimeoutError") -> tc_runner.TestRun:
+    run = tc_runner.TestRun("TC001", Path("TC001_x.py"), [])
+    for index, (kind, target) in enumerate(steps):
+        run.steps.append(tc_runner.Step(index, kind, target, url=HOME))
+    run.steps[-1].error = f"{error_type}: waiting for locator"
+    run.status, run.error_type = "failed", error_type
+    return run
+
+
+def test_failing_first_navigation_is_boot():
+    run = make_run(("goto", HOME), ("goto", HOME))
+    assert triage.stage_of(run, run.steps[-1], "/", None) == "boot"
+
+
+def test_failing_step_in_the_login_modal_is_login():
+    for target in (OPEN_LOGIN, EMAIL, SUBMIT):
+        run = make_run(("goto", HOME), ("click", target))
+        assert triage.stage_of(run, run.steps[-1], "/", None) == "login"
+
+
+def test_still_on_landing_after_submitting_is_login():
+    run = make_run(("goto", HOME), ("click", OPEN_LOGIN), ("fill", EMAIL), ("click", SUBMIT),
+                   ("click", DASHBOARD_LINK))
+    assert triage.stage_of(run, run.steps[-1], "/", None) == "login"
+
+
+def test_failure_on_a_dashboard_after_login_is_flow():
+    run = make_run(("goto", HOME), ("click", OPEN_LOGIN), ("fill", EMAIL), ("click", SUBMIT),
+                   ("click", DASHBOARD_LINK))
+    assert triage.stage_of(run, run.steps[-1], "/dashboard/recetas", None) == "flow"
+
+
+def test_sign_in_spinner_is_login_anywhere():
+    run = make_run(("goto", HOME), ("click", DASHBOARD_LINK))
+    assert triage.stage_of(run, run.steps[-1], "/", "Iniciando sesión...") == "login"
+    assert triage.stage_of(run, run.steps[-1], "/", None) == "flow"
+
+
+def test_last_network_error_prefers_the_latest_problem():
+    exchanges = [
+        network.Exchange(0, "GET", "http://localhost:3000/_next/x.js", "script", failure="net::ERR_ABORTED"),
+        network.Exchange(1, "POST", "http://localhost:54321/auth/v1/token?grant_type=password", "fetch",
+                         status=400),
+        network.Exchange(1, "GET", "http://localhost:3000/logo.png", "image", status=404),  # not an API call
+        network.Exchange(2, "GET", "http://localhost:3000/", "document", status=200),
+    ]
+    assert triage.last_network_error(exchanges) == "HTTP 400 POST /auth/v1/token"
+    assert triage.last_network_error(exchanges[2:]) is None
+
+
+def sig(stage, route="/", error_type="TimeoutError"):
+    return {"error_type": error_type, "step_kind": "click", "route": route, "network_error": None, "stage": stage}
+
+
+def test_breaker_opens_after_consecutive_same_cluster_failures():
+    breaker = triage.Breaker(threshold=2)
+    breaker.record(False, sig("login"))
+    assert breaker.check({"boot", "login"}) is None
+    breaker.record(False, sig("login"))
+    stage, cluster, probe = breaker.check({"boot", "login"})
+    assert (stage, cluster, probe) == ("login", triage.cluster_key(sig("login")), False)
+    assert breaker.check({"boot"}) is None  # scripts that do not sign in still run
+
+
+def test_breaker_streak_resets_on_a_different_cluster():
+    breaker = triage.Breaker(threshold=2)
+    breaker.record(False, sig("login"))
+    breaker.record(False, sig("login", error_type="Error"))
+    assert breaker.check({"login"}) is None
+
+
+def test_breaker_closes_when_a_test_gets_past_prerequisites():
+    breaker = triage.Breaker(threshold=1)
+    breaker.record(False, sig("boot"))
+    assert breaker.check({"boot"})[0] == "boot"
+    breaker.record(False, sig("flow"))
+    assert breaker.check({"boot"}) is None
+
+
+def test_login_failure_closes_an_open_boot_breaker():
+    breaker = triage.Breaker(threshold=1)
+    breaker.record(False, sig("boot"))
+    breaker.record(False, sig("login"))
+    assert breaker.check({"boot"}) is None
+    assert breaker.check({"boot", "login"})[0] == "login"
+
+
+def test_breaker_probes_every_nth_blocked_test():
+    breaker = triage.Breaker(threshold=1, probe_every=3)
+    breaker.record(False, sig("boot"))
+    assert [breaker.check({"boot"})[2] for _ in range(6)] == [False, False, True, False, False, True]
+
+
+def test_prerequisites_from_script_text(tmp_path):
+    signs_in = tmp_path / "TC001_a.py"
+    signs_in.write_text("# -> Open the login form so username/password inputs become available.\n"
+                        f"elem = frame.locator('{OPEN_LOGIN}').nth(0)\n")
+    anonymous = tmp_path / "TC002_b.py"
+    anonymous.write_text("await page.goto('http://localhost:3000')\n")
+    assert triage.prerequisites(signs_in) == {"boot", "login"}
+    assert triage.prerequisites(anonymous) == {"boot"}
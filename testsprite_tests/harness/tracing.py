@@ -0,0 +1,312 @@
+"""W3C trace-context propagation from TC steps to backend spans.
+
+Each TC script runs as one trace. The test is its root span, every step a
+child span, and every request the page makes a span under the step it
+belongs to: the request goes out with a ``traceparent`` header naming that
+span (added through request interception, which also turns the browser's
+HTTP cache off for the run). Whatever the apps and services export to the
+OTLP collector — the embedded one on ``--otlp-port``, or a separate
+``python -m harness otlp`` given as ``--collector`` — is matched back by
+trace and parent id after ``--flush-s`` seconds.
+
+The report breaks every step down into step → requests → backend spans:
+time in the browser's requests, time the first server span accounted for,
+time in database spans (``db.system``) below it, and what the traced
+requests spent outside the server span (network and queueing). Requests
+without any backend span are counted per host as *not instrumented*;
+together with the services and metrics that reached the collector this is
+what the observability requirement of ``standard_prd.json`` ("instrumentar
+métricas y logs") is checked against.
+Each test's full trace, client spans included, is written as OTLP/JSON to
+``harness_output/traces/`` for loading into Jaeger or Tempo.
+
+The apps only show up if they export: for Next.js, an ``instrumentation.ts``
+registering ``@vercel/otel`` with
+``OTEL_EXPORTER_OTLP_ENDPOINT=http://localhost:4318``.
+"""
+
+import asyncio
+import collections
+import contextlib
+import json
+import secrets
+import time
+import urllib.request
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from harness import config, otlp, report, tc_runner
+from harness.errors import HarnessError
+
+SERVICE = "testsprite-harness"
+
+
+def traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+class TracePlugin(tc_runner.Plugin):
+    """Gives the test, its steps and its requests span ids and propagates them."""
+
+    name = "trace-context"
+
+    def __init__(self):
+        self.run = None
+        self.trace_id = None
+        self.root = None
+        self.steps = {}  # step index -> span id
+        self.requests = []
+        self._by_request = {}
+
+    async def on_test_start(self, run):
+        self.run = run
+        self.trace_id = secrets.token_hex(16)
+        self.root = secrets.token_hex(8)
+
+    async def on_context(self, run, context):
+        await context.route("**/*", self._route)
+        context.on("requestfinished", lambda request: asyncio.ensure_future(self._finished(request)))
+        context.on("requestfailed", self._failed)
+
+    async def on_step_start(self, run, step, page):
+        self.steps[step.index] = secrets.token_hex(8)
+
+    async def _route(self, route, request):
+        step = self.run.current_step
+        span_id = secrets.token_hex(8)
+        record = {
+            "span_id": span_id,
+            "parent_span_id": self.steps.get(step.index, self.root) if step else self.root,
+            "step": step.index if step else -1,
+            "method": request.method,
+            "url": request.url,
+            "resource_type": request.resource_type,
+            "start_ms": time.time() * 1000,
+            "end_ms": None,
+            "status": None,
+            "failure": None,
+        }
+        self.requests.append(record)
+        self._by_request[request] = record
+        try:
+            await route.continue_(headers={**request.headers, "traceparent": traceparent(self.trace_id, span_id)})
+        except Exception:
+            pass  # page or context already gone
+
+    async def _finished(self, request):
+        record = self._by_request.pop(request, None)
+        if record is None:
+            return
+        timing = request.timing
+        if timing and timing.get("startTime", -1) > 0 and timing.get("responseEnd", -1) >= 0:
+            record["start_ms"] = timing["startTime"]
+            record["end_ms"] = timing["startTime"] + timing["responseEnd"]
+        else:
+            record["end_ms"] = time.time() * 1000
+        try:
+            response = await request.response()
+            record["status"] = response.status if response else None
+        except Exception:
+            pass
+
+    def _failed(self, request):
+        record = self._by_request.pop(request, None)
+        if record:
+            record["end_ms"] = time.time() * 1000
+            record["failure"] = request.failure
+
+    def client_spans(self, run) -> list:
+        """The harness's own spans, in the collector's normalized form."""
+        spans = [_client_span(self.trace_id, self.root, None, run.path.stem, "internal",
+                              run.started_at, run.ended_at, {"test.status": run.status})]
+        for step in run.steps:
+            if step.index in self.steps:
+                spans.append(_client_span(self.trace_id, self.steps[step.index], self.root, step.signature,
+                                          "internal", step.started_at, step.ended_at or step.started_at,
+                                          {"step.index": step.index, "step.kind": step.kind}, bool(step.error)))
+        for r in self.requests:
+            spans.append(_client_span(self.trace_id, r["span_id"], r["parent_span_id"],
+                                      f"{r['method']} {urlsplit(r['url']).path}", "client", r["start_ms"],
+                                      r["end_ms"] or r["start_ms"],
+                                      {"http.method": r["method"], "http.url": r["url"],
+                                       "http.status_code": r["status"]},
+                                      bool(r["failure"]) or (r["status"] or 0) >= 500))
+        return spans
+
+
+def _client_span(trace_id, span_id, parent, name, kind, start_ms, end_ms, attributes, error=False) -> dict:
+    return {"trace_id": trace_id, "span_id": span_id, "parent_span_id": parent, "name": name, "kind": kind,
+            "service": SERVICE, "start_ms": start_ms, "end_ms": end_ms, "duration_ms": end_ms - start_ms,
+            "attributes": attributes, "error": error}
+
+
+def fetch_spans(collector_url: str, trace_id: str) -> list:
+    try:
+        with urllib.request.urlopen(f"{collector_url.rstrip('/')}/__harness/spans?trace_id={trace_id}",
+                                    timeout=10) as response:
+            return json.loads(response.read())
+    except OSError as exc:
+        raise HarnessError(f"collector at {collector_url}: {exc}") from None
+
+
+def descendants(span_id: str, children: dict) -> list:
+    found, stack = [], list(children.get(span_id, ()))
+    while stack:
+        span = stack.pop()
+        found.append(span)
+        stack.extend(children.get(span["span_id"], ()))
+    return found
+
+
+def link(run, plugin: TracePlugin, backend: list) -> dict:
+    """Step → request → backend span breakdown for one test."""
+    children = collections.defaultdict(list)
+    for span in backend:
+        children[span["parent_span_id"]].append(span)
+    known = {plugin.root, *plugin.steps.values(), *(r["span_id"] for r in plugin.requests),
+             *(s["span_id"] for s in backend)}
+    steps = {s.index: {"index": s.index, "signature": s.signature, "duration_ms": s.duration_ms, "requests": 0,
+                       "traced": 0, "request_ms": 0.0, "traced_ms": 0.0, "server_ms": 0.0, "db_ms": 0.0,
+                       "spans": 0, "top_spans": collections.Counter()}
+             for s in run.steps if s.index in plugin.steps}
+    untraced = collections.Counter()
+    for r in plugin.requests:
+        if r["end_ms"] is None:
+            continue
+        below = descendants(r["span_id"], children)
+        direct = children.get(r["span_id"], [])
+        r["client_ms"] = r["end_ms"] - r["start_ms"]
+        r["server_ms"] = max((s["duration_ms"] for s in direct), default=None)
+        r["db_ms"] = sum(s["duration_ms"] for s in below if "db.system" in s["attributes"])
+        r["backend_spans"] = len(below)
+        r["services"] = sorted({s["service"] for s in below})
+        if not below:
+            untraced[urlsplit(r["url"]).netloc] += 1
+        step = steps.get(r["step"])
+        if step is None:
+            continue
+        step["requests"] += 1
+        step["request_ms"] += r["client_ms"]
+        if below:
+            step["traced"] += 1
+            step["traced_ms"] += r["client_ms"]
+            step["server_ms"] += r["server_ms"] or 0.0
+            step["db_ms"] += r["db_ms"]
+            step["spans"] += len(below)
+            step["top_spans"].update({s["name"]: s["duration_ms"] for s in direct})
+    for step in steps.values():
+        step["network_ms"] = max(0.0, step["traced_ms"] - step["server_ms"]) if step["traced"] else None
+        step["top_spans"] = [name for name, _ in step["top_spans"].most_common(3)]
+    api = [r for r in plugin.requests if r["resource_type"] in ("fetch", "xhr", "document")]
+    return {
+        "test_id": run.test_id,
+        "status": run.status,
+        "trace_id": plugin.trace_id,
+        "steps": list(steps.values()),
+        "requests": len(plugin.requests),
+        "api_requests": len(api),
+        "api_traced": sum(1 for r in api if r.get("backend_spans")),
+        "backend_spans": len(backend),
+        "orphan_spans": sum(1 for s in backend if s["parent_span_id"] and s["parent_span_id"] not in known),
+        "services": sorted({s["service"] for s in backend}),
+        "untraced_hosts": dict(untraced.most_common()),
+    }
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--collector", help="URL of a running `otlp` collector (default: embed one)")
+    parser.add_argument("--otlp-host", default="127.0.0.1")
+    parser.add_argument("--otlp-port", type=int, default=otlp.DEFAULT_PORT)
+    parser.add_argument("--flush-s", type=float, default=6.0,
+                        help="wait for batched exports after each test (SDK default batch delay is 5 s)")
+    parser.add_argument("--min-traced", type=float, default=0.0,
+                        help="fail unless this share of API requests reached an instrumented backend")
+
+
+def run(args) -> int:
+    payload = asyncio.run(trace(args))
+    path = report.write_report("traces", payload, render_markdown(payload), args.output_dir)
+    print(f"traces report: {path}")
+    ok = all(t["status"] == "passed" for t in payload["tests"]) and payload["api_traced_share"] >= args.min_traced
+    return 0 if ok else 1
+
+
+async def trace(args) -> dict:
+    trace_dir = Path(args.output_dir or config.OUTPUT_DIR) / "traces"
+    trace_dir.mkdir(parents=True, exist_ok=True)
+    tests = []
+    async with contextlib.AsyncExitStack() as stack:
+        collector = None
+        if not args.collector:
+            collector = await stack.enter_async_context(otlp.Collector(args.otlp_host, args.otlp_port))
+            print(f"OTLP collector on {collector.url}")
+        for path in tc_runner.selected(args):
+            plugin = TracePlugin()
+            run = await tc_runner.run_test_file(path, [plugin], args.timeout)
+            await asyncio.sleep(args.flush_s)
+            if collector:
+                backend = collector.spans_for(plugin.trace_id)
+            else:
+                backend = await asyncio.to_thread(fetch_spans, args.collector, plugin.trace_id)
+            result = link(run, plugin, backend)
+            spans = plugin.client_spans(run) + backend
+            trace_path = trace_dir / f"{run.test_id}-{plugin.trace_id}.json"
+            trace_path.write_text(json.dumps(otlp.to_otlp_json(spans)), encoding="utf-8")
+            result["trace_file"] = str(trace_path)
+            print(f"{run.test_id}: {run.status}, trace {plugin.trace_id}: {result['api_traced']}/"
+                  f"{result['api_requests']} API requests traced, {result['backend_spans']} backend spans")
+            tests.append(result)
+        metrics = collector.metrics if collector else _fetch_metrics(args.collector)
+        logs = collector.logs if collector else {}
+    api = sum(t["api_requests"] for t in tests)
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "collector": args.collector or collector.url,
+        "tests": tests,
+        "api_traced_share": sum(t["api_traced"] for t in tests) / api if api else 0.0,
+        "services": sorted({s for t in tests for s in t["services"]}),
+        "metrics": sorted({(m["service"], m["name"], m["type"]) for m in metrics}),
+        "log_records": logs,
+    }
+
+
+def _fetch_metrics(collector_url: str) -> list:
+    try:
+        with urllib.request.urlopen(f"{collector_url.rstrip('/')}/__harness/metrics", timeout=10) as response:
+            return json.loads(response.read())["metrics"]
+    except OSError as exc:
+        raise HarnessError(f"collector at {collector_url}: {exc}") from None
+
+
+def render_markdown(payload: dict) -> str:
+    lines = [
+        "# Trace-context breakdown",
+        "",
+        f"Generated {payload['generated_at']} against {payload['collector']}: "
+        f"{payload['api_traced_share']:.0%} of API requests reached an instrumented backend.",
+        "",
+        f"- services exporting spans: {', '.join(payload['services']) or 'none'}",
+        f"- metrics received: {len(payload['metrics'])}"
+        + (f" ({', '.join(f'{s}/{n}' for s, n, _ in payload['metrics'][:10])})" if payload["metrics"] else ""),
+        f"- log records received: {sum(payload['log_records'].values())}",
+        "",
+    ]
+    for t in payload["tests"]:
+        lines += [
+            f"## {t['test_id']} ({t['status']}) — trace `{t['trace_id']}`",
+            "",
+            f"{t['api_traced']}/{t['api_requests']} API requests traced, {t['backend_spans']} backend spans "
+            f"({t['orphan_spans']} with unknown parents). Not instrumented: "
+            + (", ".join(f"{host} ({n})" for host, n in t["untraced_hosts"].items()) or "—") + ".",
+            "",
+            report.markdown_table(
+                ("step", "action", "step ms", "requests", "traced", "request ms", "server ms", "db ms",
+                 "network ms", "top spans"),
+                [(s["index"], s["signature"], s["duration_ms"], s["requests"], s["traced"], s["request_ms"],
+                  s["server_ms"], s["db_ms"], s["network_ms"], ", ".join(s["top_spans"]))
+                 for s in t["steps"]],
+            ),
+            "",
+        ]
+    return "\n".join(lines)
@@ -0,0 +1,253 @@
+"""Shared-cause failure clustering with a fail-fast circuit breaker.
+
+Runs the TC scripts one after another and gives every failure a signature:
+error class, kind of the failing step, the route the page was on, and the
+last network error the test saw (a failed request, a 5xx, or a 4xx from an
+API call such as ``/auth/v1/token``). Failures with the same signature form
+a cluster; the report lists clusters, not tests, with the UI's stuck busy
+text ("Iniciando sesión...") when there was one.
+
+Each failure is also placed in a stage: ``boot`` (the app never loaded:
+only navigations so far), ``login`` or ``flow``. The scripts sign in
+through a modal on the landing page, not on a login route, so a failure is
+``login`` when its step is one of the modal's (the header's "Iniciar
+Sesión" link, a fill or click in the sign-in form), when the UI is stuck on
+the sign-in spinner, or when a script that went through the form failed
+still on ``/``. ``boot`` and ``login`` are prerequisites:
+when ``--trip-after`` consecutive tests fail in the same prerequisite
+cluster the breaker opens, and later tests that need that prerequisite
+(every script needs boot; those that sign in need login) are marked
+``blocked`` without running, instead of each burning its full timeout.
+With ``--probe-every N`` every Nth blocked test runs anyway; one that gets
+past the prerequisite closes the breaker again.
+"""
+
+import asyncio
+import json
+import re
+import time
+
+from harness import chaos, network, report, tc_runner
+
+PREREQUISITES = ("boot", "login")
+LOGIN_ROUTE = re.compile(r"^/(login|auth|signin|iniciar-sesion)", re.IGNORECASE)
+# Selectors of the landing page's sign-in modal, as recorded in the TC scripts: the header's
+# "Iniciar Sesión" link and the form's email, password and submit
+LOGIN_SELECTORS = re.compile(
+    r"xpath=html/body/(header/nav/div/div\[3\]/a\[1\]$|div\[2\]/div\[3\]/div/div/div\[2\]/div/form/)"
+)
+LOGIN_BUSY = re.compile(r"Iniciando sesi[oó]n", re.IGNORECASE)
+SIGNS_IN = re.compile(r"/login|password|contraseña|Iniciar sesi[oó]n", re.IGNORECASE)
+
+
+class FinalState(tc_runner.Plugin):
+    """Remembers where the page was and what the UI showed when the test ended."""
+
+    name = "final-state"
+
+    def __init__(self):
+        self.url = None
+        self.ui = {}
+
+    async def on_context(self, run, context):
+        await context.add_init_script(script=chaos.ui_script())
+
+    async def before_context_close(self, run, context):
+        for page in context.pages:
+            if page.is_closed():
+                continue
+            self.url = page.url
+            try:
+                self.ui = await page.evaluate("() => window.__harnessUi || {}")
+            except Exception:
+                pass
+
+
+def last_network_error(exchanges) -> str:
+    for exchange in reversed(exchanges):
+        if exchange.failure:
+            problem = exchange.failure
+        elif exchange.status and (exchange.status >= 500 or (exchange.status >= 400 and exchange.is_api)):
+            problem = f"HTTP {exchange.status}"
+        else:
+            continue
+        return f"{problem} {exchange.method} {network.route_of(exchange.url)}"
+    return None
+
+
+def is_login_step(step) -> bool:
+    return step.kind in ("fill", "click") and bool(LOGIN_SELECTORS.search(step.target))
+
+
+def stage_of(run, step, route: str, busy: str) -> str:
+    if step is not None and step.kind == "goto" and all(s.kind == "goto" for s in run.steps[: step.index]):
+        return "boot"
+    if step is not None and is_login_step(step):
+        return "login"
+    if LOGIN_ROUTE.match(route) or (busy and LOGIN_BUSY.search(busy)):
+        return "login"
+    if step is not None and route == "/" and any(is_login_step(s) for s in run.steps[: step.index]):
+        return "login"  # submitted the form but never reached a dashboard
+    return "flow"
+
+
+def signature(run, exchanges, final: FinalState) -> dict:
+    step = next((s for s in reversed(run.steps) if s.error), run.current_step)
+    url = final.url or (step.url if step else "")
+    route = network.route_of(url) if url.startswith("http") else (url or "-")
+    busy = final.ui.get("busyText") if final.ui.get("busySince") else None
+    return {
+        "error_type": run.error_type,
+        "step_kind": step.kind if step else None,
+        "route": route,
+        "network_error": last_network_error(exchanges),
+        "stage": stage_of(run, step, route, busy),
+        "ui_busy": busy,
+    }
+
+
+def cluster_key(sig: dict) -> str:
+    return " | ".join(str(sig[k] or "-") for k in ("error_type", "step_kind", "route", "network_error"))
+
+
+def prerequisites(path) -> set:
+    """Prerequisites a script needs: every script boots the app; most sign in."""
+    needs = {"boot"}
+    if SIGNS_IN.search(path.read_text(encoding="utf-8")):
+        needs.add("login")
+    return needs
+
+
+class Breaker:
+    """Opens per prerequisite after ``threshold`` consecutive failures in one cluster."""
+
+    def __init__(self, threshold: int, probe_every: int = 0):
+        self.threshold = threshold
+        self.probe_every = probe_every
+        self.streak = {}  # stage -> (cluster key, consecutive failures)
+        self.open = {}  # stage -> cluster key
+        self.blocked = {}  # stage -> tests blocked since it opened
+
+    def check(self, needs: set):
+        """``(stage, cluster, probe)`` for the open prerequisite ``needs`` hits, else None."""
+        for stage in PREREQUISITES:
+            if stage in needs and stage in self.open:
+                self.blocked[stage] = self.blocked.get(stage, 0) + 1
+                probe = bool(self.probe_every) and self.blocked[stage] % self.probe_every == 0
+                return stage, self.open[stage], probe
+        return None
+
+    def record(self, passed: bool, sig: dict = None):
+        stage = sig["stage"] if sig else None
+        if passed or stage not in PREREQUISITES:
+            # Got past every prerequisite
+            self.streak.clear()
+            self.open.clear()
+            self.blocked.clear()
+            return
+        if PREREQUISITES.index(stage) > 0:
+            # A login failure means the app booted
+            for earlier in PREREQUISITES[: PREREQUISITES.index(stage)]:
+                self.streak.pop(earlier, None)
+                self.open.pop(earlier, None)
+        key = cluster_key(sig)
+        previous, count = self.streak.get(stage, (None, 0))
+        count = count + 1 if previous == key else 1
+        self.streak[stage] = (key, count)
+        if count >= self.threshold:
+            self.open[stage] = key
+
+
+def configure_parser(parser):
+    tc_runner.add_selection_arguments(parser)
+    parser.add_argument("--trip-after", type=int, default=3,
+                        help="consecutive same-cause prerequisite failures that open the breaker")
+    parser.add_argument("--probe-every", type=int, default=0, help="run every Nth blocked test as a probe")
+
+
+def run(args) -> int:
+    payload = asyncio.run(triage(args))
+    path = report.write_report("triage", payload, render_markdown(payload), args.output_dir)
+    print(f"triage report: {path}")
+    return 0 if all(t["status"] == "passed" for t in payload["tests"]) else 1
+
+
+async def triage(args) -> dict:
+    breaker, tests, clusters = Breaker(args.trip_after, args.probe_every), [], {}
+    started = time.monotonic()
+    for path in tc_runner.selected(args):
+        test = tc_runner.test_id(path)
+        hit = breaker.check(prerequisites(path))
+        if hit and not hit[2]:
+            stage, key, _ = hit
+            print(f"{test}: blocked ({stage} breaker open: {key})")
+            tests.append({"test_id": test, "status": "blocked", "cluster": key, "stage": stage, "duration_s": 0.0})
+            clusters[key]["blocked"].append(test)
+            continue
+        recorder, final = network.NetworkRecorder(), FinalState()
+        run = await tc_runner.run_test_file(path, [recorder, final], args.timeout)
+        entry = {"test_id": test, "status": run.status, "duration_s": run.duration_s, "probe": bool(hit)}
+        if run.status == "passed":
+            breaker.record(True)
+        else:
+            sig = signature(run, recorder.exchanges, final)
+            key = cluster_key(sig)
+            cluster = clusters.setdefault(key, {"key": key, **sig, "tests": [], "blocked": [], "errors": [],
+                                                "burned_s": 0.0})
+            cluster["tests"].append(test)
+            cluster["errors"].append(run.error)
+            cluster["burned_s"] += run.duration_s
+            cluster["ui_busy"] = cluster["ui_busy"] or sig["ui_busy"]
+            breaker.record(False, sig)
+            entry.update(cluster=key, stage=sig["stage"], error=run.error)
+        tests.append(entry)
+        print(f"{test}: {run.status} in {run.duration_s:.1f} s" + (f" [{entry['cluster']}]" if "cluster" in entry else ""))
+
+    ranked = sorted(clusters.values(), key=lambda c: len(c["tests"]) + len(c["blocked"]), reverse=True)
+    for cluster in ranked:
+        failed = len(cluster["tests"])
+        cluster["saved_s"] = len(cluster["blocked"]) * cluster["burned_s"] / failed if failed else 0.0
+    root = [c for c in ranked if c["stage"] in PREREQUISITES and (c["blocked"] or len(c["tests"]) >= args.trip_after)]
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "trip_after": args.trip_after,
+        "wall_s": time.monotonic() - started,
+        "tests": tests,
+        "clusters": ranked,
+        "root_causes": [c["key"] for c in root],
+    }
+
+
+def render_markdown(payload: dict) -> str:
+    tests = payload["tests"]
+    counts = {s: sum(1 for t in tests if t["status"] == s) for s in ("passed", "failed", "error", "blocked")}
+    lines = [
+        "# Failure triage",
+        "",
+        f"Generated {payload['generated_at']}: {counts['passed']} passed, {counts['failed'] + counts['error']} failed, "
+        f"{counts['blocked']} blocked by the breaker, in {payload['wall_s']:.0f} s.",
+        "",
+    ]
+    by_key = {c["key"]: c for c in payload["clusters"]}
+    for key in payload["root_causes"]:
+        c = by_key[key]
+        lines += [
+            f"## Root cause: {c['stage']} — {len(c['tests']) + len(c['blocked'])} tests",
+            "",
+            f"- signature: `{key}`",
+            f"- UI stuck on: {c['ui_busy']}" if c["ui_busy"] else "- UI showed no busy state",
+            f"- failed: {', '.join(c['tests'])} ({c['burned_s']:.0f} s spent)",
+            f"- blocked: {', '.join(c['blocked']) or 'none'} (~{c['saved_s']:.0f} s saved)",
+            f"- first error: {json.dumps(c['errors'][0])[:200]}",
+            "",
+        ]
+    lines += [
+        "## All clusters",
+        "",
+        report.markdown_table(
+            ("stage", "error", "step", "route", "network error", "failed", "blocked", "seconds spent"),
+            [(c["stage"], c["error_type"], c["step_kind"], c["route"], c["network_error"], len(c["tests"]),
+              len(c["blocked"]), c["burned_s"]) for c in payload["clusters"]],
+        ),
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,347 @@
+"""Vector/KB search benchmark for the support and AI endpoints.
+
+Loads synthetic, clustered embeddings shaped like ``public.documents`` (see
+``20250220000001_kb_and_faq_setup.sql``) into a scratch schema at several
+corpus sizes, then compares an exact scan with IVFFlat and HNSW indexes:
+query latency percentiles, throughput under concurrency and recall@k against
+brute-force ground truth.
+
+Two query shapes are measured. ``knn`` is the index-friendly
+``ORDER BY embedding <=> q LIMIT k``; ``threshold`` mirrors the
+``match_documents`` RPC (similarity filter, ordered by the computed alias),
+which the planner cannot serve from an ANN index.
+"""
+
+import asyncio
+import math
+import random
+import time
+from dataclasses import dataclass, field
+
+from harness import config, db, report, stats
+from harness.deps import require
+
+SCHEMA = "harness_bench"
+TABLE = f"{SCHEMA}.vector_documents"
+
+# Latency budget for the support search (TC008)
+SUPPORT_BUDGET_MS = 800.0
+
+SHAPES = {
+    "knn": (
+        f"SELECT id FROM {TABLE}"
+        " ORDER BY embedding <=> $1::text::vector LIMIT $2"
+    ),
+    "threshold": (
+        f"SELECT id FROM {TABLE}"
+        " WHERE 1 - (embedding <=> $1::text::vector) > $3"
+        " ORDER BY 1 - (embedding <=> $1::text::vector) DESC LIMIT $2"
+    ),
+}
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    """An index (or none) plus the session settings to query it with."""
+
+    name: str
+    ddl: str = ""
+    settings: dict = field(default_factory=dict)
+
+
+def configure_parser(parser):
+    parser.add_argument("--dsn", default=config.DB_URL)
+    parser.add_argument("--sizes", default="1000,5000,20000", help="corpus sizes, ascending")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension (768 = Gemini)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50, help="distinct query vectors")
+    parser.add_argument("--concurrency", default="1,4,16")
+    parser.add_argument("--throughput-queries", type=int, default=200, help="queries per concurrency level")
+    parser.add_argument("--indexes", default="exact,ivfflat,hnsw")
+    parser.add_argument("--probes", default="1,10", help="ivfflat.probes values")
+    parser.add_argument("--ef-search", default="40,100", help="hnsw.ef_search values")
+    parser.add_argument("--shapes", default="knn,threshold")
+    parser.add_argument("--threshold", type=float, default=0.0, help="similarity cut-off for the threshold shape")
+    parser.add_argument("--clusters", type=int, default=64, help="topic clusters in the synthetic corpus")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch schema afterwards")
+
+
+def run(args) -> int:
+    payload = asyncio.run(benchmark(args))
+    path = report.write_report("vector-bench", payload, render_markdown(payload), args.output_dir)
+    print(f"vector-bench report: {path}")
+    return 0
+
+
+def index_configs(args, size: int) -> list:
+    wanted = set(args.indexes.split(","))
+    configs = []
+    if "exact" in wanted:
+        configs.append(IndexConfig("exact"))
+    if "ivfflat" in wanted:
+        # pgvector guidance: rows / 1000 lists for corpora under 1M rows
+        lists = max(1, size // 1000)
+        ddl = (
+            f"CREATE INDEX ON {TABLE} USING ivfflat (embedding vector_cosine_ops)"
+            f" WITH (lists = {lists})"
+        )
+        for probes in _ints(args.probes):
+            configs.append(IndexConfig(f"ivfflat(lists={lists},probes={probes})", ddl, {"ivfflat.probes": probes}))
+    if "hnsw" in wanted:
+        ddl = (
+            f"CREATE INDEX ON {TABLE} USING hnsw (embedding vector_cosine_ops)"
+            " WITH (m = 16, ef_construction = 64)"
+        )
+        for ef in _ints(args.ef_search):
+            configs.append(IndexConfig(f"hnsw(m=16,ef_search={ef})", ddl, {"hnsw.ef_search": ef}))
+    return configs
+
+
+async def benchmark(args) -> dict:
+    asyncpg = require("asyncpg")
+    rng = random.Random(args.seed)
+    centers = [_unit([rng.gauss(0, 1) for _ in range(args.dim)]) for _ in range(args.clusters)]
+    queries = [_vector_literal(_sample(rng, centers)) for _ in range(args.queries)]
+    shapes = [s for s in args.shapes.split(",") if s in SHAPES]
+    results = []
+
+    conn = await db.connect(args.dsn)
+    try:
+        await _create_table(conn, args.dim)
+        loaded = 0
+        for size in sorted(_ints(args.sizes)):
+            started = time.perf_counter()
+            await _load(conn, rng, centers, size - loaded)
+            load_s = time.perf_counter() - started
+            loaded = size
+            await conn.execute(f"ANALYZE {TABLE}")
+            truth = await _ground_truth(conn, queries, args.k)
+
+            current_ddl, build_s, build_errors = None, {}, {}
+            for index in index_configs(args, size):
+                if index.ddl != current_ddl and index.ddl not in build_errors:
+                    await _drop_indexes(conn)
+                    current_ddl = index.ddl
+                    if index.ddl:
+                        started = time.perf_counter()
+                        try:
+                            await conn.execute(index.ddl)
+                        except asyncpg.PostgresError as exc:
+                            # e.g. IVFFlat with more lists than rows, or HNSW on an old pgvector
+                            build_errors[index.ddl] = str(exc)
+                            current_ddl = None
+                        build_s[index.ddl] = time.perf_counter() - started
+                if index.ddl in build_errors:
+                    results += [
+                        {"size": size, "index": index.name, "shape": shape, "load_s": load_s,
+                         "error": f"index build failed: {build_errors[index.ddl]}"}
+                        for shape in shapes
+                    ]
+                    continue
+                index_bytes = await conn.fetchval(
+                    "SELECT coalesce(sum(pg_relation_size(indexrelid)), 0) FROM pg_index"
+                    " WHERE indrelid = $1::regclass",
+                    TABLE,
+                )
+                for shape in shapes:
+                    entry = {
+                        "size": size,
+                        "index": index.name,
+                        "shape": shape,
+                        "load_s": load_s,
+                        "build_s": build_s.get(index.ddl, 0.0),
+                        "index_bytes": index_bytes,
+                    }
+                    try:
+                        entry.update(await _measure(conn, args, index, shape, queries, truth))
+                    except asyncpg.PostgresError as exc:
+                        entry["error"] = str(exc)
+                    results.append(entry)
+            await _drop_indexes(conn)
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+    return {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "dim": args.dim,
+        "k": args.k,
+        "queries": args.queries,
+        "budget_ms": SUPPORT_BUDGET_MS,
+        "results": results,
+    }
+
+
+async def _measure(conn, args, index: IndexConfig, shape: str, queries, truth) -> dict:
+    sql = SHAPES[shape]
+    params = (args.k, args.threshold) if shape == "threshold" else (args.k,)
+    await _apply_settings(conn, index.settings)
+
+    latencies, recalls = [], []
+    try:
+        await conn.fetch(sql, queries[0], *params)  # warm the cache
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            rows = await conn.fetch(sql, query, *params)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {r["id"] for r in rows}
+            recalls.append(len(found & expected) / max(1, len(expected)))
+    finally:
+        await conn.execute("RESET ALL")
+
+    throughput = {}
+    for concurrency in _ints(args.concurrency):
+        throughput[str(concurrency)] = await _throughput(args, index, sql, params, queries, concurrency)
+
+    latency = stats.summarize(latencies)
+    return {
+        "latency_ms": latency,
+        "recall_at_k": sum(recalls) / len(recalls),
+        "throughput_qps": throughput,
+        "within_budget": latency["p95"] <= SUPPORT_BUDGET_MS,
+    }
+
+
+async def _throughput(args, index: IndexConfig, sql, params, queries, concurrency: int) -> float:
+    asyncpg = require("asyncpg")
+
+    async def init(connection):
+        await _apply_settings(connection, index.settings)
+
+    pool = await asyncpg.create_pool(args.dsn, min_size=concurrency, max_size=concurrency, init=init)
+    remaining = iter(range(args.throughput_queries))
+
+    async def worker():
+        async with pool.acquire() as connection:
+            for i in remaining:
+                await connection.fetch(sql, queries[i % len(queries)], *params)
+
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        await pool.close()
+    return args.throughput_queries / elapsed
+
+
+async def _apply_settings(conn, settings: dict):
+    for name, value in settings.items():
+        await conn.execute(f"SET {name} = {int(value)}")
+
+
+async def _create_table(conn, dim: int):
+    await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    await conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    await conn.execute(
+        f"CREATE TABLE {TABLE} ("
+        " id BIGSERIAL PRIMARY KEY,"
+        " content TEXT NOT NULL,"
+        " metadata JSONB DEFAULT '{}'::jsonb,"
+        f" embedding VECTOR({dim}),"
+        " category TEXT)"
+    )
+
+
+async def _load(conn, rng, centers, count: int, batch: int = 1000):
+    for offset in range(0, count, batch):
+        rows = []
+        for i in range(offset, min(count, offset + batch)):
+            cluster = rng.randrange(len(centers))
+            vector = _sample(rng, centers, cluster)
+            rows.append((f"synthetic faq {i}", f"cat-{cluster}", _vector_literal(vector)))
+        await conn.executemany(
+            f"INSERT INTO {TABLE} (content, category, embedding) VALUES ($1, $2, $3::text::vector)",
+            rows,
+        )
+
+
+async def _ground_truth(conn, queries, k: int) -> list:
+    """Exact top-k per query with index scans disabled (brute force)."""
+    truth = []
+    async with conn.transaction():
+        await conn.execute("SET LOCAL enable_indexscan = off")
+        await conn.execute("SET LOCAL enable_bitmapscan = off")
+        for query in queries:
+            rows = await conn.fetch(SHAPES["knn"], query, k)
+            truth.append({r["id"] for r in rows})
+    return truth
+
+
+async def _drop_indexes(conn):
+    names = await conn.fetch(
+        "SELECT indexrelid::regclass::text AS name FROM pg_index"
+        " WHERE indrelid = $1::regclass AND NOT indisprimary",
+        TABLE,
+    )
+    for row in names:
+        await conn.execute(f"DROP INDEX {row['name']}")
+
+
+def _sample(rng, centers, cluster: int = None, spread: float = 0.35) -> list:
+    """A point near a cluster centre; noise of norm ~``spread`` around it."""
+    center = centers[rng.randrange(len(centers)) if cluster is None else cluster]
+    sigma = spread / math.sqrt(len(center))
+    return _unit([c + rng.gauss(0, sigma) for c in center])
+
+
+def _unit(vector: list) -> list:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _vector_literal(vector: list) -> str:
+    return "[" + ",".join(f"{v:.6f}" for v in vector) + "]"
+
+
+def _ints(csv: str) -> list:
+    return [int(v) for v in csv.split(",") if v]
+
+
+def render_markdown(payload: dict) -> str:
+    measured = [r for r in payload["results"] if "error" not in r]
+    levels = sorted({c for r in measured for c in r["throughput_qps"]}, key=int)
+    rows = [
+        (
+            r["size"],
+            r["index"],
+            r["shape"],
+            r["latency_ms"]["p50"],
+            r["latency_ms"]["p95"],
+            r["latency_ms"]["p99"],
+            r["recall_at_k"],
+            *(r["throughput_qps"].get(c) for c in levels),
+            r["build_s"],
+            r["index_bytes"] // 1024,
+            "yes" if r["within_budget"] else "NO",
+        )
+        for r in measured
+    ]
+    headers = (
+        "corpus",
+        "index",
+        "shape",
+        "p50 ms",
+        "p95 ms",
+        "p99 ms",
+        f"recall@{payload['k']}",
+        *(f"qps c={c}" for c in levels),
+        "build s",
+        "index KiB",
+        f"p95 ≤ {payload['budget_ms']:.0f} ms",
+    )
+    lines = [
+        "# Vector search scaling",
+        "",
+        f"Generated {payload['generated_at']}: dim={payload['dim']}, "
+        f"{payload['queries']} queries, k={payload['k']}.",
+        "",
+        report.markdown_table(headers, rows),
+    ]
+    errors = [r for r in payload["results"] if "error" in r]
+    if errors:
+        lines += ["", "## Skipped", ""]
+        lines += [f"- {e['size']} / {e['index']} / {e['shape']}: {e['error']}" for e in errors]
+    return "\n".join(lines)
@@ -0,0 +1,107 @@
+"""In-page watcher for a prescription card's status label.
+
+The init script records, with the page's own clock, every time the card
+containing ``marker`` switches status label, so the harness can tell when a
+user actually *saw* a change rather than when the backend committed it.
+
+The Recetas page opens on its "Activas" tab, which hides every prescription
+that is not ``active`` — a dispensed one is never on screen there — so
+``load_all`` switches each load to "Todas" before anything is watched.
+"""
+
+import json
+import re
+import time
+
+from harness.deps import require
+
+# Labels rendered by apps/paciente/web/src/app/dashboard/recetas/page.tsx
+PACIENTE_STATUS_LABELS = {"active": "Activa", "expired": "Expirada", "dispensed": "Dispensada"}
+# The schema's statuses (pending/dispensed/cancelled) as the page shows them: it has no label
+# for pending or cancelled and falls back to "Activa"
+SHOWN_AS = {"pending": "active", "dispensed": "dispensed", "cancelled": "active"}
+PRESCRIPTIONS_API = "/api/prescriptions"
+ALL_TAB = re.compile(r"^\s*Todas")
+
+# The smallest ancestor of the marker text holding exactly one label is the card
+_SCRIPT = """
+(() => {
+  const cfg = %s;
+  window.__harnessChanges = [];
+  let current = null;
+  const check = () => {
+    if (!document.body) return;
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+      if (!node.textContent.includes(cfg.marker)) continue;
+      for (let el = node.parentElement, depth = 0; el && depth < 8; el = el.parentElement, depth++) {
+        const found = Object.entries(cfg.labels).filter(([, label]) => el.textContent.includes(label));
+        if (found.length === 0) continue;
+        if (found.length === 1 && found[0][0] !== current) {
+          current = found[0][0];
+          window.__harnessChanges.push({ status: current, at: Date.now() });
+        }
+        return;
+      }
+    }
+  };
+  new MutationObserver(check).observe(document, { childList: true, subtree: true, characterData: true });
+  document.addEventListener("DOMContentLoaded", check);
+})();
+"""
+
+_SEEN = (
+    "(args) => (window.__harnessChanges || [])"
+    ".some((c) => c.status === args.status && c.at >= args.since)"
+)
+_SEEN_AT = (
+    "(args) => (window.__harnessChanges || [])"
+    ".find((c) => c.status === args.status && c.at >= args.since).at"
+)
+
+
+def shown_status(status: str) -> str:
+    """The label key the page renders for a ``prescriptions.status``."""
+    return SHOWN_AS.get(status, status if status in PACIENTE_STATUS_LABELS else "active")
+
+
+def card_status_script(marker: str, labels: dict = None) -> str:
+    """Init script (for ``context.add_init_script``) watching one card."""
+    return _SCRIPT % json.dumps({"marker": marker, "labels": labels or PACIENTE_STATUS_LABELS})
+
+
+async def wait_for_status(page, status: str, since: float, timeout: float, poll_interval: float = None):
+    """Epoch ms at which ``page`` showed ``status`` after ``since``, or None.
+
+    Without ``poll_interval`` the page must update by itself; with it the page
+    is reloaded (through ``load_all``) every ``poll_interval`` seconds until
+    the deadline.
+    """
+    async_api = require("playwright.async_api")
+    arg = {"status": status, "since": since}
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        step = poll_interval or deadline - time.monotonic()
+        try:
+            await page.wait_for_function(_SEEN, arg=arg, timeout=max(1.0, step * 1000))
+            return await page.evaluate(_SEEN_AT, arg)
+        except async_api.TimeoutError:
+            if not poll_interval:
+                return None
+            await load_all(page)
+    return None
+
+
+async def load_all(page, url: str = None):
+    """Navigate to ``url`` (or reload) and switch the Recetas page to "Todas".
+
+    The page fetches ``/api/prescriptions`` once, from an effect, so that
+    response arriving also means React has hydrated and the tab click lands.
+    """
+    async with page.expect_response(lambda response: PRESCRIPTIONS_API in response.url) as loaded:
+        if url:
+            await page.goto(url, wait_until="domcontentloaded")
+        else:
+            await page.reload(wait_until="domcontentloaded")
+    await loaded.value
+    await page.get_by_role("button", name=ALL_TAB).click()